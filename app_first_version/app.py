@@ -1,11 +1,20 @@
+import os
+import sys
 import dash
 from dash import dcc, html
 import pandas as pd
+
+# Módulos compartilhados com o app Streamlit (pacote voos, na raiz do repositório)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 from components.layout import create_layout
-from utils.data_processing import load_and_process_data
+from utils.dataset_store import DatasetStore
+
+DF_VIEW_PATH = os.environ.get("FLIGHTS_DF_VIEW", os.path.join("project_development", "dataset", "created", "df_view.csv"))
 
 print("Carregando dados...")
-df = load_and_process_data("project_development\dataset\created\df_view.csv")
+store = DatasetStore(DF_VIEW_PATH)
+df = store.current.df
 print(f"Dados carregados: {len(df)} registros")
 
 app = dash.Dash(__name__, assets_folder='assets')
@@ -30,11 +39,13 @@ app.index_string = '''
 </html>
 '''
 
-app.layout = create_layout(df)
+app.layout = create_layout(df, store.current.version)
 
 # Importar callbacks DEPOIS de criar o app e layout
 from callbacks.chart_callbacks import register_chart_callbacks
-register_chart_callbacks(app, df)
+register_chart_callbacks(app, store)
+from callbacks.export_routes import register_export_routes
+register_export_routes(app, store)
 
 if __name__ == '__main__':
     print("Iniciando dashboard...")
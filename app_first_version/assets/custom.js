@@ -18,33 +18,228 @@ function addHoverEffects() {
   });
 }
 
-function setupMetricButtons() {
-  // Configuração dos botões de métrica
-  const buttons = document.querySelectorAll(".metric-button");
-  buttons.forEach((button) => {
-    button.addEventListener("click", function () {
-      // Remove classe active de todos os botões
-      buttons.forEach((btn) => btn.classList.remove("active"));
-      // Adiciona classe active ao botão clicado
-      this.classList.add("active");
-
-      // Dispara evento para o Dash
-      const metricValue = this.getAttribute("data-value");
-      if (window.dash_clientside && window.dash_clientside.setMetric) {
-        window.dash_clientside.setMetric(metricValue);
-      }
-    });
-  });
+// --- Gráficos de distribuição montados no navegador ---
+// O servidor envia uma vez por versão do dataset o store "chart-aggregates" (chaves e
+// valores de todas as métricas por gráfico); troca de métrica, top N, ordenação e
+// títulos não passam pelo servidor.
+
+// Escala RdYlGn_r do plotly.express (o plotly.js não tem a RdYlGn nomeada)
+const RDYLGN_R = [
+  "rgb(0,104,55)", "rgb(26,152,80)", "rgb(102,189,99)", "rgb(166,217,106)",
+  "rgb(217,239,139)", "rgb(255,255,191)", "rgb(254,224,139)", "rgb(253,174,97)",
+  "rgb(244,109,67)", "rgb(215,48,39)", "rgb(165,0,38)",
+].map((color, i, colors) => [i / (colors.length - 1), color]);
+
+const BASE_LAYOUT = {
+  height: 400,
+  title: { x: 0.5, font: { size: 16 } },
+  font: { size: 12 },
+  plot_bgcolor: "rgba(0,0,0,0)",
+  paper_bgcolor: "rgba(0,0,0,0)",
+  margin: { l: 50, r: 20, t: 60, b: 40 },
+  showlegend: false,
+};
+
+function chartLayout(title, extra) {
+  const layout = Object.assign({}, BASE_LAYOUT, extra);
+  layout.title = Object.assign({}, BASE_LAYOUT.title, { text: title });
+  return layout;
+}
+
+function emptyFigure(title) {
+  return { data: [], layout: chartLayout(title) };
+}
+
+// Barras horizontais; `order` = "desc", "asc" ou "natural" (ordem das chaves recebidas)
+function barFigure(keys, values, title, suffix, label, order) {
+  let yaxis = { title: { text: label }, categoryorder: order === "asc" ? "total descending" : "total ascending" };
+  if (order === "natural") {
+    // O plotly desenha a primeira categoria embaixo: a ordem é invertida
+    yaxis = { title: { text: label }, categoryorder: "array", categoryarray: keys.slice().reverse() };
+  }
+  return {
+    data: [{
+      type: "bar",
+      orientation: "h",
+      x: values,
+      y: keys,
+      marker: { color: values, coloraxis: "coloraxis" },
+      hovertemplate: label + "=%{y}<br>" + suffix + "=%{x}<extra></extra>",
+    }],
+    layout: chartLayout("<b>" + title + "</b>", {
+      xaxis: { title: { text: suffix } },
+      yaxis: yaxis,
+      coloraxis: { colorscale: RDYLGN_R, colorbar: { title: { text: suffix } } },
+    }),
+  };
+}
+
+function lineFigure(keys, values, title, suffix, label) {
+  const grid = { showgrid: true, gridwidth: 1, gridcolor: "lightgray" };
+  return {
+    data: [{
+      type: "scatter",
+      mode: "lines+markers",
+      x: keys,
+      y: values,
+      line: { color: "#e74c3c", width: 3 },
+      marker: { size: 6 },
+      hovertemplate: label + "=%{x}<br>" + suffix + "=%{y}<extra></extra>",
+    }],
+    layout: chartLayout("<b>" + title + "</b>", {
+      xaxis: Object.assign({ title: { text: label } }, grid),
+      yaxis: Object.assign({ title: { text: suffix } }, grid),
+    }),
+  };
+}
+
+// Dias anômalos (voos.anomalies) marcados sobre a linha do dia do mês
+function anomalyTrace(keys, values, anomalies) {
+  const points = (anomalies || []).filter((item) => keys.indexOf(item.day) >= 0);
+  if (points.length === 0) {
+    return null;
+  }
+  return {
+    type: "scatter",
+    mode: "markers",
+    x: points.map((item) => item.day),
+    y: points.map((item) => values[keys.indexOf(item.day)]),
+    marker: {
+      color: "#DC1C13",
+      size: points.map((item) => 8 + 2 * Math.min(item.count, 10)),
+      symbol: "diamond",
+      line: { width: 1, color: "white" },
+    },
+    customdata: points.map((item) => [item.count, item.details]),
+    hovertemplate: "<b>Dia %{x}: %{customdata[0]} anomalias</b><br>%{customdata[1]}<extra></extra>",
+    name: "Dias anômalos",
+    showlegend: false,
+  };
+}
+
+// Top N de um ranking: os maiores (ou os menores, em ordem crescente), sem grupos vazios
+function selectRanked(keys, values, topN, order) {
+  const rows = keys
+    .map((key, i) => [key, values[i]])
+    .filter((row) => row[1] !== null)
+    .sort((a, b) => (order === "asc" ? a[1] - b[1] : b[1] - a[1]))
+    .slice(0, topN);
+  if (order === "natural") {
+    rows.sort((a, b) => String(a[0]).localeCompare(String(b[0])));
+  }
+  return [rows.map((row) => row[0]), rows.map((row) => row[1])];
+}
+
+function renderChart(chart, metric, suffix, topN, order, anomalies) {
+  let keys = chart.keys;
+  let values = chart.values[metric];
+  const title = chart.title.replace("{n}", topN).replace("{suffix}", suffix);
+  if (chart.ranked) {
+    [keys, values] = selectRanked(keys, values, topN, order);
+  }
+  if (keys.length === 0) {
+    return emptyFigure(title + " (Sem dados)");
+  }
+  if (chart.kind === "line") {
+    const fig = lineFigure(keys, values, title, suffix, chart.label);
+    const marks = anomalies && anomalyTrace(keys, values, anomalies);
+    if (marks) {
+      fig.data.push(marks);
+    }
+    return fig;
+  }
+  return barFigure(keys, values, title, suffix, chart.label, order);
+}
+
+// --- Modo de comparação: períodos A e B lado a lado, com a variação no hover ---
+const PERIOD_COLORS = { A: "#66C5E3", B: "#0077C8" };
 
-  // Ativa o primeiro botão por padrão
-  if (buttons.length > 0) {
-    buttons[0].classList.add("active");
+// Linhas [chave, A, B] ordenadas pelo período B (ou na ordem da categoria); top N nos rankings
+function comparisonRows(chart, metric, topN, order) {
+  let rows = chart.keys.map((key, i) => [key, chart.A[metric][i], chart.B[metric][i]]);
+  if (chart.kind === "line") {
+    return rows;
+  }
+  if (chart.ranked) {
+    rows = rows.filter((row) => row[2] !== null);
+  }
+  if (order !== "natural" || chart.ranked) {
+    rows.sort((a, b) => (order === "asc" ? a[2] - b[2] : b[2] - a[2]));
+  }
+  if (chart.ranked) {
+    rows = rows.slice(0, topN);
+    if (order === "natural") {
+      rows.sort((a, b) => String(a[0]).localeCompare(String(b[0])));
+    }
   }
+  return rows;
+}
+
+function comparisonFigure(chart, metric, suffix, topN, order, labels) {
+  const title = chart.title.replace("{n}", topN).replace("{suffix}", suffix);
+  const rows = comparisonRows(chart, metric, topN, order);
+  if (rows.length === 0) {
+    return emptyFigure(title + " (Sem dados)");
+  }
+  const keys = rows.map((row) => row[0]);
+  const customdata = rows.map((row) => {
+    const delta = row[1] === null || row[2] === null ? null : row[2] - row[1];
+    return [delta, delta === null || !row[1] ? null : (100 * delta) / row[1]];
+  });
+  const isLine = chart.kind === "line";
+  const data = ["A", "B"].map((period, p) => {
+    const values = rows.map((row) => row[p + 1]);
+    const hover = "<b>%{" + (isLine ? "x" : "y") + "}</b><br>" + labels[p] + ": %{" + (isLine ? "y" : "x") + ":.2f}" +
+      "<br>Δ (B - A): %{customdata[0]:+.2f} (%{customdata[1]:+.1f}%)<extra></extra>";
+    const trace = { name: labels[p], customdata: customdata, hovertemplate: hover };
+    if (isLine) {
+      return Object.assign(trace, { type: "scatter", mode: "lines+markers", x: keys, y: values,
+        line: { color: PERIOD_COLORS[period], width: 3 }, marker: { size: 6 } });
+    }
+    return Object.assign(trace, { type: "bar", orientation: "h", x: values, y: keys,
+      marker: { color: PERIOD_COLORS[period] } });
+  });
+  const valueAxis = { title: { text: suffix } };
+  // A primeira linha fica no topo (o plotly desenha a primeira categoria embaixo)
+  const keyAxis = { title: { text: chart.label } };
+  const layout = chartLayout("<b>" + title + "</b>", {
+    barmode: "group",
+    showlegend: true,
+    legend: { orientation: "h", y: -0.2 },
+    xaxis: isLine ? keyAxis : valueAxis,
+    yaxis: isLine ? valueAxis : Object.assign(keyAxis, { categoryorder: "array", categoryarray: keys.slice().reverse() }),
+  });
+  return { data: data, layout: layout };
 }
 
-// Função global para o Dash acessar
 window.dash_clientside = Object.assign({}, window.dash_clientside, {
-  setMetric: function (value) {
-    return value;
+  charts: {
+    render: function (aggregates, metric, topN, order, comparison) {
+      if (comparison) {
+        metric = comparison.suffixes[metric] ? metric : "avg_delay";
+        return comparison.order.map((id) =>
+          comparisonFigure(comparison.charts[id], metric, comparison.suffixes[metric], topN || 10,
+                           order || "desc", comparison.labels)
+        );
+      }
+      if (!aggregates) {
+        throw window.dash_clientside.PreventUpdate;
+      }
+      if (aggregates.error) {
+        return aggregates.order.map(() => emptyFigure(aggregates.error));
+      }
+      metric = aggregates.suffixes[metric] ? metric : "avg_delay";
+      const suffix = aggregates.suffixes[metric];
+      return aggregates.order.map((id) =>
+        renderChart(
+          aggregates.charts[id],
+          metric,
+          suffix,
+          topN || 10,
+          order || "desc",
+          id === "day-of-month-chart" ? aggregates.anomalies : null
+        )
+      );
+    },
   },
 });
@@ -1,226 +1,287 @@
 import dash
-from dash import Input, Output, State, callback
+from dash import ClientsideFunction, Input, Output, State, callback, html
 import plotly.express as px
-import pandas as pd
-from utils.data_processing import create_metric_data, criar_mapa_rotas_avancado
+from utils.data_processing import METRIC_AGGREGATIONS, create_metric_table
+from components.big_numbers import create_big_numbers
+from voos.anomalies import describe_anomaly
+from voos.comparison import compare_big_numbers, compare_routes, compare_series, period_label
+from voos.maps import desenhar_mapa_variacao
+from voos.metrics import METRIC_CONFIG
+from voos.jobs import JobManager
+from callbacks.heavy_jobs import heatmaps_job, map_job, share_snapshot
 
-def register_chart_callbacks(app, df):
+# Saídas pesadas calculadas em segundo plano: id do job -> (função, gráficos que preenche)
+HEAVY_OUTPUTS = {
+    'map': (map_job, ['map-chart']),
+    'heatmaps': (heatmaps_job, ['weekday-hour-heatmap', 'airport-day-heatmap']),
+}
+
+# Gráficos de distribuição montados no navegador (assets/custom.js, dash_clientside.charts):
+# id do gráfico, coluna de agrupamento, tipo, se é um ranking (top N), título e rótulo
+CHART_SPECS = [
+    {'id': 'top-airlines-chart', 'col': 'AIRLINE_Description', 'kind': 'bar', 'ranked': True, 'title': "🏢 Top {n} Companhias - {suffix}", 'label': "Companhia"},
+    {'id': 'top-cities-chart', 'col': 'ORIGIN_CITY', 'kind': 'bar', 'ranked': True, 'title': "🏙️ Top {n} Cidades de Origem - {suffix}", 'label': "Cidade"},
+    {'id': 'top-states-chart', 'col': 'ORIGIN_STATE', 'kind': 'bar', 'ranked': True, 'title': "🗺️ Top {n} Estados de Origem - {suffix}", 'label': "Estado"},
+    {'id': 'distance-chart', 'col': 'DISTANCE_BIN', 'kind': 'bar', 'ranked': False, 'title': "✈️ Distância vs {suffix}", 'label': "Faixa de Distância"},
+    {'id': 'day-of-month-chart', 'col': 'FL_DAY', 'kind': 'line', 'ranked': False, 'title': "📅 Dia do Mês vs {suffix}", 'label': "Dia do Mês"},
+    {'id': 'day-of-week-chart', 'col': 'DAY_OF_WEEK', 'kind': 'bar', 'ranked': False, 'title': "📆 Dia da Semana vs {suffix}", 'label': "Dia da Semana"},
+    {'id': 'hour-chart', 'col': 'TIME_HOUR', 'kind': 'line', 'ranked': False, 'title': "🕐 Hora do Dia vs {suffix}", 'label': "Hora"},
+    {'id': 'time-period-chart', 'col': 'TIME_PERIOD', 'kind': 'bar', 'ranked': False, 'title': "🌅 Período do Dia vs {suffix}", 'label': "Período"},
+]
+CHART_IDS = [spec['id'] for spec in CHART_SPECS]
+
+REQUIRED_COLUMNS = ['AIRLINE_Description', 'ORIGIN_CITY', 'ORIGIN_STATE', 'DISTANCE', 'FL_DAY', 'DAY_OF_WEEK',
+                    'TIME_HOUR', 'TIME_PERIOD', 'DELAY_OVERALL', 'DELAY', 'CANCELLED', 'DIVERTED']
+
+def _anomaly_days(anomalies, limit=5):
+    """Dias do mês com anomalias: dia, quantidade e descrição (até `limit` por dia)"""
+    if anomalies is None or anomalies.empty:
+        return []
+    by_day = anomalies.groupby(anomalies["DATE"].dt.day)
+    return [
+        {'day': int(day), 'count': int(len(group)),
+         'details': "<br>".join(describe_anomaly(row) for row in group.head(limit).itertuples())}
+        for day, group in by_day
+    ]
+
+def build_chart_aggregates(df, anomalies=None):
+    """Store compacto dos gráficos de distribuição
+
+    Para cada gráfico, as chaves do agrupamento (na ordem natural da dimensão) e um vetor
+    de valores por métrica do seletor; mais os sufixos de título e os dias anômalos.
+    """
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing_columns:
+        print(f"⚠️ Colunas faltando: {missing_columns}")
+        return {'order': CHART_IDS, 'error': f"Colunas faltando: {', '.join(missing_columns)}"}
+    
+    charts = {}
+    for spec in CHART_SPECS:
+        table = create_metric_table(df, spec['col'])
+        keys = table.index
+        if spec['kind'] == 'line':
+            keys = [int(key) for key in keys]
+        else:
+            keys = [str(key) for key in keys]
+        charts[spec['id']] = {
+            **{name: spec[name] for name in ('kind', 'ranked', 'title', 'label')},
+            'keys': keys,
+            'values': {metric: table[metric].round(3).tolist() for metric in table.columns},
+        }
+    return {
+        'order': CHART_IDS,
+        'charts': charts,
+        'suffixes': {metric: suffix for metric, (_, _, suffix) in METRIC_AGGREGATIONS.items()},
+        'anomalies': _anomaly_days(anomalies),
+    }
+
+def _period(start, end):
+    """Período (início, fim) de um DatePickerRange; com uma só data escolhida, o dia"""
+    return (start or end, end or start)
+
+def build_comparison_aggregates(cube, period_a, period_b):
+    """Store do modo de comparação: valores dos períodos A e B por gráfico e métrica
+
+    Cada período é a soma das fatias diárias do cubo (voos.comparison.compare_series);
+    as chaves seguem a ordem natural da dimensão, como em build_chart_aggregates.
+    """
+    charts = {}
+    for spec in CHART_SPECS:
+        tables = {metric: compare_series(cube, spec['col'], METRIC_CONFIG[metric], period_a, period_b)
+                  for metric in METRIC_AGGREGATIONS}
+        observed = tables['avg_delay'].index
+        keys = [key for key in cube.dimensions[spec['col']].keys if key in observed]
+        charts[spec['id']] = {
+            **{name: spec[name] for name in ('kind', 'ranked', 'title', 'label')},
+            'keys': [int(key) for key in keys] if spec['kind'] == 'line' else [str(key) for key in keys],
+            **{period: {metric: table[period].reindex(keys).round(3).tolist() for metric, table in tables.items()}
+               for period in ('A', 'B')},
+        }
+    return {
+        'order': CHART_IDS,
+        'charts': charts,
+        'suffixes': {metric: suffix for metric, (_, _, suffix) in METRIC_AGGREGATIONS.items()},
+        'labels': [period_label(period_a), period_label(period_b)],
+    }
+
+def _status_figure(message, height=400):
+    fig = px.scatter(title=message)
+    fig.update_layout(height=height, title_x=0.5, xaxis=dict(visible=False), yaxis=dict(visible=False))
+    return fig
+
+def register_chart_callbacks(app, store):
+    
+    # Pool de processos criado depois do carregamento: com fork, os workers já nascem
+    # com o dataset (rotas, cubo e anomalias) em memória
+    share_snapshot(store.current)
+    jobs = JobManager(max_workers=2)
     
-    # Callback principal simplificado
+    # Agregados completos (todas as métricas, todos os grupos) enviados uma vez por versão
+    # do dataset; troca de métrica, top N, ordenação e títulos são callbacks no navegador
     @app.callback(
-        [Output("top-airlines-chart", "figure"),
-         Output("top-cities-chart", "figure"),
-         Output("top-states-chart", "figure"),
-         Output("distance-chart", "figure"),
-         Output("day-of-month-chart", "figure"),
-         Output("day-of-week-chart", "figure"),
-         Output("hour-chart", "figure"),
-         Output("time-period-chart", "figure"),
-         Output("map-chart", "figure")],
-        [Input("metric-selector", "value")],
+        Output("chart-aggregates", "data"),
+        [Input("dataset-version", "data")],
         prevent_initial_call=False
     )
-    def update_charts(selected_metric):
-        print(f"Atualizando gráficos com métrica: {selected_metric}")
-        
-        # Usar métrica padrão se não houver seleção
-        if not selected_metric:
-            selected_metric = 'avg_delay'
-        
-        def create_simple_bar_chart(data, title, x_label, y_label):
-            """Cria um gráfico de barras simplificado"""
-            if len(data) == 0:
-                fig = px.bar(title=f"{title} (Sem dados)")
-                fig.update_layout(height=400, title_x=0.5)
-                return fig
-                
-            # Converter índices para string para evitar problemas
-            y_values = [str(x) for x in data.index]
-            
-            fig = px.bar(
-                x=data.values,
-                y=y_values,
-                orientation="h",
-                title=f"<b>{title}</b>",
-                labels={"x": x_label, "y": y_label},
-                color=data.values,
-                color_continuous_scale="RdYlGn_r"
-            )
-            
-            fig.update_layout(
-                height=400,
-                yaxis={"categoryorder": "total ascending"},
-                title_x=0.5,
-                title_font_size=16,
-                font=dict(size=12),
-                plot_bgcolor="rgba(0,0,0,0)",
-                paper_bgcolor="rgba(0,0,0,0)",
-                margin=dict(l=50, r=20, t=60, b=40),
-                showlegend=False
-            )
-            return fig
-
-        def create_line_chart_continuous(data, title, x_label, y_label, group_col):
-            """Cria um gráfico de linhas contínuo com agrupamento correto"""
-            if len(data) == 0:
-                fig = px.line(title=f"{title} (Sem dados)")
-                fig.update_layout(height=400, title_x=0.5)
-                return fig
-            
-            # Para gráficos temporais, garantir ordem correta
-            if group_col == 'FL_DAY':
-                # Ordenar por dia do mês
-                data = data.sort_index()
-                x_values = data.index
-            elif group_col == 'TIME_HOUR':
-                # Ordenar por hora
-                data = data.sort_index()
-                x_values = data.index
-            else:
-                x_values = data.index
-            
-            fig = px.line(
-                x=x_values,
-                y=data.values,
-                title=f"<b>{title}</b>",
-                labels={"x": x_label, "y": y_label}
-            )
-            
-            fig.update_traces(
-                line_color="#e74c3c", 
-                line_width=3, 
-                marker=dict(size=6),
-                mode="lines+markers"
-            )
-            
-            fig.update_layout(
-                height=400,
-                title_x=0.5,
-                title_font_size=16,
-                font=dict(size=12),
-                plot_bgcolor="rgba(0,0,0,0)",
-                paper_bgcolor="rgba(0,0,0,0)",
-                margin=dict(l=50, r=20, t=60, b=40),
-                xaxis=dict(
-                    showgrid=True,
-                    gridwidth=1,
-                    gridcolor='lightgray'
-                ),
-                yaxis=dict(
-                    showgrid=True,
-                    gridwidth=1,
-                    gridcolor='lightgray'
-                )
-            )
-            return fig
-
+    def update_chart_aggregates(data_version):
+        # Um snapshot por requisição: uma recarga no meio não mistura versões
+        data = store.current
         try:
-            # Verificar se as colunas necessárias existem no DataFrame
-            required_columns = ['AIRLINE_Description', 'ORIGIN_CITY', 'ORIGIN_STATE', 'DISTANCE', 
-                              'FL_DAY', 'DAY_OF_WEEK', 'TIME_HOUR', 'TIME_PERIOD', 'DELAY_OVERALL',
-                              'DELAY', 'CANCELLED', 'DIVERTED']
-            
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            if missing_columns:
-                print(f"⚠️ Colunas faltando: {missing_columns}")
-                error_fig = px.bar(title=f"Colunas faltando: {', '.join(missing_columns)}")
-                error_fig.update_layout(height=400, title_x=0.5)
-                return [error_fig] * 9
-            
-            # Top 10 Companhias
-            airlines_data, title_suffix = create_metric_data(df, "AIRLINE_Description", selected_metric)
-            airlines_fig = create_simple_bar_chart(
-                airlines_data.head(10),
-                f"🏢 Top 10 Companhias - {title_suffix}", 
-                title_suffix, 
-                "Companhia"
-            )
-            
-            # Top 10 Cidades
-            cities_data, _ = create_metric_data(df, "ORIGIN_CITY", selected_metric)
-            cities_fig = create_simple_bar_chart(
-                cities_data.head(10),
-                f"🏙️ Top 10 Cidades de Origem - {title_suffix}", 
-                title_suffix, 
-                "Cidade"
-            )
-            
-            # Top 10 Estados
-            states_data, _ = create_metric_data(df, "ORIGIN_STATE", selected_metric)
-            states_fig = create_simple_bar_chart(
-                states_data.head(10),
-                f"🗺️ Top 10 Estados de Origem - {title_suffix}", 
-                title_suffix, 
-                "Estado"
-            )
-            
-            # Distância
-            df_temp = df.copy()
-            df_temp["DISTANCE_BIN"] = pd.cut(df_temp["DISTANCE"], bins=10, precision=0)
-            distance_data, _ = create_metric_data(df_temp, "DISTANCE_BIN", selected_metric, observed=True)
-            distance_fig = create_simple_bar_chart(
-                distance_data,
-                f"✈️ Distância vs {title_suffix}", 
-                title_suffix, 
-                "Faixa de Distância"
-            )
-            
-            # Dia do Mês - Agora com linha contínua
-            day_data, _ = create_metric_data(df, "FL_DAY", selected_metric, observed=True)
-            day_fig = create_line_chart_continuous(
-                day_data,
-                f"📅 Dia do Mês vs {title_suffix}", 
-                "Dia do Mês", 
-                title_suffix,
-                "FL_DAY"
-            )
-            
-            # Dia da Semana (mantém como barras)
-            weekday_data, _ = create_metric_data(df, "DAY_OF_WEEK", selected_metric, observed=True)
-            weekday_fig = create_simple_bar_chart(
-                weekday_data,
-                f"📆 Dia da Semana vs {title_suffix}", 
-                title_suffix, 
-                "Dia da Semana"
-            )
-            
-            # Hora do Dia - Agora com linha contínua
-            hour_data, _ = create_metric_data(df, "TIME_HOUR", selected_metric, observed=True)
-            hour_fig = create_line_chart_continuous(
-                hour_data,
-                f"🕐 Hora do Dia vs {title_suffix}", 
-                "Hora", 
-                title_suffix,
-                "TIME_HOUR"
-            )
-            
-            # Período do Dia (mantém como barras)
-            period_data, _ = create_metric_data(df, "TIME_PERIOD", selected_metric, observed=True)
-            period_fig = create_simple_bar_chart(
-                period_data,
-                f"🌅 Período do Dia vs {title_suffix}", 
-                title_suffix, 
-                "Período"
-            )
-            
-            # Mapa
-            map_columns = ['ORIGIN_LAT', 'ORIGIN_LON', 'DEST_LAT', 'DEST_LON']
-            if all(col in df.columns for col in map_columns):
-                map_fig = criar_mapa_rotas_avancado(df, top_n=30, altura=600, selected_metric=selected_metric)
-            else:
-                map_fig = px.scatter(title="⚠️ Dados de coordenadas não disponíveis para o mapa")
-                map_fig.update_layout(height=600, title_x=0.5)
-            
-            print("✅ Gráficos atualizados com sucesso!")
-            return (airlines_fig, cities_fig, states_fig, distance_fig, 
-                    day_fig, weekday_fig, hour_fig, period_fig, map_fig)
-                    
+            aggregates = build_chart_aggregates(data.df, data.anomalies)
+            print(f"✅ Agregados dos gráficos enviados ({len(aggregates['charts'])} gráficos)")
+            return aggregates
         except Exception as e:
-            print(f"❌ Erro ao criar gráficos: {e}")
+            print(f"❌ Erro ao calcular agregados: {e}")
             import traceback
             traceback.print_exc()
-            
-            error_fig = px.bar(title=f"Erro: {str(e)}")
-            error_fig.update_layout(height=400, title_x=0.5)
-            return (error_fig, error_fig, error_fig, error_fig, 
-                    error_fig, error_fig, error_fig, error_fig, error_fig)
\ No newline at end of file
+            return {'order': CHART_IDS, 'error': f"Erro: {str(e)}"}
+    
+    # Modo de comparação: períodos A e B somados das fatias diárias do cubo (sem reler voos)
+    @app.callback(
+        [Output("comparison-aggregates", "data"),
+         Output("big-numbers", "children")],
+        [Input("compare-mode", "value"),
+         Input("period-a", "start_date"),
+         Input("period-a", "end_date"),
+         Input("period-b", "start_date"),
+         Input("period-b", "end_date"),
+         Input("dataset-version", "data")],
+        prevent_initial_call=True
+    )
+    def update_comparison(compare_mode, start_a, end_a, start_b, end_b, data_version):
+        data = store.current
+        if not compare_mode:
+            return None, create_big_numbers(data.df)
+        period_a, period_b = _period(start_a, end_a), _period(start_b, end_b)
+        labels = (period_label(period_a), period_label(period_b))
+        return (build_comparison_aggregates(data.cube, period_a, period_b),
+                create_big_numbers(data.df, compare_big_numbers(data.cube, period_a, period_b), labels))
+    
+    # Mapa das rotas de maior variação (pares data x rota de DailyRoutes) no lugar do mapa de rotas
+    @app.callback(
+        [Output("comparison-map", "figure"),
+         Output("comparison-map", "style"),
+         Output("map-chart", "style")],
+        [Input("compare-mode", "value"),
+         Input("period-a", "start_date"),
+         Input("period-a", "end_date"),
+         Input("period-b", "start_date"),
+         Input("period-b", "end_date"),
+         Input("metric-selector", "value"),
+         Input("dataset-version", "data")],
+        prevent_initial_call=True
+    )
+    def update_comparison_map(compare_mode, start_a, end_a, start_b, end_b, selected_metric, data_version):
+        if not compare_mode:
+            return dash.no_update, {'display': 'none'}, {}
+        data = store.current
+        config = METRIC_CONFIG[selected_metric or 'avg_delay']
+        period_a, period_b = _period(start_a, end_a), _period(start_b, end_b)
+        rotas = compare_routes(data.daily_routes, config, period_a, period_b)
+        figure = desenhar_mapa_variacao(rotas, config, (period_label(period_a), period_label(period_b)), altura=600)
+        return figure, {}, {'display': 'none'}
+    
+    app.clientside_callback(
+        ClientsideFunction(namespace='charts', function_name='render'),
+        [Output(chart_id, "figure") for chart_id in CHART_IDS],
+        [Input("chart-aggregates", "data"),
+         Input("metric-selector", "value"),
+         Input("top-n-selector", "value"),
+         Input("sort-order", "value"),
+         Input("comparison-aggregates", "data")]
+    )
+    
+    # --- Saídas pesadas: jobs em segundo plano ---
+    
+    # Dispara (ou reaproveita) os jobs da métrica/versão; pedidos iguais compartilham o job
+    @app.callback(
+        [Output("heavy-jobs", "data"),
+         Output("heavy-jobs-interval", "disabled")],
+        [Input("metric-selector", "value"),
+         Input("dataset-version", "data")],
+        prevent_initial_call=False
+    )
+    def start_heavy_jobs(selected_metric, data_version):
+        selected_metric = selected_metric or 'avg_delay'
+        data = store.current
+        keys = {}
+        for name, (job, _) in HEAVY_OUTPUTS.items():
+            keys[name] = jobs.submit((name, selected_metric, data.version), job, store.path, data.version, selected_metric)
+        return {name: list(key) for name, key in keys.items()}, False
+    
+    # Acompanha os jobs: progresso, cancelamento, erro e resultado
+    @app.callback(
+        [Output("map-chart", "figure"),
+         Output("weekday-hour-heatmap", "figure"),
+         Output("airport-day-heatmap", "figure"),
+         Output("heavy-jobs-progress", "value"),
+         Output("heavy-jobs-status", "children"),
+         Output("heavy-jobs-interval", "disabled", allow_duplicate=True)],
+        [Input("heavy-jobs-interval", "n_intervals")],
+        [State("heavy-jobs", "data")],
+        prevent_initial_call=True
+    )
+    def poll_heavy_jobs(n_intervals, keys):
+        if not keys:
+            return [dash.no_update] * 5 + [True]
+        
+        figures = {}
+        fractions, messages, finished = [], [], True
+        for name, key in keys.items():
+            job, outputs = HEAVY_OUTPUTS[name]
+            status = jobs.status(tuple(key))
+            fractions.append(status['fraction'])
+            if status['state'] == 'done':
+                result = jobs.result(tuple(key))
+                if name == 'heatmaps':
+                    result = [result['weekday_hour'], result['airport_day']]
+                else:
+                    result = [result]
+                figures.update(zip(outputs, result))
+            elif status['state'] in ('error', 'cancelled', 'unknown'):
+                label = 'Cancelado' if status['state'] == 'cancelled' else f"Erro: {status['message']}"
+                figures.update({output: _status_figure(f"⚠️ {label}") for output in outputs})
+                messages.append(f"{name}: {label}")
+            else:
+                finished = False
+                messages.append(f"{name}: {status['message']} ({status['fraction']:.0%})")
+        
+        ordered = [figures.get(output, dash.no_update) for output in ['map-chart', 'weekday-hour-heatmap', 'airport-day-heatmap']]
+        progress = str(round(100 * sum(fractions) / len(fractions)))
+        return ordered + [progress, ' | '.join(messages) or '✅ Mapa e mapas de calor atualizados', finished]
+    
+    @app.callback(
+        Output("heavy-jobs-status", "children", allow_duplicate=True),
+        [Input("cancel-heavy-jobs", "n_clicks")],
+        [State("heavy-jobs", "data")],
+        prevent_initial_call=True
+    )
+    def cancel_heavy_jobs(n_clicks, keys):
+        cancelled = [name for name, key in (keys or {}).items() if jobs.cancel(tuple(key))]
+        return f"Cancelando: {', '.join(cancelled)}" if cancelled else dash.no_update
+    
+    # --- Recarga do dataset: thread em segundo plano + troca atômica do snapshot ---
+    @app.callback(
+        Output("dataset-status", "children"),
+        [Input("refresh-data", "n_clicks")],
+        prevent_initial_call=True
+    )
+    def refresh_dataset(n_clicks):
+        started = store.refresh_async()
+        return '🔄 Recarregando dados em segundo plano...' if started else '🔄 Recarga já em andamento...'
+    
+    @app.callback(
+        [Output("dataset-version", "data"),
+         Output("dataset-status", "children", allow_duplicate=True)],
+        [Input("dataset-interval", "n_intervals")],
+        [State("dataset-version", "data")],
+        prevent_initial_call=True
+    )
+    def watch_dataset(n_intervals, current_version):
+        if store.refreshing:
+            return dash.no_update, dash.no_update
+        if store.error:
+            return dash.no_update, f"❌ Erro ao recarregar: {store.error}"
+        if store.current.version != current_version:
+            return store.current.version, f"✅ Dados atualizados ({len(store.current.df):,} registros)"
+        return dash.no_update, dash.no_update
\ No newline at end of file
@@ -0,0 +1,59 @@
+from urllib.parse import urlencode
+from flask import Response, abort, request
+from dash import Input, Output
+from voos.charts import DISTRIBUTION_CHARTS
+from voos.export import EXPORT_FORMATS, FILTER_COLUMNS, chart_aggregate, filter_rows, iter_export, metric_column
+from voos.metrics import METRIC_CONFIG
+
+CHART_IDS = [spec["id"] for spec in DISTRIBUTION_CHARTS]
+
+def _stream(chunks, filename, fmt):
+    """Resposta HTTP em partes (Transfer-Encoding: chunked): cada bloco sai assim que é gerado"""
+    return Response(
+        chunks,
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+def register_export_routes(app, store):
+    server = app.server
+    
+    @server.route("/export/<what>")
+    def export(what):
+        fmt = request.args.get("format", "csv")
+        if fmt not in EXPORT_FORMATS or what not in ("rows", "aggregate"):
+            abort(404)
+        
+        # Snapshot fixado na requisição: uma recarga durante o download não troca os dados
+        data = store.current
+        filters = {name: request.args.getlist(name) for name in FILTER_COLUMNS}
+        rows = filter_rows(data.df, request.args.get("start"), request.args.get("end"), **filters)
+        
+        if what == "rows":
+            return _stream(iter_export(data.df, fmt, rows), f"voos.{fmt}", fmt)
+        
+        chart = request.args.get("chart", CHART_IDS[0])
+        metric = request.args.get("metric", "avg_delay")
+        # Só métricas cuja coluna existe no dataset do Dash (ex.: sem ORIGIN_LOAD_1H, sem airport_load)
+        if chart not in CHART_IDS or metric not in METRIC_CONFIG or metric_column(metric) not in data.df.columns:
+            abort(404)
+        # Com filtros, só as linhas selecionadas; sem filtros, o percentil vem dos sketches do cubo
+        if len(rows) < len(data.df):
+            table = chart_aggregate(data.df, chart, metric, rows)
+        else:
+            table = chart_aggregate(data.df, chart, metric, cube=data.cube)
+        return _stream(iter_export(table, fmt), f"{chart}_{metric}.{fmt}", fmt)
+    
+    @app.callback(
+        [Output("export-aggregate-link", "href"),
+         Output("export-rows-link", "href")],
+        [Input("metric-selector", "value"),
+         Input("export-chart", "value"),
+         Input("export-format", "value"),
+         Input("export-airline", "value")]
+    )
+    def update_export_links(selected_metric, chart, fmt, airlines):
+        filters = [("airline", airline) for airline in airlines or []]
+        aggregate = urlencode([("chart", chart), ("metric", selected_metric or "avg_delay"), ("format", fmt)] + filters)
+        rows = urlencode([("format", fmt)] + filters)
+        return f"/export/aggregate?{aggregate}", f"/export/rows?{rows}"
@@ -0,0 +1,38 @@
+from utils.data_processing import criar_mapa_rotas_avancado
+from utils.dataset_store import build_snapshot
+from voos.charts import build_heatmap_figures
+from voos.maps import adicionar_marcadores_anomalias
+
+# Snapshot do dataset dentro do worker. Com fork, os workers herdam o que o processo
+# principal compartilhou antes de criá-los; numa versão nova, o worker carrega a sua.
+_snapshot = None
+
+
+def share_snapshot(snapshot):
+    global _snapshot
+    _snapshot = snapshot
+
+
+def _worker_snapshot(report, path, version):
+    global _snapshot
+    if _snapshot is None or _snapshot.version != version:
+        report(0.05, 'Carregando dataset')
+        _snapshot = build_snapshot(path, version)
+    return _snapshot
+
+
+def map_job(report, path, version, selected_metric):
+    """Mapa de rotas (top-N do acumulador) com os aeroportos de dias anômalos"""
+    data = _worker_snapshot(report, path, version)
+    report(0.3, 'Calculando rotas')
+    map_fig = criar_mapa_rotas_avancado(data.df, top_n=30, altura=600, selected_metric=selected_metric, routes=data.routes)
+    report(0.8, 'Marcando anomalias')
+    adicionar_marcadores_anomalias(map_fig, data.anomaly_points)
+    return map_fig
+
+
+def heatmaps_job(report, path, version, selected_metric):
+    """Mapas de calor dia da semana x hora e aeroporto x dia"""
+    data = _worker_snapshot(report, path, version)
+    report(0.3, 'Calculando mapas de calor')
+    return build_heatmap_figures(data.df, selected_metric, data.cube)
@@ -1,25 +1,41 @@
 from dash import html
 from utils.data_processing import calculate_big_numbers
 
-def create_big_numbers(df):
-    big_numbers = calculate_big_numbers(df)
+FORMATS = {
+    'total_flights': lambda value: f"{value:,}",
+    'avg_delay': lambda value: f"{value:.1f} min",
+    'delay_percentage': lambda value: f"{value:.1f}%",
+    'cancelled_percentage': lambda value: f"{value:.1f}%",
+    'diverted_percentage': lambda value: f"{value:.1f}%",
+}
+
+def create_big_numbers(df, compared=None, labels=None):
+    """Cards do resumo; com `compared` ({chave: (A, B)}), mostram o período B e a variação"""
+    if compared is None:
+        big_numbers, deltas = calculate_big_numbers(df), {}
+    else:
+        big_numbers = {key: after for key, (_, after) in compared.items()}
+        deltas = {key: _delta(before, after, FORMATS[key]) for key, (before, after) in compared.items()}
+    title = "📊 Resumo Geral" if labels is None else f"📊 Resumo Geral — {labels[1]} vs {labels[0]}"
     
     return html.Div([
-        html.H2("📊 Resumo Geral", className="section-title"),
+        html.H2(title, className="section-title"),
         
         # Primeira linha - Total e Média de Atraso
         html.Div([
             create_number_card(
                 "✈️", 
-                f"{big_numbers['total_flights']:,}", 
+                FORMATS['total_flights'](big_numbers['total_flights']), 
                 "Total de Voos", 
-                "blue"
+                "blue",
+                deltas.get('total_flights')
             ),
             create_number_card(
                 "⏱️", 
-                f"{big_numbers['avg_delay']:.1f} min", 
+                FORMATS['avg_delay'](big_numbers['avg_delay']), 
                 "Atraso Médio", 
-                "red"
+                "red",
+                deltas.get('avg_delay')
             ),
         ], className="big-numbers-row first-row"),
         
@@ -27,26 +43,34 @@ def create_big_numbers(df):
         html.Div([
             create_number_card(
                 "⚠️", 
-                f"{big_numbers['delay_percentage']:.1f}%", 
+                FORMATS['delay_percentage'](big_numbers['delay_percentage']), 
                 "Voos com Atraso", 
-                "orange"
+                "orange",
+                deltas.get('delay_percentage')
             ),
             create_number_card(
                 "❌", 
-                f"{big_numbers['cancelled_percentage']:.1f}%", 
+                FORMATS['cancelled_percentage'](big_numbers['cancelled_percentage']), 
                 "Voos Cancelados", 
-                "cancelled"
+                "cancelled",
+                deltas.get('cancelled_percentage')
             ),
             create_number_card(
                 "🔄", 
-                f"{big_numbers['diverted_percentage']:.1f}%", 
+                FORMATS['diverted_percentage'](big_numbers['diverted_percentage']), 
                 "Voos Desviados", 
-                "diverted"
+                "diverted",
+                deltas.get('diverted_percentage')
             ),
         ], className="big-numbers-row second-row"),
     ], className="big-numbers-container")
 
-def create_number_card(icon, value, label, color_type):
+def _delta(before, after, fmt):
+    """Variação B - A no formato do card, com a relativa quando A não é zero"""
+    relative = f" ({(after - before) / before:+.1%})" if before else ""
+    return ("+" if after >= before else "-") + fmt(abs(after - before)) + relative
+
+def create_number_card(icon, value, label, color_type, delta=None):
     color_classes = {
         "blue": "card-blue",
         "red": "card-red", 
@@ -61,6 +85,7 @@ def create_number_card(icon, value, label, color_type):
         html.Div([
             html.H3(icon, className="card-icon"),
             html.H3(value, className="card-value"),
-            html.P(label, className="card-label")
+            html.P(label, className="card-label"),
+            html.P(f"Δ vs A: {delta}", className="card-delta") if delta else None
         ], className="card-content")
     ], className=card_class)
\ No newline at end of file
@@ -1,5 +1,7 @@
+from datetime import timedelta
 from dash import dcc, html
 import plotly.express as px
+from voos.charts import DISTRIBUTION_CHARTS
 
 def create_metric_selector():
     """Cria os botões de seleção de métrica lado a lado"""
@@ -19,6 +21,58 @@ def create_metric_selector():
         )
     ], className="metric-selector-wrapper")
 
+def create_comparison_panel(df):
+    """Chave do modo de comparação e os dois períodos (A = primeira metade, B = segunda)"""
+    first_day, last_day = df['FL_DATE'].min().date(), df['FL_DATE'].max().date()
+    middle = first_day + (last_day - first_day) / 2
+    pickers = []
+    for picker_id, label, start, end in (('period-a', "Período A:", first_day, middle),
+                                         ('period-b', "Período B:", min(middle + timedelta(days=1), last_day), last_day)):
+        pickers += [
+            html.Label(label, className="metric-selector-label"),
+            dcc.DatePickerRange(
+                id=picker_id,
+                min_date_allowed=first_day,
+                max_date_allowed=last_day,
+                start_date=start,
+                end_date=end,
+                display_format='DD/MM/YYYY'
+            ),
+        ]
+    return html.Div([
+        dcc.Checklist(
+            id='compare-mode',
+            options=[{'label': '🔀 Comparar dois períodos', 'value': 'on'}],
+            value=[],
+            inline=True
+        ),
+        *pickers,
+        html.Span("Métricas gerais, distribuições e mapa de rotas mostram o período B com a variação em relação ao A.",
+                  className="jobs-status"),
+    ], className="jobs-panel comparison-panel")
+
+def create_chart_controls():
+    """Top N dos rankings e ordenação das barras (aplicados no navegador)"""
+    return html.Div([
+        html.Label("Top N:", className="metric-selector-label"),
+        html.Div(dcc.Slider(
+            id='top-n-selector',
+            min=5, max=30, step=5, value=10,
+            marks={n: str(n) for n in range(5, 31, 5)}
+        ), className="top-n-slider"),
+        html.Label("Ordenar:", className="metric-selector-label"),
+        dcc.RadioItems(
+            id='sort-order',
+            options=[
+                {'label': '⬇️ Maior primeiro', 'value': 'desc'},
+                {'label': '⬆️ Menor primeiro', 'value': 'asc'},
+                {'label': '🔤 Ordem da categoria', 'value': 'natural'}
+            ],
+            value='desc',
+            inline=True
+        ),
+    ], className="jobs-panel chart-controls")
+
 def create_charts_container():
     """Container para todos os gráficos"""
     return html.Div([
@@ -45,11 +99,57 @@ def create_charts_container():
             html.Div([dcc.Graph(id='hour-chart')], className='chart-column'),
             html.Div([dcc.Graph(id='time-period-chart')], className='chart-column'),
         ], className='charts-row'),
+        
+        # Linha 5 - Mapas de calor
+        html.Div([dcc.Graph(id='weekday-hour-heatmap')], className='charts-row'),
+        html.Div([dcc.Graph(id='airport-day-heatmap')], className='charts-row'),
     ], id='charts-container')
 
+def create_export_panel(df):
+    """Download (CSV/XLSX, em fluxo) do agregado de um gráfico ou das linhas filtradas"""
+    airlines = sorted(df['AIRLINE_Description'].dropna().unique()) if 'AIRLINE_Description' in df.columns else []
+    return html.Div([
+        html.Label("Exportar:", className="metric-selector-label"),
+        dcc.Dropdown(
+            id='export-chart',
+            options=[{'label': spec['label'], 'value': spec['id']} for spec in DISTRIBUTION_CHARTS],
+            value=DISTRIBUTION_CHARTS[0]['id'],
+            clearable=False,
+            className="export-dropdown"
+        ),
+        dcc.Dropdown(
+            id='export-airline',
+            options=[{'label': airline, 'value': airline} for airline in airlines],
+            multi=True,
+            placeholder="Todas as companhias",
+            className="export-dropdown"
+        ),
+        dcc.RadioItems(
+            id='export-format',
+            options=[{'label': 'CSV', 'value': 'csv'}, {'label': 'Excel', 'value': 'xlsx'}],
+            value='csv',
+            inline=True
+        ),
+        html.A("⬇️ Agregado do gráfico", id='export-aggregate-link', href="", className="jobs-button"),
+        html.A("⬇️ Voos filtrados", id='export-rows-link', href="", className="jobs-button"),
+    ], className="jobs-panel export-panel")
+
+def create_jobs_panel():
+    """Progresso dos cálculos em segundo plano (mapa e mapas de calor) e recarga dos dados"""
+    return html.Div([
+        html.Progress(id='heavy-jobs-progress', value='0', max='100'),
+        html.Span(id='heavy-jobs-status', className="jobs-status"),
+        html.Button("⏹️ Cancelar", id='cancel-heavy-jobs', className="jobs-button"),
+        html.Button("🔄 Recarregar dados", id='refresh-data', className="jobs-button"),
+        html.Span(id='dataset-status', className="jobs-status"),
+    ], className="jobs-panel")
+
 def create_map_container():
     """Container para o mapa"""
     return html.Div([
         html.H2("🗺️ Visualização Geográfica", className="section-title"),
-        dcc.Graph(id='map-chart')
+        create_jobs_panel(),
+        dcc.Graph(id='map-chart'),
+        # Rotas de maior variação entre os períodos (só no modo de comparação)
+        dcc.Graph(id='comparison-map', style={'display': 'none'})
     ], className="map-container")
\ No newline at end of file
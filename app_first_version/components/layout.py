@@ -1,21 +1,35 @@
 from dash import html, dcc
 from components.header import create_header
 from components.big_numbers import create_big_numbers
-from components.charts import create_metric_selector, create_charts_container, create_map_container
+from components.charts import create_comparison_panel, create_metric_selector, create_chart_controls, create_charts_container, create_export_panel, create_map_container
 
-def create_layout(df):
+def create_layout(df, data_version=None):
     return html.Div([
         create_header(),
-        create_big_numbers(df),
+        create_comparison_panel(df),
+        html.Div(create_big_numbers(df), id='big-numbers'),
         
         html.Div([
             html.H2("📈 Análise de Distribuições", className="section-title"),
             create_metric_selector(),
+            create_chart_controls(),
+            create_export_panel(df),
             create_charts_container(),
         ], className="charts-section"),
         
         create_map_container(),
         
+        # Agregados dos gráficos de distribuição (renderizados no navegador)
+        dcc.Store(id='chart-aggregates'),
+        # Períodos A e B do modo de comparação (None com o modo desligado)
+        dcc.Store(id='comparison-aggregates'),
+        
+        # Jobs em segundo plano (chaves + polling) e versão do dataset em uso
+        dcc.Store(id='heavy-jobs'),
+        dcc.Interval(id='heavy-jobs-interval', interval=500, disabled=True),
+        dcc.Store(id='dataset-version', data=data_version),
+        dcc.Interval(id='dataset-interval', interval=5000),
+        
         # Componente hidden para callbacks (removido, não é mais necessário)
         # dcc.Store(id='selected-metric', data='avg_delay')
         
@@ -1,15 +1,27 @@
 import pandas as pd
-import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from math import atan2, degrees
+from voos.airports import describe_coverage, get_airport_index
+from voos.geometry import add_route_geometry, initial_bearing
+from voos.schema import describe_validation, read_validated_csv
 
 def load_and_process_data(filepath):
     """Carrega e processa os dados"""
-    df = pd.read_csv(filepath)
-    
-    if 'FL_DATE' in df.columns:
-        df['FL_DATE'] = pd.to_datetime(df['FL_DATE'])
+    # Validação do esquema na leitura: datas, categorias ordenadas (dias da semana) e
+    # tipos já finais; linhas inválidas vão para o arquivo de quarentena
+    df, validation = read_validated_csv(filepath)
+    if describe_validation(validation):
+        print(describe_validation(validation))
+
+    # Coordenadas pelo índice de aeroportos (gather por código IATA), com relatório de cobertura
+    if {'ORIGIN', 'DEST'} <= set(df.columns):
+        df, coverage = get_airport_index().attach_coordinates(df)
+        if describe_coverage(coverage):
+            print(describe_coverage(coverage))
+
+    # Faixas de distância calculadas uma vez na carga (gráfico e exportação usam as mesmas)
+    if 'DISTANCE' in df.columns:
+        df['DISTANCE_BIN'] = pd.cut(df['DISTANCE'], bins=10, precision=0)
     
     return df
 
@@ -49,17 +61,30 @@ def create_metric_data(df, group_col, metric, observed=True):
     
     return data, title_suffix
 
+# Métricas do seletor: coluna, agregação e sufixo do título (mesmas de create_metric_data)
+METRIC_AGGREGATIONS = {
+    'avg_delay': ('DELAY_OVERALL', 'mean', "Atraso Médio (min)"),
+    'delay_count': ('DELAY', 'sum', "Quantidade de Atrasos"),
+    'cancelled_count': ('CANCELLED', 'sum', "Quantidade de Cancelamentos"),
+    'diverted_count': ('DIVERTED', 'sum', "Quantidade de Desvios"),
+}
+
+def create_metric_table(df, group_col, observed=True):
+    """Todas as métricas do seletor por grupo em um único groupby (uma coluna por métrica)"""
+    columns = sorted({col for col, _, _ in METRIC_AGGREGATIONS.values()})
+    grouped = df[columns].groupby(df[group_col], observed=observed)
+    return pd.DataFrame({metric: grouped[col].agg(agg) for metric, (col, agg, _) in METRIC_AGGREGATIONS.items()})
+
 def calcular_direcao(lat1, lon1, lat2, lon2):
-    """Calcula a direção entre dois pontos em graus"""
-    d_lon = lon2 - lon1
-    x = np.cos(np.radians(lat2)) * np.sin(np.radians(d_lon))
-    y = np.cos(np.radians(lat1)) * np.sin(np.radians(lat2)) - np.sin(np.radians(lat1)) * np.cos(np.radians(lat2)) * np.cos(np.radians(d_lon))
-    direcao = degrees(atan2(x, y))
-    return (direcao + 360) % 360
+    """Calcula a direção entre dois pontos em graus (aceita arrays)"""
+    return initial_bearing(lat1, lon1, lat2, lon2)
 
-def criar_mapa_rotas_avancado(df, top_n=30, altura=800, selected_metric='avg_delay'):
+def criar_mapa_rotas_avancado(df, top_n=30, altura=800, selected_metric='avg_delay', routes=None):
     """
     Cria um mapa interativo das rotas de voo com setas - VERSÃO MELHORADA
+
+    Com `routes` (voos.topk.RouteAccumulator) o top-N e a geometria dos arcos
+    saem dos acumuladores, já calculados uma vez por rota.
     """
     
     metric_config = {
@@ -95,39 +120,37 @@ def criar_mapa_rotas_avancado(df, top_n=30, altura=800, selected_metric='avg_del
     
     config = metric_config[selected_metric]
     
-    # Agrupar por rota
-    rotas_data = (
-        df.groupby(["ORIGIN_CITY", "DEST_CITY", 
-                   "ORIGIN_LAT", "ORIGIN_LON", "DEST_LAT", "DEST_LON"], 
-                  as_index=False)
-        .agg({
-            config['col']: config['agg'],
-            'TIME_HOUR': 'mean',
-            'FL_DATE': 'count'
-        })
-        .rename(columns={'FL_DATE': 'TOTAL_VOOS'})
-        .sort_values(by=config['col'], ascending=False)
-        .head(top_n)
-        .dropna(subset=['ORIGIN_LAT', 'ORIGIN_LON', 'DEST_LAT', 'DEST_LON'])
-    )
+    if routes is not None:
+        rotas_data = routes.top(config, top_n)
+    else:
+        # Agrupar por rota
+        rotas_data = (
+            df.groupby(["ORIGIN_CITY", "DEST_CITY", 
+                       "ORIGIN_LAT", "ORIGIN_LON", "DEST_LAT", "DEST_LON"], 
+                      as_index=False)
+            .agg({
+                config['col']: config['agg'],
+                'TIME_HOUR': 'mean',
+                'FL_DATE': 'count'
+            })
+            .rename(columns={'FL_DATE': 'TOTAL_VOOS'})
+            .sort_values(by=config['col'], ascending=False)
+            .head(top_n)
+            .dropna(subset=['ORIGIN_LAT', 'ORIGIN_LON', 'DEST_LAT', 'DEST_LON'])
+        )
+        # Arcos de círculo máximo, ponto médio e direção, vetorizados
+        rotas_data = add_route_geometry(rotas_data)
     
     if rotas_data.empty:
         print("⚠️ Nenhuma rota válida encontrada para o mapa")
         return go.Figure()
     
-    # Calcular ponto médio e direção
-    rotas_data['MID_LAT'] = (rotas_data['ORIGIN_LAT'] + rotas_data['DEST_LAT']) / 2
-    rotas_data['MID_LON'] = (rotas_data['ORIGIN_LON'] + rotas_data['DEST_LON']) / 2
-    rotas_data['DIRECAO'] = rotas_data.apply(
-        lambda x: calcular_direcao(x['ORIGIN_LAT'], x['ORIGIN_LON'], x['DEST_LAT'], x['DEST_LON']), 
-        axis=1
-    )
-    
     # Normalizar métricas
     min_metrica = rotas_data[config['col']].min()
     max_metrica = rotas_data[config['col']].max()
     
     fig = go.Figure()
+    cores_setas = []
     
     # Adicionar cada rota ao mapa
     for idx, rota in rotas_data.iterrows():
@@ -142,15 +165,15 @@ def criar_mapa_rotas_avancado(df, top_n=30, altura=800, selected_metric='avg_del
         intensidade_cor = (hora_media % 24) / 24
         cor = px.colors.sample_colorscale("Blues", [intensidade_cor])[0]
         
-        # Linha da rota
+        # Linha da rota (arco de círculo máximo)
         fig.add_trace(go.Scattergeo(
-            lon=[rota['ORIGIN_LON'], rota['DEST_LON']],
-            lat=[rota['ORIGIN_LAT'], rota['DEST_LAT']],
+            lon=rota['ARC_LON'],
+            lat=rota['ARC_LAT'],
             mode='lines',
             line=dict(width=intensidade_linha, color=cor),
             name=f"{rota['ORIGIN_CITY']} → {rota['DEST_CITY']}",
             text=f"{rota['ORIGIN_CITY']} → {rota['DEST_CITY']}",
-            customdata=[[rota[config['col']], rota['TIME_HOUR'], rota['TOTAL_VOOS']]],
+            customdata=[[rota[config['col']], rota['TIME_HOUR'], rota['TOTAL_VOOS'], rota['DIRECAO']]] * len(rota['ARC_LAT']),
             hovertemplate=(
                 "<b>%{text}</b><br><br>"
                 f"<b>{config['title']}:</b> %{{customdata[0]:.1f}} {config['unit']}<br>"
@@ -162,21 +185,23 @@ def criar_mapa_rotas_avancado(df, top_n=30, altura=800, selected_metric='avg_del
             showlegend=False
         ))
         
-        # Seta no ponto médio
-        fig.add_trace(go.Scattergeo(
-            lon=[rota['MID_LON']],
-            lat=[rota['MID_LAT']],
-            mode='markers',
-            marker=dict(
-                size=10,
-                color=cor,
-                symbol='arrow',
-                angle=rota['DIRECAO'],
-                line=dict(width=1, color='white')
-            ),
-            hoverinfo='skip',
-            showlegend=False
-        ))
+        cores_setas.append(cor)
+    
+    # Setas no ponto médio de cada arco (uma única trace)
+    fig.add_trace(go.Scattergeo(
+        lon=rotas_data['MID_LON'],
+        lat=rotas_data['MID_LAT'],
+        mode='markers',
+        marker=dict(
+            size=10,
+            color=cores_setas,
+            symbol='arrow',
+            angle=rotas_data['DIRECAO'],
+            line=dict(width=1, color='white')
+        ),
+        hoverinfo='skip',
+        showlegend=False
+    ))
     
     # Marcadores de origem
     fig.add_trace(go.Scattergeo(
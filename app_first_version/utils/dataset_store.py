@@ -0,0 +1,59 @@
+import threading
+from collections import namedtuple
+
+from utils.data_processing import load_and_process_data
+from voos.aggregates import FlightCube
+from voos.anomalies import airport_anomaly_points, detect_anomalies
+from voos.comparison import DailyRoutes
+from voos.metrics import dataset_version
+from voos.topk import RouteAccumulator
+
+# Tudo que os callbacks leem de uma versão do dataset; trocado de uma vez só
+Snapshot = namedtuple('Snapshot', ['version', 'df', 'routes', 'cube', 'anomalies', 'anomaly_points', 'daily_routes'])
+
+
+def build_snapshot(path, version=None):
+    """Carrega o CSV e monta as estruturas derivadas (rotas, cubo, anomalias, rotas diárias)"""
+    version = version or dataset_version(path)
+    df = load_and_process_data(path)
+    # Todas as dimensões dos gráficos: o modo de comparação lê os períodos do cubo
+    cube = FlightCube.build(df)
+    anomalies = detect_anomalies(cube)
+    return Snapshot(version, df, RouteAccumulator.from_frame(df), cube, anomalies, airport_anomaly_points(anomalies),
+                    DailyRoutes.build(df))
+
+
+class DatasetStore:
+    """Versão atual do dataset; a recarga roda em uma thread e troca o snapshot atomicamente
+
+    Os callbacks leem `store.current` uma vez e trabalham sobre esse snapshot: uma troca
+    durante a requisição não mistura versões, e ninguém espera pela recarga.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.current = build_snapshot(path)
+        self.error = None
+        self._refreshing = threading.Lock()
+
+    def refresh_async(self):
+        """Recarrega em segundo plano se o arquivo mudou; devolve False se já há uma recarga"""
+        if not self._refreshing.acquire(blocking=False):
+            return False
+        threading.Thread(target=self._refresh, daemon=True).start()
+        return True
+
+    def _refresh(self):
+        try:
+            version = dataset_version(self.path)
+            if version != self.current.version:
+                self.current = build_snapshot(self.path, version)  # troca de uma referência
+            self.error = None
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            self._refreshing.release()
+
+    @property
+    def refreshing(self):
+        return self._refreshing.locked()
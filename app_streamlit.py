@@ -1,586 +1,358 @@
-
 import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from math import atan2, degrees
 import warnings
+from datetime import timedelta
+from functools import partial
 warnings.filterwarnings("ignore")
 
+# Funções de cálculo e de figuras ficam em módulos importados: são definidas
+# uma única vez por processo, e não reexecutadas a cada rerun do script
+from voos.metrics import METRIC_CONFIG, METRIC_LABELS, dataset_version, calculate_big_numbers
+from voos.aggregates import DELAY_CAUSES, FlightCube, cause_breakdown
+from voos.topk import RouteAccumulator
+from voos.charts import DISTRIBUTION_CHARTS, build_comparison_figures, build_distribution_figures, build_heatmap_figures, create_cause_breakdown_chart, create_congestion_chart, create_simple_bar_chart
+from voos.maps import criar_mapa_fluxo, criar_mapa_hubs, criar_mapa_rotas_avancado, desenhar_mapa_rotas, desenhar_mapa_variacao
+from voos.comparison import DailyRoutes, compare_big_numbers, compare_routes, period_label
+from voos.hierarchy import HIERARCHY, LEVEL_LABELS, HierarchyRollup
+from voos.congestion import TIME_COLUMNS, AirportTimeline
+from voos.network import AirportNetwork
+from voos.anomalies import airport_anomaly_points, detect_anomalies
+from voos.dataset import DF_VIEW_PATH
+from voos.build import HIERARCHY_PATH
+from voos.store import FlightStore
+from voos.raster import LEVELS, FlowRaster
+from voos.export import EXPORT_FORMATS, chart_aggregate, export_tempfile
+
 # --- Configurações da Página Streamlit ---
 st.set_page_config(layout="wide", page_title="Dashboard de Análise de Voos")
 
 # --- Carregamento e Pré-processamento de Dados ---
+# Um único dataset por processo (cache_resource): colunas imutáveis entregues a todas as
+# sessões sem cópia nem desserialização a cada rerun; filtros são arrays de índices
+@st.cache_resource
+def get_store(path, data_version):
+    return FlightStore.load(path, data_version)
+
+# --- Caches por versão do dataset ---
+# O DataFrame é passado como `_df` (não entra no hash); a chave é a versão do arquivo
 @st.cache_data
-def load_data():
-    df = pd.read_csv("project_development/dataset/created/df_view.csv")
-    df["FL_DATE"] = pd.to_datetime(df["FL_DATE"])
-
-    weekday_order = ["Segunda-feira", "Terça-feira", "Quarta-feira", "Quinta-feira", "Sexta-feira", "Sábado", "Domingo"]
-    period_order = ["Madrugada", "Manhã", "Tarde", "Noite"]
-
-    df["DAY_OF_WEEK"] = pd.Categorical(df["DAY_OF_WEEK"], categories=weekday_order, ordered=True)
-    df["TIME_PERIOD"] = pd.Categorical(df["TIME_PERIOD"], categories=period_order, ordered=True)
-    
-    # Adicionar colunas para o mapa de rotas, se não existirem
-    required_map_cols = ["ORIGIN_LAT", "ORIGIN_LON", "DEST_LAT", "DEST_LON", "DISTANCE"]
-    for col in required_map_cols:
-        if col not in df.columns:
-            st.warning(f"Coluna \'{col}\' não encontrada. Gerando dados simulados para o mapa. O mapa pode não funcionar corretamente.")
-            if col == "DISTANCE":
-                df[col] = np.random.randint(50, 2000, len(df))
-            else:
-                df[col] = np.random.uniform(25, 50, len(df)) if "LAT" in col else np.random.uniform(-125, -70, len(df))
-
-    # Adicionar DELAY_PER_DISTANCE para a nova métrica
-    df["DELAY_OVERALL"] = pd.to_numeric(df["DELAY_OVERALL"], errors="coerce")
-    df["DISTANCE"] = pd.to_numeric(df["DISTANCE"], errors="coerce")
-    df["DELAY_PER_DISTANCE"] = df.apply(lambda row: row["DELAY_OVERALL"] / row["DISTANCE"] if row["DISTANCE"] != 0 else 0, axis=1)
-
-    return df
-
-df = load_data()
-
-# --- Funções de Cálculo e Processamento ---
-def calculate_big_numbers(df):
-    total_flights = len(df)
-    avg_delay = df["DELAY_OVERALL"].mean() if "DELAY_OVERALL" in df.columns else 0
-    delay_percentage = (df["DELAY"].sum() / total_flights) * 100 if total_flights > 0 else 0
-    cancelled_percentage = (df["CANCELLED"].sum() / total_flights) * 100 if total_flights > 0 else 0
-    diverted_percentage = (df["DIVERTED"].sum() / total_flights) * 100 if total_flights > 0 else 0
-    
-    return {
-        "total_flights": total_flights,
-        "avg_delay": avg_delay,
-        "delay_percentage": delay_percentage,
-        "cancelled_percentage": cancelled_percentage,
-        "diverted_percentage": diverted_percentage
-    }
-
-def create_metric_data(df, group_col, metric, observed=True):
-    if metric == "avg_delay":
-        data = df.groupby(group_col, observed=observed)["DELAY_OVERALL"].mean().sort_values(ascending=False)
-        title_suffix = "Atraso Médio (min)"
-    elif metric == "delay_count":
-        data = df.groupby(group_col, observed=observed)["DELAY"].sum().sort_values(ascending=False)
-        title_suffix = "Quantidade de Atrasos"
-    elif metric == "cancelled_count":
-        data = df.groupby(group_col, observed=observed)["CANCELLED"].sum().sort_values(ascending=False)
-        title_suffix = "Quantidade de Cancelamentos"
-    elif metric == "diverted_count":
-        data = df.groupby(group_col, observed=observed)["DIVERTED"].sum().sort_values(ascending=False)
-        title_suffix = "Quantidade de Desvios"
-    elif metric == "avg_delay_per_distance":
-        data = df.groupby(group_col, observed=observed)["DELAY_PER_DISTANCE"].mean().sort_values(ascending=False)
-        title_suffix = "Atraso Médio por Distância (min/milha)"
-    else:
-        data = df.groupby(group_col, observed=observed)["DELAY_OVERALL"].mean().sort_values(ascending=False)
-        title_suffix = "Atraso Médio (min)"
-    
-    return data, title_suffix
-
-# --- Estilos de Gráficos (Adaptados de creating_fig.ipynb) ---
-palette = ["#0077C8", "#005EA8", "#003F72", "#0094D8", "#66C5E3"]
-palette_red = ["#DC1C13", "#EA4C46", "#F07470"]
-
-def get_plotly_template():
-    # Baseado no estilo do creating_fig.ipynb e adaptado para Plotly
-    return go.layout.Template(
-        layout=go.Layout(
-            font=dict(family="Arial, sans-serif", size=12, color="#333"),
-            title_font_size=18,
-            plot_bgcolor="rgba(0,0,0,0)",
-            paper_bgcolor="rgba(0,0,0,0)",
-            margin=dict(l=50, r=20, t=60, b=40),
-            xaxis=dict(
-                showgrid=True, gridwidth=1, gridcolor="lightgray",
-                linecolor="lightgray", linewidth=1,
-                tickfont=dict(size=10)
-            ),
-            yaxis=dict(
-                showgrid=True, gridwidth=1, gridcolor="lightgray",
-                linecolor="lightgray", linewidth=1,
-                tickfont=dict(size=10)
-            ),
-            colorway=palette, # Aplicar paleta de cores
-            hoverlabel=dict(
-                bgcolor="white",
-                font=dict(family="Arial", size=12)
-            )
-        )
-    )
+def get_big_numbers(_df, data_version):
+    return calculate_big_numbers(_df)
 
-plotly_template = get_plotly_template()
-
-# --- Funções de Visualização (Adaptadas para Streamlit e estilos) ---
-def create_simple_bar_chart(data, title, x_label, y_label):
-    if data.empty:
-        fig = px.bar(title=f"{title} (Sem dados)")
-        fig.update_layout(height=400, title_x=0.5, template=plotly_template)
-        return fig
-         
-    y_values = [str(x) for x in data.index]
-    
-    fig = px.bar(
-        x=data.values,
-        y=y_values,
-        orientation="h",
-        title=f"<b>{title}</b>",
-        labels={"x": x_label, "y": y_label},
-        color=data.values,
-        color_continuous_scale=palette # Usar a paleta definida
-    )
-    
-    fig.update_layout(
-        height=400,
-        yaxis={"categoryorder": "total ascending"},
-        title_x=0.5,
-        title_font_size=14,
-        font=dict(size=10),
-        plot_bgcolor="rgba(0,0,0,0)",
-        paper_bgcolor="rgba(0,0,0,0)",
-        margin=dict(l=50, r=20, t=60, b=40),
-        showlegend=False,
-        coloraxis_showscale=False,
-        template=plotly_template # Aplicar template
-    )
-    return fig
-
-def create_line_chart_continuous(data, title, x_label, y_label, group_col):
-    if data.empty:
-        fig = px.line(title=f"{title} (Sem dados)")
-        fig.update_layout(height=400, title_x=0.5, template=plotly_template)
-        return fig
-    
-    if group_col in ["FL_DAY", "TIME_HOUR"]:
-        data = data.sort_index()
-        x_values = data.index
-    else:
-        x_values = data.index
-    
-    fig = px.line(
-        x=x_values,
-        y=data.values,
-        title=f"<b>{title}</b>",
-        labels={"x": x_label, "y": y_label}
-    )
-    
-    fig.update_traces(
-        line_color=palette[0], # Usar a primeira cor da paleta
-        line_width=3, 
-        marker=dict(size=6),
-        mode="lines+markers"
-    )
-    
-    fig.update_layout(
-        height=400,
-        title_x=0.5,
-        title_font_size=14,
-        font=dict(size=10),
-        plot_bgcolor="rgba(0,0,0,0)",
-        paper_bgcolor="rgba(0,0,0,0)",
-        margin=dict(l=50, r=20, t=60, b=40),
-        xaxis=dict(showgrid=True, gridwidth=1, gridcolor="lightgray"),
-        yaxis=dict(showgrid=True, gridwidth=1, gridcolor="lightgray"),
-        template=plotly_template # Aplicar template
-    )
-    return fig
-
-# --- Funções de Mapa (Adaptadas do creating_fig.ipynb) ---
-METRIC_CONFIG = {
-    "avg_delay": {"col": "DELAY_OVERALL", "agg": "mean", "title": "Atraso Médio", "unit": "min"},
-    "delay_count": {"col": "DELAY", "agg": "sum", "title": "Quantidade de Atrasos", "unit": "voos"},
-    "cancelled_count": {"col": "CANCELLED", "agg": "sum", "title": "Quantidade de Cancelamentos", "unit": "voos"},
-    "diverted_count": {"col": "DIVERTED", "agg": "sum", "title": "Quantidade de Desvios", "unit": "voos"},
-    "avg_delay_per_distance": {"col": "DELAY_PER_DISTANCE", "agg": "mean", "title": "Atraso Médio por Distância", "unit": "min/milha"}
-}
-
-def _create_error_figure(message, altura):
-    fig = go.Figure()
-    fig.update_layout(
-        title=dict(text=message, x=0.5, xanchor="center"),
-        height=altura,
-        xaxis=dict(visible=False),
-        yaxis=dict(visible=False),
-        template=plotly_template
-    )
-    return fig
-
-def _processar_dados_rotas(df, config, top_n):
-    df_filtered = df.dropna(subset=[config["col"], "ORIGIN_LAT", "ORIGIN_LON", "DEST_LAT", "DEST_LON", "DISTANCE"])
-    
-    agg_dict = {
-        "DELAY_OVERALL": "mean",
-        "DELAY": "sum",
-        "CANCELLED": "sum",
-        "DIVERTED": "sum",
-        "DELAY_PER_DISTANCE": "mean",
-        "FL_DATE": "count",
-        "TIME_HOUR": "mean"
-    }
-    
-    rotas_data = (
-        df_filtered.groupby(["ORIGIN_CITY", "DEST_CITY", "ORIGIN_LAT", "ORIGIN_LON", "DEST_LAT", "DEST_LON", "DISTANCE"], 
-                   as_index=False)
-        .agg(agg_dict)
-        .rename(columns={"FL_DATE": "TOTAL_VOOS"})
-        .sort_values(by=config["col"], ascending=False)
-        .head(top_n)
-        .reset_index(drop=True)
-    )
-    
-    return rotas_data
-
-def _adicionar_rotas(fig, rotas_data, espessuras, config):
-    for idx, rota in rotas_data.iterrows():
-        cor = _calcular_cor_horario(rota["TIME_HOUR"])
-        
-        fig.add_trace(go.Scattergeo(
-            lon=[rota["ORIGIN_LON"], rota["DEST_LON"]],
-            lat=[rota["ORIGIN_LAT"], rota["DEST_LAT"]],
-            mode="lines",
-            line=dict(width=espessuras[idx], color=cor),
-            name=f"{rota["ORIGIN_CITY"]} → {rota["DEST_CITY"]}",
-            showlegend=False,
-            hovertemplate=(
-                f"<b>{rota["ORIGIN_CITY"]} → {rota["DEST_CITY"]}</b><br>"+
-                f"Atraso Médio: {rota["DELAY_OVERALL"]:.1f} min<br>"+
-                f"{config["title"]}: {rota[config["col"]]:.3f} {config["unit"]}<br>"+
-                f"Hora Média: {rota["TIME_HOUR"]:.1f}h<br>"+
-                f"Total de Voos: {rota["TOTAL_VOOS"]}<br>"+
-                f"Distância: {rota["DISTANCE"]:.0f} milhas<br>"+
-                "<extra></extra>"
-            )
-        ))
-
-def _adicionar_marcadores_comuns(fig, rotas_data):
-    fig.add_trace(go.Scattergeo(
-        lon=rotas_data["ORIGIN_LON"],
-        lat=rotas_data["ORIGIN_LAT"],
-        mode="markers",
-        marker=dict(size=7, color="green", symbol="circle", line=dict(width=1, color="white")),
-        text=rotas_data["ORIGIN_CITY"],
-        name="Origem",
-        hovertemplate="<b>%{text}</b><br><i>Aeroporto de Origem</i><extra></extra>",
-        showlegend=False
-    ))
-    
-    fig.add_trace(go.Scattergeo(
-        lon=rotas_data["DEST_LON"],
-        lat=rotas_data["DEST_LAT"],
-        mode="markers",
-        marker=dict(size=7, color="red", symbol="circle", line=dict(width=1, color="white")),
-        text=rotas_data["DEST_CITY"],
-        name="Destino",
-        hovertemplate="<b>%{text}</b><br><i>Aeroporto de Destino</i><extra></extra>",
-        showlegend=False
-    ))
-
-def _adicionar_destaque_cidades(fig):
-    cidades_destaque = {
-        "Chicago": {"lat": 41.8781, "lon": -87.6298},
-        "Denver": {"lat": 39.7392, "lon": -104.9903},
-        "Atlanta": {"lat": 33.7490, "lon": -84.3880},
-        "Dallas": {"lat": 32.7767, "lon": -96.7970}
-    }
-    
-    for cidade, coords in cidades_destaque.items():
-        fig.add_trace(go.Scattergeo(
-            lon=[coords["lon"]],
-            lat=[coords["lat"]],
-            mode="markers+text",
-            marker=dict(
-                size=5, 
-                color="#FFD700", 
-                symbol="star", 
-                line=dict(width=3, color="#FF8C00")
-            ),
-            text=[cidade],
-            textposition="top center",
-            textfont=dict(size=12, color="#000", family="Arial Black"),
-            name="Cidade Crítica",
-            hovertemplate=f"<b>⭐ {cidade}</b><br>"+
-                         f"<i>Cidade com métricas críticas</i><br>"+
-                         f"• 1.2x mais problemas operacionais<br>"+
-                         f"• Cancelamentos e desvios elevados<extra></extra>",
-            showlegend=False
-        ))
-
-def _adicionar_marcadores_estados(fig):
-    estados_centros = {
-        "CA": {"lon": -119.4, "lat": 36.7, "nome": "Califórnia"},
-        "FL": {"lon": -81.5, "lat": 27.9, "nome": "Flórida"},
-        "TX": {"lon": -99.9, "lat": 31.0, "nome": "Texas"},
-        "CO": {"lon": -105.5, "lat": 39.0, "nome": "Colorado"}
-    }
-    
-    for estado, dados in estados_centros.items():
-        fig.add_trace(go.Scattergeo(
-            lon=[dados["lon"]],
-            lat=[dados["lat"]],
-            mode="markers+text",
-            marker=dict(
-                size=35,
-                color="rgba(255, 100, 100, 0.25)",
-                symbol="hexagon",
-                line=dict(width=2, color="rgba(255, 50, 50, 0.6)")
-            ),
-            text=[estado],
-            textfont=dict(size=14, color="rgba(200, 0, 0, 0.8)", family="Arial Black"),
-            textposition="middle center",
-            name=f"Estado Crítico: {dados["nome"]}",
-            showlegend=False,
-            hovertemplate=(
-                f"<b>🔴 {dados["nome"]} ({estado})</b><br>"+
-                f"<i>Estado com indicadores críticos</i><br>"+
-                f"• Atraso médio 1.19x maior<br>"+
-                f"• Risco elevado de problemas<extra></extra>"
-            )
-        ))
-
-def _calcular_cor_horario(time_hour):
-    hora_normalizada = time_hour / 23.0
-    hue = 200 + (hora_normalizada * 80)
-    saturation = 60 + (hora_normalizada * 30)
-    if time_hour <= 12:
-        lightness = 30 + (time_hour / 12.0) * 40
-    else:
-        lightness = 70 - ((time_hour - 12) / 11.0) * 40
-    
-    hue = max(0, min(hue, 360))
-    saturation = max(0, min(saturation, 100))
-    lightness = max(0, min(lightness, 100))
-    
-    return f"hsl({hue:.0f}, {saturation:.0f}%, {lightness:.0f}%)"
-
-def _calcular_espessuras(rotas_data, col_metric):
-    min_metric = rotas_data[col_metric].min()
-    max_metric = rotas_data[col_metric].max()
-    
-    if max_metric <= min_metric or pd.isna(min_metric) or pd.isna(max_metric):
-        return [3] * len(rotas_data)
-    
-    espessuras = []
-    for valor in rotas_data[col_metric]:
-        if pd.isna(valor):
-            espessuras.append(3)
-            continue
-        metric_normalizada = (valor - min_metric) / (max_metric - min_metric)
-        espessura = 1.5 + (metric_normalizada ** 1.5) * 7
-        espessuras.append(max(1.5, min(espessura, 8.5)))
-    
-    return espessuras
-
-def _atualizar_layout(fig, config, altura):
-    subtitle_text = (
-        f"🎨 Cor: Hora média do voo | "+
-        f"📏 Espessura: {config["title"]} | "+
-        f"🟢 Origem | 🔴 Destino"
-    )
-    
-    destaque_text = (
-        f"<br><sub>⭐ <b>Cidades críticas:</b> Chicago, Denver, Atlanta, Dallas/Fort Worth (1.2x mais problemas) | "+
-        f"🔴 <b>Estados críticos:</b> CA, FL, TX, CO (Atraso 1.19x maior)</sub>"
-    )
-    
-    fig.update_layout(
-        title=dict(
-            text=f"<b>Principais Rotas Aéreas - {config["title"]}</b><br>"+
-                 f"<sub>{subtitle_text}</sub>"+
-                 f"{destaque_text}",
-            x=0.5,
-            xanchor="center",
-            font=dict(size=14)
-        ),
-        geo=dict(
-            scope="usa",
-            projection_type="albers usa",
-            showland=True,
-            landcolor="rgb(243, 243, 238)",
-            showlakes=True,
-            lakecolor="rgb(220, 235, 255)",
-            showsubunits=True,
-            subunitcolor="rgb(200, 200, 200)",
-            subunitwidth=0.5,
-            showcoastlines=True,
-            coastlinecolor="rgb(180, 180, 180)",
-            coastlinewidth=0.5,
-            bgcolor="rgba(255,255,255,0.1)",
-        ),
-        height=altura,
-        margin=dict(l=0, r=0, t=120, b=0),
-        showlegend=False,
-        hoverlabel=dict(
-            bgcolor="white",
-            font_size=12,
-            font_family="Arial"
-        ),
-        template=plotly_template
-    )
+# Cubo de agregados diários (somas + sketches de quantis), montado na carga e
+# compartilhado entre sessões sem cópia (cache_resource)
+@st.cache_resource
+def get_cube(_df, data_version):
+    return FlightCube.build(_df)
+
+# Dias anômalos por aeroporto/companhia (z-score robusto sobre as séries diárias do cubo)
+@st.cache_data
+def get_anomalies(_df, data_version):
+    return detect_anomalies(get_cube(_df, data_version))
+
+@st.cache_data
+def get_distribution_figures(_df, data_version, selected_metric):
+    return build_distribution_figures(_df, selected_metric, cube=get_cube(_df, data_version),
+                                      anomalies=get_anomalies(_df, data_version))
+
+# Mapas de calor: dia da semana x hora (bincount 2D) e aeroporto x dia (arrays do cubo)
+@st.cache_data
+def get_heatmap_figures(_df, data_version, selected_metric):
+    return build_heatmap_figures(_df, selected_metric, cube=get_cube(_df, data_version))
+
+# Acumuladores por rota com top-K incremental: o mapa não refaz groupby + sort
+@st.cache_resource
+def get_route_accumulator(_df, data_version):
+    return RouteAccumulator.from_frame(_df)
+
+@st.cache_data
+def get_route_map(_df, data_version, top_n, selected_metric):
+    return criar_mapa_rotas_avancado(_df, top_n=top_n, altura=600, selected_metric=selected_metric,
+                                     routes=get_route_accumulator(_df, data_version),
+                                     anomalias=airport_anomaly_points(get_anomalies(_df, data_version)))
+
+# Rollup estado -> cidade -> aeroporto -> rota: cada nível do drill-down é uma fatia.
+# Lido do hierarchy.npz do build quando ele foi gerado junto com o df_view carregado
+# (mesma versão); senão, montado aqui
+@st.cache_resource
+def get_hierarchy(_df, data_version):
+    return HierarchyRollup.load_or_build(HIERARCHY_PATH, _df, data_version)
+
+# Comparação de períodos: gráficos e mapa somam fatias diárias (cubo e pares data x rota)
+@st.cache_data
+def get_comparison_figures(_df, data_version, selected_metric, period_a, period_b):
+    return build_comparison_figures(get_cube(_df, data_version), selected_metric, period_a, period_b)
 
-def criar_mapa_rotas_avancado(df, top_n=30, altura=600, selected_metric="avg_delay_per_distance"):
-    config = METRIC_CONFIG.get(selected_metric, METRIC_CONFIG["avg_delay_per_distance"])
-    
-    required_cols = ["ORIGIN_CITY", "DEST_CITY", "ORIGIN_LAT", "ORIGIN_LON", "DEST_LAT", "DEST_LON", "DISTANCE"]
-    missing_cols = [col for col in required_cols if col not in df.columns]
-    
-    if missing_cols:
-        return _create_error_figure(f"Dados de coordenadas ou distância não disponíveis: {", ".join(missing_cols)}", altura)
-    
-    rotas_data = _processar_dados_rotas(df, config, top_n)
-    
-    if rotas_data.empty:
-        return _create_error_figure("Nenhuma rota válida encontrada", altura)
-    
-    fig = go.Figure()
-    
-    _adicionar_marcadores_estados(fig)
-    
-    espessuras = _calcular_espessuras(rotas_data, config["col"])
-    
-    _adicionar_rotas(fig, rotas_data, espessuras, config)
-    
-    _adicionar_marcadores_comuns(fig, rotas_data)
-    
-    _adicionar_destaque_cidades(fig)
-    
-    _atualizar_layout(fig, config, altura)
-    
-    return fig
+@st.cache_resource
+def get_daily_routes(_df, data_version):
+    return DailyRoutes.build(_df)
+
+@st.cache_data
+def get_variation_map(_df, data_version, top_n, selected_metric, period_a, period_b):
+    config = METRIC_CONFIG[selected_metric]
+    rotas = compare_routes(get_daily_routes(_df, data_version), config, period_a, period_b, top_n=top_n)
+    return desenhar_mapa_variacao(rotas, config, (period_label(period_a), period_label(period_b)), altura=600)
+
+# Partidas/chegadas de todos os aeroportos em eixos ordenados (faixas de 15 min)
+@st.cache_resource
+def get_timeline(_df, data_version):
+    return AirportTimeline.build(_df)
+
+@st.cache_data
+def get_congestion_summary(_df, data_version):
+    return get_timeline(_df, data_version).summary()
+
+data_version = dataset_version(DF_VIEW_PATH)
+store = get_store(DF_VIEW_PATH, data_version)
+for level, message in store.notices:
+    getattr(st, level)(message)
+df = store.df
 
 # --- Layout do Streamlit ---
 st.title("✈️ Dashboard de Análise de Voos")
 
+# Modo de comparação: cada período é a soma das fatias diárias já agregadas
+def _period(value):
+    """Intervalo do st.date_input como (início, fim); com uma só data escolhida, o dia"""
+    value = tuple(value) if isinstance(value, (tuple, list)) else (value,)
+    return (value[0], value[-1])
+
+cube = get_cube(df, data_version)
+first_day, last_day = cube.dates.min().date(), cube.dates.max().date()
+periods = None
+if st.toggle("🔀 Comparar dois períodos", key="compare_mode"):
+    middle = first_day + (last_day - first_day) / 2
+    period_col_a, period_col_b = st.columns(2)
+    periods = (
+        _period(period_col_a.date_input("Período A:", value=(first_day, middle), min_value=first_day,
+                                        max_value=last_day, format="DD/MM/YYYY", key="period_a")),
+        _period(period_col_b.date_input("Período B:", value=(min(middle + timedelta(days=1), last_day), last_day),
+                                        min_value=first_day, max_value=last_day, format="DD/MM/YYYY", key="period_b")),
+    )
+    st.caption("Métricas gerais, distribuições e mapa de rotas mostram o período B com a variação em relação ao A; "
+               "as demais seções usam todo o período.")
+
 # Big Numbers
-metrics = calculate_big_numbers(df)
+BIG_NUMBERS = [
+    ("total_flights", "Total de Voos", lambda value: f"{value:,}".replace(",", "."), "normal"),
+    ("avg_delay", "Atraso Médio (min)", lambda value: f"{value:.2f}", "inverse"),
+    ("delay_percentage", "Voos Atrasados (%)", lambda value: f"{value:.2f}%", "inverse"),
+    ("cancelled_percentage", "Voos Cancelados (%)", lambda value: f"{value:.2f}%", "inverse"),
+    ("diverted_percentage", "Voos Desviados (%)", lambda value: f"{value:.2f}%", "inverse"),
+]
 
 st.markdown("### Métricas Gerais")
-col1, col2, col3, col4, col5 = st.columns(5)
-col1.metric("Total de Voos", f"{metrics["total_flights"]:,}".replace(",", "."))
-col2.metric("Atraso Médio (min)", f"{metrics["avg_delay"]:.2f}")
-col3.metric("Voos Atrasados (%)", f"{metrics["delay_percentage"]:.2f}%")
-col4.metric("Voos Cancelados (%)", f"{metrics["cancelled_percentage"]:.2f}%")
-col5.metric("Voos Desviados (%)", f"{metrics["diverted_percentage"]:.2f}%")
+if periods is None:
+    metrics = get_big_numbers(df, data_version)
+    for col, (key, label, fmt, _) in zip(st.columns(len(BIG_NUMBERS)), BIG_NUMBERS):
+        col.metric(label, fmt(metrics[key]))
+else:
+    compared = compare_big_numbers(cube, *periods)
+    for col, (key, label, fmt, color) in zip(st.columns(len(BIG_NUMBERS)), BIG_NUMBERS):
+        before, after = compared[key]
+        relative = f" ({(after - before) / before:+.1%})" if before else ""
+        delta = ("+" if after >= before else "-") + fmt(abs(after - before)) + relative
+        col.metric(label, fmt(after), delta=delta, delta_color=color)
 
 st.markdown("--- ")
 st.markdown("### Análise de Distribuições")
 
 selected_metric = st.radio(
     "Selecione a métrica para análise:",
-    options=["avg_delay", "delay_count", "cancelled_count", "diverted_count", "avg_delay_per_distance"],
-    format_func=lambda x: {
-        "avg_delay": "⏱️ Média de Atraso",
-        "delay_count": "🔢 Quantidade de Atrasos",
-        "cancelled_count": "❌ Quantidade de Cancelamentos",
-        "diverted_count": "🔄 Quantidade de Desvios",
-        "avg_delay_per_distance": "⏱️ Atraso Médio por Distância"
-    }[x],
-    horizontal=True
+    options=list(METRIC_LABELS),
+    format_func=METRIC_LABELS.get,
+    horizontal=True,
+    key="selected_metric"
 )
 
-# Gráficos
-st.subheader("Companhias e Distâncias")
-col_chart1, col_chart2 = st.columns(2)
-with col_chart1:
-    airlines_data, title_suffix = create_metric_data(df, "AIRLINE_Description", selected_metric)
-    airlines_fig = create_simple_bar_chart(
-        airlines_data.head(10),
-        f"🏢 Top 10 Companhias - {title_suffix}", 
-        title_suffix, 
-        "Companhia"
+# Gráficos (recalculados apenas quando a métrica muda)
+if periods is None:
+    figures = get_distribution_figures(df, data_version, selected_metric)
+else:
+    figures = get_comparison_figures(df, data_version, selected_metric, *periods)
+SECTION_TITLES = {"airlines": "Companhias e Distâncias", "cities": "Cidades e Estados", "day": "Padrões Temporais"}
+
+for left, right in zip(DISTRIBUTION_CHARTS[::2], DISTRIBUTION_CHARTS[1::2]):
+    if left["id"] in SECTION_TITLES:
+        st.subheader(SECTION_TITLES[left["id"]])
+    col_left, col_right = st.columns(2)
+    with col_left:
+        st.plotly_chart(figures[left["id"]], use_container_width=True)
+    with col_right:
+        st.plotly_chart(figures[right["id"]], use_container_width=True)
+
+# Exportação gerada só no clique (data como função), em blocos e via arquivo temporário
+with st.expander("📥 Exportar dados"):
+    exp_col1, exp_col2, exp_col3 = st.columns(3)
+    export_spec = exp_col1.selectbox("Gráfico:", options=DISTRIBUTION_CHARTS, format_func=lambda spec: spec["label"], key="export_chart")
+    export_airlines = exp_col2.multiselect("Companhias:", options=sorted(df["AIRLINE_Description"].dropna().unique()), key="export_airline")
+    export_format = exp_col3.radio("Formato:", options=list(EXPORT_FORMATS), format_func=str.upper, horizontal=True, key="export_format")
+    export_rows = store.filter(airline=export_airlines) if export_airlines else None
+    dl_col1, dl_col2 = st.columns(2)
+    dl_col1.download_button(
+        "⬇️ Agregado do gráfico",
+        data=lambda: export_tempfile(chart_aggregate(df, export_spec["id"], selected_metric, export_rows,
+                                                     cube=get_cube(df, data_version)), export_format),
+        file_name=f"{export_spec['id']}_{selected_metric}.{export_format}",
+        mime=EXPORT_FORMATS[export_format],
+        on_click="ignore",
+        key="export_aggregate"
     )
-    st.plotly_chart(airlines_fig, use_container_width=True)
-
-with col_chart2:
-    df_temp = df.copy()
-    df_temp["DISTANCE_BIN"] = pd.cut(df_temp["DISTANCE"], bins=10, precision=0)
-    distance_data, _ = create_metric_data(df_temp, "DISTANCE_BIN", selected_metric, observed=True)
-    distance_fig = create_simple_bar_chart(
-        distance_data,
-        f"✈️ Distância vs {title_suffix}", 
-        title_suffix, 
-        "Faixa de Distância"
+    dl_col2.download_button(
+        f"⬇️ Voos filtrados ({len(df) if export_rows is None else len(export_rows):,})".replace(",", "."),
+        data=lambda: export_tempfile(df, export_format, export_rows),
+        file_name=f"voos.{export_format}",
+        mime=EXPORT_FORMATS[export_format],
+        on_click="ignore",
+        key="export_rows"
     )
-    st.plotly_chart(distance_fig, use_container_width=True)
-
-st.subheader("Cidades e Estados")
-col_chart3, col_chart4 = st.columns(2)
-with col_chart3:
-    cities_data, _ = create_metric_data(df, "ORIGIN_CITY", selected_metric)
-    cities_fig = create_simple_bar_chart(
-        cities_data.head(10),
-        f"🏙️ Top 10 Cidades de Origem - {title_suffix}", 
-        title_suffix, 
-        "Cidade"
-    )
-    st.plotly_chart(cities_fig, use_container_width=True)
-
-with col_chart4:
-    states_data, _ = create_metric_data(df, "ORIGIN_STATE", selected_metric)
-    states_fig = create_simple_bar_chart(
-        states_data.head(10),
-        f"🗺️ Top 10 Estados de Origem - {title_suffix}", 
-        title_suffix, 
-        "Estado"
-    )
-    st.plotly_chart(states_fig, use_container_width=True)
-
-st.subheader("Padrões Temporais")
-col_chart5, col_chart6 = st.columns(2)
-with col_chart5:
-    day_data, _ = create_metric_data(df, "FL_DAY", selected_metric, observed=True)
-    day_fig = create_line_chart_continuous(
-        day_data,
-        f"📅 Dia do Mês vs {title_suffix}", 
-        "Dia do Mês", 
-        title_suffix,
-        "FL_DAY"
+
+# Drill-down: clicar em uma barra abre o nível seguinte; só o fragmento é reexecutado
+DRILL_TOP = 25
+
+def _drill_to(path):
+    st.session_state["drill_path"] = list(path)
+    st.session_state["drill_step"] = st.session_state.get("drill_step", 0) + 1  # gráfico novo, sem seleção
+
+def _drill_select(chart_key):
+    points = st.session_state[chart_key].selection.points
+    if points:
+        _drill_to(st.session_state["drill_path"] + [points[0]["y"]])
+
+@st.fragment
+def render_drilldown_section(df, data_version, selected_metric):
+    hierarchy = get_hierarchy(df, data_version)
+    config = METRIC_CONFIG[selected_metric]
+    path = st.session_state.setdefault("drill_path", [])
+    try:
+        children = hierarchy.children(tuple(path), config) if len(path) < len(HIERARCHY) - 1 else None
+    except KeyError:
+        _drill_to([])  # caminho de uma versão anterior do dataset
+        path, children = [], hierarchy.children((), config)
+
+    crumbs = ["🇺🇸 Todos os estados"] + path
+    for depth, (col, label) in enumerate(zip(st.columns(len(HIERARCHY)), crumbs)):
+        col.button(label, key=f"drill_crumb_{depth}", disabled=depth == len(path),
+                   on_click=_drill_to, args=(path[:depth],), use_container_width=True)
+
+    level = len(path)
+    if children is None:
+        routes = hierarchy.routes(tuple(path), config, top_n=DRILL_TOP * 2)
+        st.plotly_chart(desenhar_mapa_rotas(routes, config, altura=600), use_container_width=True)
+        return
+
+    data = children.set_index("KEY")["VALUE"].dropna().head(DRILL_TOP)
+    place = f" em {path[-1]}" if path else ""
+    fig = create_simple_bar_chart(data, f"{config['title']} por {LEVEL_LABELS[level]}{place}", config["title"], LEVEL_LABELS[level])
+    chart_key = f"drill_chart_{st.session_state.get('drill_step', 0)}"
+    st.plotly_chart(fig, use_container_width=True, key=chart_key, on_select=partial(_drill_select, chart_key),
+                    selection_mode="points")
+    st.caption(f"Clique em uma barra para ver {'as rotas' if level == len(HIERARCHY) - 2 else 'o próximo nível'}.")
+
+st.subheader("Detalhamento: Estado → Cidade → Aeroporto → Rotas")
+render_drilldown_section(df, data_version, selected_metric)
+
+anomalies = get_anomalies(df, data_version)
+if not anomalies.empty:
+    with st.expander(f"🚨 Dias anômalos detectados ({len(anomalies)})"):
+        st.dataframe(anomalies.head(100), use_container_width=True, hide_index=True)
+
+st.subheader("Mapas de Calor")
+heatmaps = get_heatmap_figures(df, data_version, selected_metric)
+st.plotly_chart(heatmaps["weekday_hour"], use_container_width=True)
+st.plotly_chart(heatmaps["airport_day"], use_container_width=True)
+
+# Causas de atraso: participações lidas das somas do cubo (sem groupby por clique)
+if all(col in df.columns for col in DELAY_CAUSES):
+    st.subheader("Causas de Atraso")
+    cause_spec = st.selectbox(
+        "Decompor os minutos de atraso por:",
+        options=DISTRIBUTION_CHARTS,
+        format_func=lambda spec: spec["label"],
+        key="cause_dimension"
     )
-    st.plotly_chart(day_fig, use_container_width=True)
-
-with col_chart6:
-    weekday_data, _ = create_metric_data(df, "DAY_OF_WEEK", selected_metric, observed=True)
-    weekday_fig = create_simple_bar_chart(
-        weekday_data,
-        f"📆 Dia da Semana vs {title_suffix}", 
-        title_suffix, 
-        "Dia da Semana"
+    cause_shares, _ = cause_breakdown(get_cube(df, data_version), cause_spec["col"])
+    st.plotly_chart(
+        create_cause_breakdown_chart(cause_shares.head(15), f"🧩 Causas de Atraso por {cause_spec['label']}", cause_spec["label"]),
+        use_container_width=True
     )
-    st.plotly_chart(weekday_fig, use_container_width=True)
-
-col_chart7, col_chart8 = st.columns(2)
-with col_chart7:
-    hour_data, _ = create_metric_data(df, "TIME_HOUR", selected_metric, observed=True)
-    hour_fig = create_line_chart_continuous(
-        hour_data,
-        f"🕐 Hora do Dia vs {title_suffix}", 
-        "Hora", 
-        title_suffix,
-        "TIME_HOUR"
+
+# Congestionamento: trocar aeroporto ou dia reexecuta só o fragmento
+CONGESTION_AIRPORTS = 50
+
+@st.fragment
+def render_congestion_section(df, data_version):
+    summary = get_congestion_summary(df, data_version).head(CONGESTION_AIRPORTS)
+    left, right = st.columns(2)
+    airport = left.selectbox(
+        "Aeroporto:",
+        options=list(summary.index),
+        format_func=lambda code: f"{code} (pico de {summary.at[code, 'PEAK_LOAD_1H']:.0f} mov./h)",
+        key="congestion_airport"
     )
-    st.plotly_chart(hour_fig, use_container_width=True)
-
-with col_chart8:
-    period_data, _ = create_metric_data(df, "TIME_PERIOD", selected_metric, observed=True)
-    period_fig = create_simple_bar_chart(
-        period_data,
-        f"🌅 Período do Dia vs {title_suffix}", 
-        title_suffix, 
-        "Período"
+    timeline = get_timeline(df, data_version)
+    days = timeline.slots(airport)["SLOT"].dt.normalize().unique()
+    day = right.selectbox(
+        "Dia:",
+        options=[None] + list(days),
+        format_func=lambda value: "Média do período" if value is None else f"{value:%d/%m/%Y}",
+        key="congestion_day"
     )
-    st.plotly_chart(period_fig, use_container_width=True)
+    profile = timeline.profile(airport, day)
+    when = "média do período" if day is None else f"{day:%d/%m/%Y}"
+    st.plotly_chart(create_congestion_chart(profile, f"🚦 Congestionamento em {airport} ({when})"), use_container_width=True)
+
+if all(col in df.columns for col in TIME_COLUMNS):
+    st.subheader("Congestionamento nos Aeroportos")
+    render_congestion_section(df, data_version)
 
 st.markdown("--- ")
 st.markdown("### Visualização Geográfica")
 
-map_quantity = st.slider(
-    "Quantidade de rotas a exibir no mapa:",
-    min_value=5, max_value=100, value=30, step=5
-)
+# Métricas de hubs da rede de aeroportos (matrizes esparsas), uma vez por versão do dataset
+@st.cache_data
+def get_hub_metrics(_df, data_version):
+    return AirportNetwork.build(_df).hub_metrics()
+
+# Todas as rotas rasterizadas: pirâmide de resoluções (PNG de cada nível) em cache por métrica
+@st.cache_resource
+def get_flow_raster(_df, data_version, selected_metric):
+    return FlowRaster.from_routes(get_route_accumulator(_df, data_version), METRIC_CONFIG[selected_metric])
+
+@st.cache_data
+def get_flow_map(_df, data_version, selected_metric, level):
+    return criar_mapa_fluxo(get_flow_raster(_df, data_version, selected_metric), get_hub_metrics(_df, data_version),
+                            level=level, altura=600, selected_metric=selected_metric)
+
+# Fragmento: mover o slider ou trocar a visão reexecuta apenas o mapa
+@st.fragment
+def render_map_section(df, data_version, selected_metric, periods=None):
+    map_view = st.radio("Visualização:", options=["Rotas", "Todas as rotas", "Hubs"], horizontal=True, key="map_view")
+    if map_view == "Todas as rotas":
+        level = st.select_slider(
+            "Resolução da imagem:",
+            options=list(range(LEVELS)),
+            value=1,
+            format_func=lambda lvl: {0: "Baixa", 1: "Média", 2: "Alta"}.get(lvl, f"Nível {lvl}"),
+            key="flow_level"
+        )
+        st.plotly_chart(get_flow_map(df, data_version, selected_metric, level), use_container_width=True)
+        return
+
+    map_quantity = st.slider(
+        "Quantidade de rotas a exibir no mapa:" if map_view == "Rotas" else "Quantidade de hubs a exibir no mapa:",
+        min_value=5, max_value=100, value=30, step=5,
+        key="map_quantity"
+    )
+
+    if map_view == "Hubs":
+        map_fig = criar_mapa_hubs(get_hub_metrics(df, data_version), top_n=map_quantity, altura=600)
+    elif periods is not None:
+        map_fig = get_variation_map(df, data_version, map_quantity, selected_metric, *periods)
+    else:
+        map_fig = get_route_map(df, data_version, map_quantity, selected_metric)
+    st.plotly_chart(map_fig, use_container_width=True)
 
-map_fig = criar_mapa_rotas_avancado(df, top_n=map_quantity, altura=600, selected_metric=selected_metric)
-st.plotly_chart(map_fig, use_container_width=True)
+render_map_section(df, data_version, selected_metric, periods)
 
 st.markdown("--- ")
 st.markdown(
@@ -0,0 +1,82 @@
+"""Backends de consulta: pandas em memória vs. DuckDB sobre o acervo Parquet particionado
+
+Mede cada operação da interface (métrica por dimensão, big numbers e top rotas), sem
+filtros e com filtro de datas + companhias, e confere que os dois backends concordam.
+Uso: python -m benchmarks.bench_backends --rows 1000000 --repeat 5
+"""
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.harness import print_table, record, summarize, timed
+from benchmarks.synthetic import AIRLINES, write_df_view
+from voos.backends import ROUTE_KEYS, DuckDBBackend, PandasBackend, write_parquet_store
+from voos.charts import DISTRIBUTION_CHARTS
+from voos.metrics import METRIC_CONFIG
+from voos.store import FlightStore
+
+FILTERS = {"start": "2023-01-08", "end": "2023-01-21", "airline": AIRLINES[:3]}
+METRICS = ["avg_delay", "cancelled_count", "delay_percentile"]
+
+
+def _operations():
+    for spec in DISTRIBUTION_CHARTS:
+        for metric in METRICS:
+            yield f"metric:{metric}", "metric_data", (spec["col"], metric)
+    yield "big_numbers", "big_numbers", ()
+    for metric in METRICS:
+        yield f"routes:{metric}", "route_table", (METRIC_CONFIG[metric], 30)
+
+
+def _check(name, a, b):
+    if name.startswith("metric"):
+        a, b = a[0], b[0]
+        a.index, b.index = a.index.astype(str), b.index.astype(str)
+        assert np.allclose(a.sort_index().to_numpy(dtype=float), b.reindex(a.sort_index().index).to_numpy(dtype=float)), name
+    elif name == "big_numbers":
+        assert np.allclose(list(a.values()), list(b.values()), equal_nan=True), name
+    elif not name.endswith("delay_percentile"):  # rotas: pandas usa sketches (quantil aproximado)
+        col = METRIC_CONFIG[name.split(":")[1]]["col"]
+        values = a[col].to_numpy(dtype=float)
+        assert len(a) == len(b) and np.allclose(values, b[col].to_numpy(dtype=float)), name
+        # Mesmas rotas acima do último valor (empates na fronteira podem entrar em qualquer ordem)
+        assert _routes_above(a, col, values[-1]) == _routes_above(b, col, values[-1]), name
+
+
+def _routes_above(table, col, last):
+    values = table[col].to_numpy(dtype=float)
+    above = (values > last) & ~np.isclose(values, last)
+    return set(table.loc[above, ROUTE_KEYS].itertuples(index=False, name=None))
+
+
+def run(rows, repeat):
+    samples = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        store = FlightStore.load(write_df_view(Path(tmp) / "df_view.csv", rows))
+        _, elapsed = timed(write_parquet_store, store.df, Path(tmp) / "parquet")
+        samples["write_parquet"] = [elapsed]
+        backends = {"pandas": PandasBackend(store.df), "duckdb": DuckDBBackend(str(Path(tmp) / "parquet"))}
+
+        for filtered, kwargs in (("all", {}), ("filtered", FILTERS)):
+            for name, method, args in _operations():
+                results = {}
+                for backend_name, backend in backends.items():
+                    key = f"{backend_name}:{filtered}:{name.split(':')[0]}"
+                    for _ in range(repeat):
+                        results[backend_name], elapsed = timed(getattr(backend, method), *args, **kwargs)
+                        samples.setdefault(key, []).append(elapsed)
+                _check(name, results["pandas"], results["duckdb"])
+    return {name: summarize(values) for name, values in samples.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    results = run(args.rows, args.repeat)
+    print_table(results)
+    record("query_backends", results, rows=args.rows, repeat=args.repeat)
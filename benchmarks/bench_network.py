@@ -0,0 +1,66 @@
+"""Intermediação da rede de aeroportos (voos.network): caminhada vetorizada vs. força bruta
+
+Mede a caminhada de predecessores de todos os pares e o laço par a par, em uma cadeia
+(caminhos com muitos intermediários) e na rede dos dados sintéticos. A conferência dos
+valores fica em tests/test_network.py.
+Uso: python -m benchmarks.bench_network --rows 200000 --chain 40
+"""
+import argparse
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import shortest_path
+
+from benchmarks.harness import print_table, record, summarize, timed
+from benchmarks.synthetic import generate_df_view
+from voos.network import AirportNetwork
+
+
+def brute_force_betweenness(network):
+    """Intermediação contando os intermediários de cada par em um laço Python"""
+    n = network.flights.shape[0]
+    cost = network.flights.copy()
+    cost.data = 1.0 / cost.data
+    _, predecessors = shortest_path(cost, method="D", directed=True, return_predecessors=True)
+    counts = np.zeros(n)
+    for src in range(n):
+        for dst in range(n):
+            node = predecessors[src, dst]
+            while node >= 0 and node != src:
+                counts[node] += 1
+                node = predecessors[src, node]
+    norm = (n - 1) * (n - 2) if n > 2 else 1
+    return counts / norm
+
+
+def chain_network(n):
+    """Cadeia 0 -> 1 -> ... -> n-1 (ida e volta), com frequências diferentes por trecho"""
+    rows = np.arange(n - 1)
+    flights = sparse.coo_matrix(
+        (np.concatenate([rows + 1.0, rows + 1.0]), (np.concatenate([rows, rows + 1]), np.concatenate([rows + 1, rows]))),
+        shape=(n, n),
+    ).tocsr()
+    empty = sparse.csr_matrix((n, n))
+    return AirportNetwork(np.arange(n), np.zeros((n, 2)), flights, empty, empty)
+
+
+def run(rows, chain, repeat=3):
+    samples = {"betweenness_vectorized": [], "betweenness_brute_force": []}
+    for network in (chain_network(chain), AirportNetwork.build(generate_df_view(rows))):
+        for _ in range(repeat):
+            _, elapsed = timed(network.betweenness)
+            samples["betweenness_vectorized"].append(elapsed)
+        _, elapsed = timed(brute_force_betweenness, network)
+        samples["betweenness_brute_force"].append(elapsed)
+    return {name: summarize(values) for name, values in samples.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--chain", type=int, default=40)
+    args = parser.parse_args()
+
+    results = run(args.rows, args.chain)
+    print_table(results)
+    record("network_betweenness", results, rows=args.rows, chain=args.chain)
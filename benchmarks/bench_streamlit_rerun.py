@@ -0,0 +1,53 @@
+"""Latência de interação do app_streamlit.py (troca de métrica e slider do mapa)
+
+Uso: python -m benchmarks.bench_streamlit_rerun --rows 200000 --iterations 20
+"""
+import argparse
+import os
+import tempfile
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.harness import print_table, record, summarize, timed
+from benchmarks.synthetic import write_df_view
+from voos.metrics import METRIC_LABELS
+
+APP_PATH = str(Path(__file__).resolve().parents[1] / "app_streamlit.py")
+METRICS = list(METRIC_LABELS)
+SLIDER_VALUES = [10, 30, 50, 75, 100]
+
+
+def run(rows, iterations, timeout=300):
+    samples = {"cold_start": [], "metric_change": [], "map_slider": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["FLIGHTS_DF_VIEW"] = write_df_view(Path(tmp) / "df_view.csv", rows)
+        at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+
+        _, elapsed = timed(at.run)
+        samples["cold_start"].append(elapsed)
+
+        for i in range(iterations):
+            metric = METRICS[(i + 1) % len(METRICS)]
+            _, elapsed = timed(at.radio(key="selected_metric").set_value(metric).run)
+            samples["metric_change"].append(elapsed)
+
+            value = SLIDER_VALUES[i % len(SLIDER_VALUES)]
+            _, elapsed = timed(at.slider(key="map_quantity").set_value(value).run)
+            samples["map_slider"].append(elapsed)
+
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+
+    return {name: summarize(values) for name, values in samples.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    results = run(args.rows, args.iterations)
+    print_table(results)
+    record("streamlit_rerun", results, rows=args.rows, iterations=args.iterations)
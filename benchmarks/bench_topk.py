@@ -0,0 +1,44 @@
+"""Top-N de rotas do mapa: groupby + sort completo vs. acumuladores incrementais (voos.topk)
+
+Simula um feed intradiário: os voos chegam em lotes e, após cada lote, o mapa pede o top-N.
+A conferência contra o groupby fica em tests/test_topk.py.
+Uso: python -m benchmarks.bench_topk --rows 500000 --batch 10000
+"""
+import argparse
+
+from benchmarks.harness import print_table, record, summarize, timed
+from benchmarks.synthetic import generate_df_view
+from voos.maps import _processar_dados_rotas
+from voos.metrics import METRIC_CONFIG
+from voos.topk import RouteAccumulator
+
+
+def run(rows, batch, top_n=30, metric="avg_delay"):
+    df = generate_df_view(rows)
+    df["DELAY_PER_DISTANCE"] = df["DELAY_OVERALL"] / df["DISTANCE"]
+    config = METRIC_CONFIG[metric]
+
+    samples = {"groupby_sort": [], "accumulator_update": [], "accumulator_top": []}
+    acc = RouteAccumulator()
+    for start in range(0, rows, batch):
+        seen = df.iloc[:start + batch]
+        _, elapsed = timed(_processar_dados_rotas, seen, config, top_n)
+        samples["groupby_sort"].append(elapsed)
+
+        _, elapsed = timed(acc.update, df.iloc[start:start + batch])
+        samples["accumulator_update"].append(elapsed)
+        _, elapsed = timed(acc.top, config, top_n)
+        samples["accumulator_top"].append(elapsed)
+    return {name: summarize(values) for name, values in samples.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--batch", type=int, default=10_000)
+    parser.add_argument("--top-n", type=int, default=30)
+    args = parser.parse_args()
+
+    results = run(args.rows, args.batch, args.top_n)
+    print_table(results)
+    record("route_topk", results, rows=args.rows, batch=args.batch, top_n=args.top_n)
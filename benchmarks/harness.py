@@ -0,0 +1,54 @@
+"""Utilitários comuns dos benchmarks: cronometragem, percentis e histórico"""
+import json
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+HISTORY_PATH = Path(__file__).with_name("history.jsonl")
+
+
+def timed(fn, *args, **kwargs):
+    """Executa fn e devolve (resultado, segundos)"""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def summarize(samples):
+    """Resume uma lista de latências (s) em p50/p95/p99 (ms)"""
+    values = np.asarray(samples, dtype=float) * 1000
+    if values.size == 0:
+        return {"n": 0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"n": int(values.size), "mean_ms": float(values.mean()), "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+
+
+def _git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=HISTORY_PATH.parent)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def record(benchmark, results, **meta):
+    """Acrescenta uma execução ao histórico de benchmarks (uma linha JSON por execução)"""
+    entry = {
+        "benchmark": benchmark,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_rev": _git_revision(),
+        "meta": meta,
+        "results": results,
+    }
+    with open(HISTORY_PATH, "a", encoding="utf-8") as fh:
+        fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    return entry
+
+
+def print_table(results):
+    for name, stats in results.items():
+        if stats.get("n"):
+            print(f"{name:<28} n={stats['n']:<5} p50={stats['p50_ms']:9.1f} ms  p95={stats['p95_ms']:9.1f} ms  p99={stats['p99_ms']:9.1f} ms")
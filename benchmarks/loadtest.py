@@ -0,0 +1,496 @@
+"""Teste de carga com sessões concorrentes para os dois dashboards
+
+Sobe o app_streamlit.py e o app Dash localmente sobre o dataset sintético (nada sai da
+máquina) e simula N usuários que repetem um roteiro de interações gravado em JSON
+(benchmarks/load_scripts/). Cada usuário do Streamlit fala o protocolo do navegador
+(websocket /_stcore/stream, BackMsg/ForwardMsg) e mede do pedido de rerun até o
+script_finished; cada usuário do Dash chama /_dash-update-component como o
+dash-renderer: dispara os callbacks do servidor ligados à propriedade alterada, segue
+a cadeia de callbacks e consulta os dcc.Interval habilitados até eles se desligarem.
+Reporta p50/p95/p99 por passo, vazão, CPU e RSS da árvore de processos de cada
+servidor (amostrados em /proc) e grava tudo no histórico de benchmarks.
+
+Uso: python -m benchmarks.loadtest --app both --users 10 --duration 60 --rows 200000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+from benchmarks.harness import print_table, record, summarize
+from benchmarks.synthetic import write_df_view
+
+ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS_DIR = Path(__file__).with_name("load_scripts")
+APPS = ["streamlit", "dash"]
+STARTUP_TIMEOUT = 300
+STEP_TIMEOUT = 300
+SAMPLE_INTERVAL = 0.5
+
+
+# --- Roteiros ---
+
+def load_script(path):
+    """Roteiro gravado: {"app": ..., "steps": [{"target": ..., "value" | "index" | "choices" | "random"}, {"think": s}]}"""
+    with open(path, encoding="utf-8") as fh:
+        script = json.load(fh)
+    for step in script["steps"]:
+        if "think" not in step and "target" not in step:
+            raise ValueError(f"Passo sem 'target' nem 'think' em {path}: {step}")
+    return script
+
+
+def _pick(step, options, rng):
+    """Valor do passo: fixo, por índice das opções, sorteado de uma lista ou das opções do widget"""
+    if "value" in step:
+        return step["value"]
+    if "index" in step:
+        return options[step["index"]]
+    if "choices" in step:
+        return rng.choice(step["choices"])
+    if step.get("random"):
+        return rng.choice(options)
+    raise ValueError(f"Passo sem valor: {step}")
+
+
+def _think(step, rng):
+    return step["think"] * rng.uniform(0.5, 1.5)
+
+
+# --- Servidores e amostragem de CPU/RSS ---
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(app, port, env):
+    """Sobe um dos apps em 127.0.0.1:port e espera ele responder"""
+    if app == "streamlit":
+        cmd = [sys.executable, "-m", "streamlit", "run", str(ROOT / "app_streamlit.py"), "--server.port", str(port),
+               "--server.address", "127.0.0.1", "--server.headless", "true", "--browser.gatherUsageStats", "false"]
+        cwd, health = ROOT, f"http://127.0.0.1:{port}/_stcore/health"
+    else:
+        cmd = [sys.executable, "-c", f"import app; app.app.run(host='127.0.0.1', port={port}, debug=False)"]
+        cwd, health = ROOT / "app_first_version", f"http://127.0.0.1:{port}/_dash-layout"
+    log = tempfile.NamedTemporaryFile("w+", prefix=f"loadtest_{app}_", suffix=".log", delete=False)
+    proc = subprocess.Popen(cmd, cwd=cwd, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{app} encerrou ao subir (log: {log.name})")
+        try:
+            if requests.get(health, timeout=2).ok:
+                return proc, log.name
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    proc.kill()
+    raise RuntimeError(f"{app} não respondeu em {STARTUP_TIMEOUT} s (log: {log.name})")
+
+
+def _process_tree(pid):
+    """PIDs do processo e de todos os descendentes (Linux, via /proc)"""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as fh:
+                    ppid = int(fh.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+    tree, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        tree.append(current)
+        stack.extend(children.get(current, []))
+    return tree
+
+
+def _cpu_rss(pid):
+    """(segundos de CPU, RSS em bytes) de um processo"""
+    with open(f"/proc/{pid}/stat") as fh:
+        fields = fh.read().rsplit(")", 1)[1].split()
+    # Campos 14/15 (utime/stime) e 24 (rss em páginas), contando a partir do estado (campo 3)
+    ticks = int(fields[11]) + int(fields[12])
+    return ticks / os.sysconf("SC_CLK_TCK"), int(fields[21]) * os.sysconf("SC_PAGE_SIZE")
+
+
+class ResourceSampler(threading.Thread):
+    """Amostra CPU (%) e RSS da árvore de processos de um servidor a cada SAMPLE_INTERVAL"""
+
+    def __init__(self, pid):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.samples = []  # (cpu %, rss MB, processos)
+        self._stop_event = threading.Event()
+        self._cpu = {}
+
+    def _read(self):
+        cpu, rss, count = 0.0, 0, 0
+        for pid in _process_tree(self.pid):
+            try:
+                seconds, resident = _cpu_rss(pid)
+            except (OSError, IndexError, ValueError):
+                continue
+            cpu += seconds - self._cpu.get(pid, seconds)
+            self._cpu[pid] = seconds
+            rss += resident
+            count += 1
+        return cpu, rss, count
+
+    def run(self):
+        if not os.path.isdir("/proc"):
+            return
+        self._read()
+        last = time.monotonic()
+        while not self._stop_event.wait(SAMPLE_INTERVAL):
+            cpu, rss, count = self._read()
+            now = time.monotonic()
+            self.samples.append((100 * cpu / (now - last), rss / 2**20, count))
+            last = now
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        if not self.samples:
+            return {"note": "sem /proc: CPU e RSS não amostrados"}
+        cpu = [sample[0] for sample in self.samples]
+        rss = [sample[1] for sample in self.samples]
+        return {
+            "cpu_mean_pct": sum(cpu) / len(cpu),
+            "cpu_peak_pct": max(cpu),
+            "rss_peak_mb": max(rss),
+            "rss_end_mb": rss[-1],
+            "processes": max(sample[2] for sample in self.samples),
+        }
+
+
+# --- Usuário do Streamlit: protocolo do navegador via websocket ---
+
+class StreamlitUser:
+    """Sessão do navegador: envia reruns com o estado dos widgets e espera o script terminar"""
+
+    def __init__(self, port, rng):
+        self.url = f"ws://127.0.0.1:{port}/_stcore/stream"
+        self.rng = rng
+        self.widgets = {}  # chave do usuário -> (tipo, proto do widget, fragmento)
+        self.states = {}  # id do widget -> WidgetState enviado
+        self.page_hash = ""
+        self.errors = 0
+        self.ws = None
+
+    async def connect(self):
+        from websockets.asyncio.client import connect
+
+        self.ws = await connect(self.url, subprotocols=["streamlit"], max_size=None, open_timeout=STEP_TIMEOUT)
+        await self._rerun()
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+    async def _rerun(self, fragment_id=""):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.page_script_hash = self.page_hash
+        msg.rerun_script.fragment_id = fragment_id  # widget dentro de @st.fragment: só o fragmento roda
+        msg.rerun_script.widget_states.widgets.extend(self.states.values())
+        await self.ws.send(msg.SerializeToString())
+        await self._wait_finished()
+
+    async def _wait_finished(self):
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        while True:
+            msg = ForwardMsg()
+            msg.ParseFromString(await asyncio.wait_for(self.ws.recv(), STEP_TIMEOUT))
+            kind = msg.WhichOneof("type")
+            if kind == "new_session":
+                self.page_hash = msg.new_session.main_script_hash
+            elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                element = msg.delta.new_element
+                widget = getattr(element, element.WhichOneof("type") or "empty")
+                if element.WhichOneof("type") == "exception":
+                    self.errors += 1
+                elif getattr(widget, "id", "").count("-") >= 2:
+                    self.widgets[widget.id.split("-", 2)[2]] = (element.WhichOneof("type"), widget, msg.delta.fragment_id)
+            elif kind == "script_finished":
+                if msg.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    if msg.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                        self.errors += 1
+                    return
+
+    async def step(self, step):
+        """Aplica um passo do roteiro; devolve False se o widget não existe nesta tela"""
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        if step["target"] not in self.widgets:
+            return False
+        kind, widget, fragment_id = self.widgets[step["target"]]
+        state = WidgetState(id=widget.id)
+        if kind in ("radio", "selectbox"):
+            state.string_value = str(_pick(step, list(widget.options), self.rng))
+        elif kind == "multiselect":
+            value = _pick(step, list(widget.options), self.rng)
+            state.string_array_value.data.extend(value if isinstance(value, list) else [value])
+        elif kind == "slider":
+            value = _pick(step, list(range(int(widget.min), int(widget.max) + 1, int(widget.step) or 1)), self.rng)
+            state.double_array_value.data.extend(value if isinstance(value, list) else [value])
+        elif kind == "checkbox":
+            state.bool_value = bool(_pick(step, [True, False], self.rng))
+        else:
+            raise ValueError(f"Widget '{step['target']}' ({kind}) não suportado pelo roteiro")
+        self.states[widget.id] = state
+        await self._rerun(fragment_id)
+        return True
+
+
+# --- Usuário do Dash: callbacks do servidor como o dash-renderer ---
+
+def _parse_output(output):
+    """'..a.figure...b.value..' ou 'a.figure' -> [(id, propriedade)]"""
+    parts = output[2:-2].split("...") if output.startswith("..") else [output]
+    return [tuple(part.rsplit(".", 1)) for part in parts]
+
+
+def _walk_layout(node, props, types):
+    if isinstance(node, list):
+        for child in node:
+            _walk_layout(child, props, types)
+    elif isinstance(node, dict) and "props" in node:
+        if "id" in node["props"]:
+            props[node["props"]["id"]] = dict(node["props"])
+            types[node["props"]["id"]] = node.get("type")
+        _walk_layout(node["props"].get("children"), props, types)
+
+
+class DashUser:
+    """Sessão do navegador: estado dos componentes, cadeia de callbacks e intervalos"""
+
+    def __init__(self, port, rng, dependencies, layout):
+        self.base = f"http://127.0.0.1:{port}"
+        self.rng = rng
+        self.session = requests.Session()
+        self.callbacks = [dep for dep in dependencies if dep["clientside_function"] is None]
+        self.props, self.types = {}, {}
+        _walk_layout(layout, self.props, self.types)
+        self.errors = 0
+        self.requests = 0
+
+    def _value(self, cid, prop):
+        return self.props.get(cid, {}).get(prop)
+
+    def _payload(self, callback, changed):
+        outputs = [{"id": cid, "property": prop} for cid, prop in _parse_output(callback["output"])]
+        return {
+            "output": callback["output"],
+            "outputs": outputs if callback["output"].startswith("..") else outputs[0],
+            "inputs": [dict(item, value=self._value(item["id"], item["property"])) for item in callback["inputs"]],
+            "state": [dict(item, value=self._value(item["id"], item["property"])) for item in callback["state"]],
+            "changedPropIds": sorted(changed),
+        }
+
+    def _call(self, callback, changed):
+        """Chama um callback; devolve as propriedades que mudaram"""
+        self.requests += 1
+        response = self.session.post(f"{self.base}/_dash-update-component", json=self._payload(callback, changed), timeout=STEP_TIMEOUT)
+        if response.status_code == 204:
+            return set()
+        if not response.ok:
+            self.errors += 1
+            return set()
+        updated = set()
+        for cid, values in response.json().get("response", {}).items():
+            for prop, value in values.items():
+                prop = prop.split("@", 1)[0]
+                self.props.setdefault(cid, {})[prop] = value
+                updated.add(f"{cid}.{prop}")
+        return updated
+
+    def _triggered(self, changed):
+        return [cb for cb in self.callbacks if any(f"{item['id']}.{item['property']}" in changed for item in cb["inputs"])]
+
+    def cascade(self, pending, changed):
+        """Roda os callbacks pendentes respeitando a cadeia (um callback espera os que o alimentam)"""
+        pending = list(pending)
+        while pending:
+            feeding = {f"{cid}.{prop}" for cb in pending for cid, prop in _parse_output(cb["output"])}
+            ready = [cb for cb in pending
+                     if not any(f"{item['id']}.{item['property']}" in feeding for item in cb["inputs"])] or pending
+            updated = set()
+            for callback in ready:
+                updated |= self._call(callback, changed)
+            pending = [cb for cb in pending if cb not in ready]
+            pending += [cb for cb in self._triggered(updated) if cb not in pending]
+            changed = updated
+
+    def _intervals(self):
+        return {cid for cid, kind in self.types.items() if kind == "Interval" and not self.props[cid].get("disabled")}
+
+    def poll(self, enabled_before):
+        """Consulta os intervalos ligados pelo passo até eles se desligarem (ex.: jobs pesados)"""
+        deadline = time.monotonic() + STEP_TIMEOUT
+        active = self._intervals() - enabled_before
+        while active and time.monotonic() < deadline:
+            time.sleep(min(self.props[cid].get("interval", 1000) for cid in active) / 1000)
+            for cid in active:
+                self.props[cid]["n_intervals"] = (self.props[cid].get("n_intervals") or 0) + 1
+                changed = {f"{cid}.n_intervals"}
+                self.cascade(self._triggered(changed), changed)
+            active &= self._intervals()
+
+    def connect(self):
+        """Carga inicial da página: callbacks sem prevent_initial_call cujas entradas existem"""
+        self.session.get(f"{self.base}/", timeout=STEP_TIMEOUT)
+        enabled = self._intervals()
+        initial = [cb for cb in self.callbacks if not cb["prevent_initial_call"]
+                   and all(item["id"] in self.props for item in cb["inputs"])]
+        self.cascade(initial, {f"{item['id']}.{item['property']}" for cb in initial for item in cb["inputs"]})
+        self.poll(enabled)
+
+    def step(self, step):
+        cid, prop = step["target"], step.get("property", "value")
+        if cid not in self.props:
+            return False
+        options = [opt["value"] if isinstance(opt, dict) else opt for opt in self.props[cid].get("options") or []]
+        self.props[cid][prop] = _pick(step, options, self.rng)
+        changed = {f"{cid}.{prop}"}
+        triggered = self._triggered(changed)
+        if not triggered:
+            return None  # só callbacks no navegador (clientside): nada a medir no servidor
+        enabled = self._intervals()
+        self.cascade(triggered, changed)
+        self.poll(enabled)
+        return True
+
+    def close(self):
+        self.session.close()
+
+
+# --- Execução ---
+
+async def _run_user(app, port, script, deadline, rng, samples, counters, shared):
+    start = time.perf_counter()
+    if app == "streamlit":
+        user = StreamlitUser(port, rng)
+        await user.connect()
+    else:
+        user = DashUser(port, rng, *shared)
+        await asyncio.to_thread(user.connect)
+    samples.setdefault("session_start", []).append(time.perf_counter() - start)
+    try:
+        while time.monotonic() < deadline:
+            for step in script["steps"]:
+                if time.monotonic() >= deadline:
+                    break
+                if "think" in step:
+                    await asyncio.sleep(_think(step, rng))
+                    continue
+                start = time.perf_counter()
+                done = await (user.step(step) if app == "streamlit" else asyncio.to_thread(user.step, step))
+                if done:
+                    samples.setdefault(step["target"], []).append(time.perf_counter() - start)
+                    counters["interactions"] += 1
+                else:
+                    counters["skipped" if done is False else "clientside"] += 1
+    finally:
+        counters["errors"] += user.errors
+        await user.close() if app == "streamlit" else user.close()
+
+
+async def _run_users(app, port, script, users, duration, seed, shared):
+    samples, counters = {}, {"interactions": 0, "skipped": 0, "clientside": 0, "errors": 0}
+    deadline = time.monotonic() + duration
+    start = time.perf_counter()
+    # Chegada escalonada: os usuários não abrem a página no mesmo instante
+    tasks = []
+    for i in range(users):
+        tasks.append(asyncio.create_task(_run_user(app, port, script, deadline, random.Random(seed + i), samples, counters, shared)))
+        await asyncio.sleep(min(1.0, duration / (4 * users)))
+    outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    counters["failed_users"] = sum(isinstance(outcome, Exception) for outcome in outcomes)
+    for outcome in outcomes:
+        if isinstance(outcome, Exception):
+            print(f"⚠️ usuário {app} falhou: {outcome!r}")
+    counters["per_second"] = counters["interactions"] / elapsed
+    return samples, counters
+
+
+def run(apps, users, duration, rows, scripts=None, seed=0):
+    """Sobe cada app, roda os usuários e devolve os resultados por app:passo"""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, FLIGHTS_DF_VIEW=write_df_view(Path(tmp) / "df_view.csv", rows))
+        for app in apps:
+            script = load_script((scripts or {}).get(app) or SCRIPTS_DIR / f"{app}.json")
+            port = _free_port()
+            proc, log = start_server(app, port, env)
+            sampler = ResourceSampler(proc.pid)
+            sampler.start()
+            try:
+                shared = None
+                if app == "dash":
+                    base = f"http://127.0.0.1:{port}"
+                    shared = (requests.get(f"{base}/_dash-dependencies", timeout=STEP_TIMEOUT).json(),
+                              requests.get(f"{base}/_dash-layout", timeout=STEP_TIMEOUT).json())
+                samples, counters = asyncio.run(_run_users(app, port, script, users, duration, seed, shared))
+            finally:
+                resources = sampler.stop()
+                proc.terminate()
+                try:
+                    proc.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+            for name, values in samples.items():
+                results[f"{app}:{name}"] = summarize(values)
+            results[f"{app}:throughput"] = counters
+            results[f"{app}:resources"] = resources
+            print(f"{app}: log do servidor em {log}")
+    return results
+
+
+def print_report(results):
+    print_table(results)
+    for name, stats in results.items():
+        if name.endswith(":throughput"):
+            print(f"{name:<28} {stats['interactions']} interações ({stats['per_second']:.2f}/s), "
+                  f"{stats['clientside']} só no navegador, {stats['skipped']} sem widget, "
+                  f"{stats['errors']} erros, {stats['failed_users']} usuários com falha")
+        elif name.endswith(":resources") and "cpu_mean_pct" in stats:
+            print(f"{name:<28} CPU média={stats['cpu_mean_pct']:.0f}% pico={stats['cpu_peak_pct']:.0f}%  "
+                  f"RSS pico={stats['rss_peak_mb']:.0f} MB  processos={stats['processes']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", choices=APPS + ["both"], default="both")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=60, help="segundos de carga por app")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--streamlit-script", help="roteiro JSON (padrão: load_scripts/streamlit.json)")
+    parser.add_argument("--dash-script", help="roteiro JSON (padrão: load_scripts/dash.json)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    apps = APPS if args.app == "both" else [args.app]
+    scripts = {"streamlit": args.streamlit_script, "dash": args.dash_script}
+    results = run(apps, args.users, args.duration, args.rows, scripts, args.seed)
+    print_report(results)
+    record("loadtest", results, apps=apps, users=args.users, duration=args.duration, rows=args.rows,
+           scripts={app: scripts[app] or f"load_scripts/{app}.json" for app in apps}, seed=args.seed)
@@ -0,0 +1,129 @@
+"""Gerador de dados sintéticos no formato do df_view.csv (para benchmarks offline)"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from voos.airports import AIRPORTS_PATH
+from voos.geometry import great_circle_miles
+
+HUBS = [
+    "ATL", "DFW", "DEN", "ORD", "LAX", "CLT", "LAS", "PHX", "MCO", "SEA",
+    "MIA", "IAH", "JFK", "FLL", "EWR", "SFO", "MSP", "DTW", "BOS", "SLC",
+    "PHL", "BWI", "TPA", "SAN", "LGA", "MDW", "BNA", "IAD", "DCA", "AUS",
+    "DAL", "HOU", "PDX", "STL", "RDU", "SJC", "MCI", "SMF", "SNA", "OAK",
+    "MSY", "SAT", "RSW", "CLE", "PIT", "IND", "CMH", "CVG", "JAX", "ONT",
+    "BUR", "OGG", "HNL", "ANC", "ABQ", "BDL", "BOI", "ELP", "OMA", "TUS",
+]
+
+AIRLINES = [
+    "ALASKA AIRLINES INC.", "ALLEGIANT AIR", "AMERICAN AIRLINES INC.", "DELTA AIR LINES INC.",
+    "ENDEAVOR AIR INC.", "ENVOY AIR", "FRONTIER AIRLINES INC.", "HAWAIIAN AIRLINES INC.",
+    "JETBLUE AIRWAYS", "PSA AIRLINES INC.", "REPUBLIC AIRLINE", "SKYWEST AIRLINES INC.",
+    "SOUTHWEST AIRLINES CO.", "SPIRIT AIR LINES", "UNITED AIR LINES INC.",
+]
+
+WEEKDAYS = ["Segunda-feira", "Terça-feira", "Quarta-feira", "Quinta-feira", "Sexta-feira", "Sábado", "Domingo"]
+PERIODS = np.array(["Madrugada"] * 6 + ["Manhã"] * 6 + ["Tarde"] * 6 + ["Noite"] * 6)
+
+
+def _load_hubs():
+    airports = pd.read_csv(AIRPORTS_PATH).set_index("iata").loc[HUBS]
+    airports["CITY"] = airports["city"] + ", " + airports["state"]
+    return airports
+
+
+def _hhmm(minutes):
+    """Minutos (podem passar da meia-noite) -> horário HHMM como no BTS"""
+    minutes = np.asarray(minutes) % (24 * 60)
+    return (minutes // 60 * 100 + minutes % 60).astype(np.float64)
+
+
+def generate_df_view(n_rows, seed=0, start="2023-01-01", days=31):
+    """Gera um DataFrame com as colunas do df_view e distribuições plausíveis"""
+    rng = np.random.default_rng(seed)
+    hubs = _load_hubs()
+
+    # Tráfego concentrado nos maiores aeroportos (Zipf)
+    weights = 1.0 / np.arange(1, len(hubs) + 1)
+    weights /= weights.sum()
+    origin = rng.choice(len(hubs), size=n_rows, p=weights)
+    dest = rng.choice(len(hubs) - 1, size=n_rows, p=np.delete(weights, 0) / np.delete(weights, 0).sum())
+    dest = np.where(dest >= origin, dest + 1, dest)
+
+    dates = pd.Timestamp(start) + pd.to_timedelta(rng.integers(0, days, n_rows), unit="D")
+    hour_weights = np.array([1, 1, 1, 1, 2, 6, 9, 9, 9, 8, 8, 8, 8, 8, 8, 8, 8, 8, 8, 7, 6, 5, 3, 2], dtype=float)
+    hours = rng.choice(24, size=n_rows, p=hour_weights / hour_weights.sum())
+
+    cancelled = rng.random(n_rows) < 0.02
+    diverted = ~cancelled & (rng.random(n_rows) < 0.003)
+    delayed = ~cancelled & (rng.random(n_rows) < 0.35 + 0.01 * (hours > 15))
+    delay_minutes = np.where(delayed, np.ceil(rng.exponential(40, n_rows)), 0).astype(np.int64)
+
+    # Causas só são reportadas para atrasos >= 15 min; os minutos são divididos entre as cinco
+    cause_split = rng.dirichlet([3, 1, 3, 0.2, 4], size=n_rows)
+    cause_minutes = np.where((delay_minutes >= 15)[:, None], np.round(cause_split * delay_minutes[:, None]), 0)
+    cause_minutes = cause_minutes.astype(np.uint16)
+
+    lat = hubs["latitude"].to_numpy()
+    lon = hubs["longitude"].to_numpy()
+    distance = great_circle_miles(lat[origin], lon[origin], lat[dest], lon[dest]).round().astype(np.int64)
+
+    airlines = rng.choice(AIRLINES, size=n_rows)
+
+    # Horários HHMM (sem fusos) e taxi-out maior nos hubs; cancelados não têm horários realizados
+    sched_dep = hours * 60 + rng.integers(0, 60, n_rows)
+    sched_arr = sched_dep + 30 + np.round(distance / 8).astype(np.int64)
+    dep = sched_dep + np.where(delayed, delay_minutes, -rng.integers(0, 6, n_rows))
+    arr = sched_arr + np.where(delayed, delay_minutes, -rng.integers(0, 15, n_rows))
+    taxi_out = np.round(8 + 150 * weights[origin] + rng.exponential(6, n_rows))
+    taxi_in = np.round(4 + 60 * weights[dest] + rng.exponential(3, n_rows))
+
+    return pd.DataFrame({
+        "FL_DATE": dates.strftime("%Y-%m-%d"),
+        "FL_DAY": dates.day.astype(float),
+        "ORIGIN": hubs.index.to_numpy()[origin],
+        "DEST": hubs.index.to_numpy()[dest],
+        "ORIGIN_CITY": hubs["CITY"].to_numpy()[origin],
+        "ORIGIN_STATE": hubs["state"].to_numpy()[origin],
+        "DEST_CITY": hubs["CITY"].to_numpy()[dest],
+        "CANCELLED": cancelled,
+        "DIVERTED": diverted,
+        "DELAY": delay_minutes > 0,
+        "DISTANCE": distance,
+        "AIRLINE_Description": airlines,
+        "DELAY_OVERALL": delay_minutes,
+        "TIME_PERIOD": PERIODS[hours],
+        "DAY_OF_WEEK": np.array(WEEKDAYS)[dates.dayofweek],
+        "TIME_HOUR": hours,
+        "ORIGIN_LAT": lat[origin],
+        "ORIGIN_LON": lon[origin],
+        "DEST_LAT": lat[dest],
+        "DEST_LON": lon[dest],
+        "DELAY_DUE_CARRIER": cause_minutes[:, 0],
+        "DELAY_DUE_WEATHER": cause_minutes[:, 1],
+        "DELAY_DUE_NAS": cause_minutes[:, 2],
+        "DELAY_DUE_SECURITY": cause_minutes[:, 3],
+        "DELAY_DUE_LATE_AIRCRAFT": cause_minutes[:, 4],
+        "CRS_DEP_TIME": _hhmm(sched_dep),
+        "DEP_TIME": np.where(cancelled, np.nan, _hhmm(dep)),
+        "CRS_ARR_TIME": _hhmm(sched_arr),
+        "ARR_TIME": np.where(cancelled | diverted, np.nan, _hhmm(arr)),
+        "TAXI_OUT": np.where(cancelled, np.nan, taxi_out),
+        "TAXI_IN": np.where(cancelled | diverted, np.nan, taxi_in),
+    })
+
+
+def write_df_view(path, n_rows, seed=0):
+    """Grava o dataset sintético em CSV e devolve o caminho"""
+    generate_df_view(n_rows, seed=seed).to_csv(path, encoding="utf-8")
+    return str(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera um df_view.csv sintético")
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="df_view_synthetic.csv")
+    args = parser.parse_args()
+    print(f"Arquivo gerado: {write_df_view(args.out, args.rows, args.seed)}")
@@ -0,0 +1,11 @@
+import pytest
+
+from benchmarks.synthetic import write_df_view
+from voos.dataset import read_df_view
+
+
+@pytest.fixture(scope="session")
+def df_view(tmp_path_factory):
+    """df_view sintético lido como no dashboard (tipos validados e colunas derivadas)"""
+    df, _ = read_df_view(write_df_view(tmp_path_factory.mktemp("dados") / "df_view.csv", 60_000))
+    return df
@@ -0,0 +1,26 @@
+"""Intermediação da rede de aeroportos (voos.network) contra referências conhecidas"""
+import numpy as np
+import pytest
+
+from benchmarks.bench_network import brute_force_betweenness, chain_network
+from benchmarks.synthetic import generate_df_view
+from voos.network import AirportNetwork
+
+
+@pytest.mark.parametrize("n", [3, 5, 12])
+def test_chain_matches_closed_form(n):
+    # Na cadeia, o nó i fica entre os i nós à esquerda e os n-1-i à direita, nos dois sentidos
+    i = np.arange(n)
+    expected = 2 * i * (n - 1 - i) / ((n - 1) * (n - 2))
+    assert np.allclose(chain_network(n).betweenness(), expected)
+
+
+def test_synthetic_network_matches_brute_force():
+    network = AirportNetwork.build(generate_df_view(20_000))
+    assert np.allclose(network.betweenness(), brute_force_betweenness(network))
+
+
+def test_sample_of_every_source_is_exact():
+    network = chain_network(8)
+    n = network.flights.shape[0]
+    assert np.allclose(network.betweenness(sample=n), network.betweenness())
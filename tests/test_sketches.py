@@ -0,0 +1,57 @@
+"""Sketches de quantis (voos.sketches) e cubo diário (voos.aggregates) contra o cálculo exato"""
+import numpy as np
+import pytest
+
+from voos.aggregates import FlightCube
+from voos.metrics import METRIC_CONFIG
+from voos.sketches import RELATIVE_ACCURACY, build_sketches, merge_sketches, sketch_quantiles
+
+QUANTILES = [0.1, 0.5, 0.75, 0.9, 0.99]
+
+
+def _delays(n, seed=0):
+    """Atrasos com zeros, adiantamentos e cauda longa, como no DELAY_OVERALL"""
+    rng = np.random.default_rng(seed)
+    values = np.ceil(rng.exponential(40, n)) * (rng.random(n) < 0.4)
+    return np.where(rng.random(n) < 0.2, -rng.integers(1, 20, n), values)
+
+
+def _assert_within_accuracy(got, exact):
+    # Valores <= 0 caem na faixa zero; os demais têm erro relativo limitado
+    exact = np.maximum(exact, 0)
+    assert np.all(np.abs(got - exact) <= RELATIVE_ACCURACY * exact + 1e-9)
+
+
+def test_quantiles_within_relative_accuracy():
+    values = _delays(50_000)
+    got = sketch_quantiles(build_sketches(np.zeros(len(values), dtype=np.int64), values, 1), QUANTILES)[0]
+    _assert_within_accuracy(got, np.quantile(values, QUANTILES, method="lower"))
+
+
+def test_merge_equals_single_sketch():
+    values = _delays(10_000)
+    groups = np.random.default_rng(1).integers(0, 4, len(values))
+    halves = [build_sketches(groups[part], values[part], 4) for part in (slice(None, 5_000), slice(5_000, None))]
+    assert np.array_equal(merge_sketches(halves), build_sketches(groups, values, 4))
+
+
+def test_empty_group_and_missing_values():
+    sketches = build_sketches(np.array([0, 0, -1]), np.array([10.0, np.nan, 50.0]), 2)
+    assert sketches.sum() == 1
+    assert np.isnan(sketch_quantiles(sketches, 0.5)[1, 0])
+
+
+@pytest.mark.parametrize("metric", ["avg_delay", "delay_count", "cancelled_count"])
+def test_cube_series_matches_groupby(df_view, metric):
+    df, config = df_view, METRIC_CONFIG[metric]
+    window = (df["FL_DATE"] >= "2023-01-08") & (df["FL_DATE"] <= "2023-01-21")
+    expected = df[window].groupby("AIRLINE_Description", observed=True)[config["col"]].agg(config["agg"])
+    got = FlightCube.build(df).metric_series("AIRLINE_Description", config, "2023-01-08", "2023-01-21")
+    assert np.allclose(got.to_numpy(dtype=float), expected.reindex(got.index).to_numpy(dtype=float))
+
+
+def test_cube_quantile_within_relative_accuracy(df_view):
+    df, config = df_view, METRIC_CONFIG["delay_percentile"]
+    got = FlightCube.build(df).metric_series("ORIGIN_STATE", config)
+    exact = df.groupby("ORIGIN_STATE", observed=True)["DELAY_OVERALL"].quantile(config["q"], interpolation="lower")
+    _assert_within_accuracy(got.to_numpy(dtype=float), exact.reindex(got.index).to_numpy(dtype=float))
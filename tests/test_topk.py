@@ -0,0 +1,33 @@
+"""Top-N incremental de rotas (voos.topk) contra o groupby + sort de _processar_dados_rotas"""
+import numpy as np
+import pytest
+
+from voos.maps import _processar_dados_rotas
+from voos.metrics import METRIC_CONFIG
+from voos.topk import ROUTE_KEYS, RouteAccumulator
+
+TOP_N = 30
+
+
+@pytest.fixture(scope="module")
+def accumulator(df_view):
+    # Lotes pequenos: o top é consultado no meio do feed e os candidatos precisam se refazer
+    acc = RouteAccumulator(candidates=40)
+    for start in range(0, len(df_view), 5_000):
+        acc.update(df_view.iloc[start:start + 5_000])
+        acc.top(METRIC_CONFIG["avg_delay"], TOP_N)
+    return acc
+
+
+@pytest.mark.parametrize("metric", list(METRIC_CONFIG))
+def test_top_matches_groupby(df_view, accumulator, metric):
+    config = METRIC_CONFIG[metric]
+    expected = _processar_dados_rotas(df_view, config, TOP_N)
+    got = accumulator.top(config, TOP_N)
+    col = config["col"]
+    values = expected[col].to_numpy(dtype=float)
+    assert np.allclose(got[col].to_numpy(dtype=float), values)
+    # Mesmas rotas acima do último valor (empates na fronteira podem entrar em qualquer ordem)
+    above = values > values[-1] + 1e-9
+    assert set(got.loc[above, ROUTE_KEYS].itertuples(index=False, name=None)) == set(
+        expected.loc[above, ROUTE_KEYS].itertuples(index=False, name=None))
@@ -0,0 +1,312 @@
+"""Cubo de agregados parciais diários por dimensão
+
+Para cada dimensão dos gráficos guarda, por (data, grupo), somas e contagens das
+medidas e um sketch de quantis do atraso. Tudo é mesclável: qualquer intervalo de
+datas é respondido somando as fatias diárias, sem reler as linhas brutas, e cubos
+de partições diferentes (ex.: meses) podem ser unidos com FlightCube.merge.
+"""
+import numpy as np
+import pandas as pd
+
+from voos.sketches import N_BUCKETS, build_sketches, merge_sketches, sketch_quantiles
+
+CUBE_DIMENSIONS = [
+    "AIRLINE_Description", "DISTANCE_BIN", "ORIGIN", "ORIGIN_CITY", "ORIGIN_STATE",
+    "FL_DAY", "DAY_OF_WEEK", "TIME_HOUR", "TIME_PERIOD",
+]
+
+# Causas de atraso (minutos, colunas DELAY_DUE_* do df_view)
+DELAY_CAUSES = {
+    "DELAY_DUE_CARRIER": "Companhia Aérea",
+    "DELAY_DUE_WEATHER": "Clima",
+    "DELAY_DUE_NAS": "Sistema Aéreo (NAS)",
+    "DELAY_DUE_SECURITY": "Segurança",
+    "DELAY_DUE_LATE_AIRCRAFT": "Aeronave Atrasada",
+}
+
+# Medidas somadas por (data, grupo); médias saem de soma / contagem de não nulos
+MEASURES = ["DELAY_OVERALL", "DELAY", "CANCELLED", "DIVERTED", "DELAY_PER_DISTANCE", "TAXI_OUT", "ORIGIN_LOAD_1H"] + list(DELAY_CAUSES)
+
+SKETCH_COLUMN = "DELAY_OVERALL"
+
+
+class DimensionAggregate:
+    """Somas, contagens e sketches de uma dimensão: arrays (n_datas, n_grupos[, N_BUCKETS])"""
+
+    def __init__(self, keys, flights, sums, counts, sketch=None):
+        self.keys = keys
+        self.flights = flights
+        self.sums = sums
+        self.counts = counts
+        self.sketch = sketch
+
+    def totals(self, date_mask=None):
+        """Soma as fatias diárias selecionadas; devolve um DataFrame indexado pelos grupos"""
+        rows = slice(None) if date_mask is None else date_mask
+        data = {"FLIGHTS": self.flights[rows].sum(axis=0)}
+        for col in self.sums:
+            data[f"{col}_SUM"] = self.sums[col][rows].sum(axis=0)
+            data[f"{col}_N"] = self.counts[col][rows].sum(axis=0)
+        return pd.DataFrame(data, index=self.keys)
+
+    def quantiles(self, quantiles, date_mask=None):
+        """Quantis do atraso por grupo a partir dos sketches mesclados no intervalo"""
+        rows = slice(None) if date_mask is None else date_mask
+        merged = merge_sketches(self.sketch[rows], axis=0)
+        values = sketch_quantiles(merged, quantiles)
+        return pd.DataFrame(values, index=self.keys, columns=list(np.atleast_1d(quantiles)))
+
+
+def _group_codes(series):
+    """Códigos inteiros e rótulos de uma coluna (categorias preservam a ordem definida)"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), series.cat.categories
+    codes, keys = pd.factorize(series, sort=True)
+    return codes, keys
+
+
+def _bincount_2d(date_codes, key_codes, n_dates, n_keys, weights=None):
+    flat = date_codes * n_keys + key_codes
+    out = np.bincount(flat, weights=weights, minlength=n_dates * n_keys)
+    return out.reshape(n_dates, n_keys)
+
+
+def _metric_grid(flights, sums, counts, sketch, metric_config):
+    """Valor da métrica em cada célula de uma grade (NaN onde não há voos)"""
+    if metric_config["agg"] == "quantile":
+        shape = flights.shape
+        values = sketch_quantiles(sketch.reshape(-1, N_BUCKETS), metric_config["q"])[:, 0].reshape(shape)
+    elif metric_config["agg"] == "mean":
+        values = sums / np.where(counts > 0, counts, np.nan)
+    else:
+        values = sums.astype(np.float64)
+    return np.where(flights > 0, values, np.nan)
+
+
+def crosstab_metric(df, row_col, col_col, metric_config):
+    """Métrica em uma grade linha x coluna (ex.: dia da semana x hora)
+
+    Um único np.bincount 2D sobre os códigos combinados (linha * n_colunas + coluna),
+    sem pivot_table.
+    """
+    row_codes, row_keys = _group_codes(df[row_col])
+    col_codes, col_keys = _group_codes(df[col_col])
+    valid = (row_codes >= 0) & (col_codes >= 0)
+    rc, cc = row_codes[valid].astype(np.int64), col_codes[valid].astype(np.int64)
+    n_rows, n_cols = len(row_keys), len(col_keys)
+
+    flights = _bincount_2d(rc, cc, n_rows, n_cols)
+    sums = counts = sketch = None
+    if metric_config["agg"] == "quantile":
+        values = df[SKETCH_COLUMN].to_numpy(dtype=np.float64, na_value=np.nan)[valid]
+        sketch = build_sketches(rc * n_cols + cc, values, n_rows * n_cols)
+    else:
+        values = df[metric_config["col"]].to_numpy(dtype=np.float64, na_value=np.nan)[valid]
+        not_null = ~np.isnan(values)
+        sums = _bincount_2d(rc, cc, n_rows, n_cols, weights=np.where(not_null, values, 0.0))
+        counts = _bincount_2d(rc, cc, n_rows, n_cols, weights=not_null)
+
+    grid = _metric_grid(flights, sums, counts, sketch, metric_config)
+    return pd.DataFrame(grid, index=pd.Index(row_keys, name=row_col), columns=pd.Index(col_keys, name=col_col))
+
+
+class FlightCube:
+    """Agregados parciais diários de várias dimensões sobre um eixo comum de datas"""
+
+    def __init__(self, dates, dimensions):
+        self.dates = dates
+        self.dimensions = dimensions
+
+    @classmethod
+    def build(cls, df, dimensions=CUBE_DIMENSIONS, sketch_dimensions=None):
+        """Monta o cubo em uma passada vetorizada por dimensão (np.bincount sobre códigos)"""
+        sketch_dimensions = dimensions if sketch_dimensions is None else sketch_dimensions
+        date_codes, dates = pd.factorize(df["FL_DATE"].dt.normalize(), sort=True)
+        date_codes = date_codes.astype(np.int64)
+        n_dates = len(dates)
+
+        measures = {}
+        for col in MEASURES:
+            if col in df.columns:
+                values = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+                measures[col] = (values, ~np.isnan(values))
+        sketch_values = df[SKETCH_COLUMN].to_numpy(dtype=np.float64, na_value=np.nan)
+
+        built = {}
+        for dim in dimensions:
+            if dim not in df.columns:
+                continue
+            key_codes, keys = _group_codes(df[dim])
+            valid = key_codes >= 0
+            dc, kc = date_codes[valid], key_codes[valid].astype(np.int64)
+            n_keys = len(keys)
+
+            flights = _bincount_2d(dc, kc, n_dates, n_keys).astype(np.int64)
+            sums, counts = {}, {}
+            for col, (values, not_null) in measures.items():
+                v, nn = values[valid], not_null[valid]
+                sums[col] = _bincount_2d(dc, kc, n_dates, n_keys, weights=np.where(nn, v, 0.0))
+                counts[col] = _bincount_2d(dc, kc, n_dates, n_keys, weights=nn).astype(np.int64)
+
+            sketch = None
+            if dim in sketch_dimensions:
+                sketch = build_sketches(dc * n_keys + kc, sketch_values[valid], n_dates * n_keys)
+                sketch = sketch.reshape(n_dates, n_keys, N_BUCKETS)
+
+            built[dim] = DimensionAggregate(pd.Index(keys, name=dim), flights, sums, counts, sketch)
+
+        return cls(pd.DatetimeIndex(dates), built)
+
+    def date_mask(self, start=None, end=None):
+        """Máscara booleana das datas em [start, end] (None = sem limite)"""
+        mask = np.ones(len(self.dates), dtype=bool)
+        if start is not None:
+            mask &= self.dates >= pd.Timestamp(start)
+        if end is not None:
+            mask &= self.dates <= pd.Timestamp(end)
+        return mask
+
+    def merge(self, other):
+        """Une dois cubos (ex.: partições mensais), somando datas e grupos coincidentes"""
+        dates = self.dates.union(other.dates)
+        merged = {}
+        for dim in self.dimensions.keys() & other.dimensions.keys():
+            a, b = self.dimensions[dim], other.dimensions[dim]
+            # Mantém a ordem dos grupos do primeiro cubo (ex.: dias da semana) e acrescenta os novos
+            keys = a.keys.append(b.keys[~b.keys.isin(a.keys)])
+            parts = [(a, dates.get_indexer(self.dates), keys.get_indexer(a.keys)),
+                     (b, dates.get_indexer(other.dates), keys.get_indexer(b.keys))]
+
+            def scatter(getter, shape_tail=(), dtype=np.float64):
+                out = np.zeros((len(dates), len(keys)) + shape_tail, dtype=dtype)
+                for agg, rows, cols in parts:
+                    out[np.ix_(rows, cols)] += getter(agg)
+                return out
+
+            flights = scatter(lambda agg: agg.flights, dtype=np.int64)
+            sums = {col: scatter(lambda agg, col=col: agg.sums[col]) for col in a.sums.keys() & b.sums.keys()}
+            counts = {col: scatter(lambda agg, col=col: agg.counts[col], dtype=np.int64) for col in sums}
+            sketch = None
+            if a.sketch is not None and b.sketch is not None:
+                sketch = scatter(lambda agg: agg.sketch, (N_BUCKETS,), dtype=np.uint32)
+            merged[dim] = DimensionAggregate(pd.Index(keys, name=dim), flights, sums, counts, sketch)
+        return FlightCube(dates, merged)
+
+    def metric_series(self, dim, metric_config, start=None, end=None):
+        """Série da métrica por grupo no intervalo, ordenada de forma decrescente"""
+        agg = self.dimensions[dim]
+        mask = self.date_mask(start, end)
+        observed = agg.flights[mask].sum(axis=0) > 0
+        if metric_config["agg"] == "quantile":
+            data = agg.quantiles(metric_config["q"], mask).iloc[:, 0]
+        else:
+            totals = agg.totals(mask)
+            col = metric_config["col"]
+            data = totals[f"{col}_SUM"]
+            if metric_config["agg"] == "mean":
+                data = data / totals[f"{col}_N"].replace(0, np.nan)
+        return data[observed].sort_values(ascending=False)
+
+    def day_matrix(self, dim, metric_config, top=50, start=None, end=None):
+        """Grade grupo x data da métrica para os `top` grupos com mais voos
+
+        Lida direto dos arrays (data, grupo) do cubo: nenhuma linha bruta é relida.
+        """
+        agg = self.dimensions[dim]
+        mask = self.date_mask(start, end)
+        flights = agg.flights[mask]
+        volume = flights.sum(axis=0)
+        order = np.argsort(-volume, kind="stable")[:top]
+        order = order[volume[order] > 0]
+
+        col = metric_config["col"]
+        sums = counts = sketch = None
+        if metric_config["agg"] == "quantile":
+            sketch = agg.sketch[mask][:, order]
+        else:
+            sums, counts = agg.sums[col][mask][:, order], agg.counts[col][mask][:, order]
+        grid = _metric_grid(flights[:, order], sums, counts, sketch, metric_config)
+        return pd.DataFrame(grid.T, index=agg.keys[order], columns=self.dates[mask])
+
+    def save(self, path):
+        """Grava o cubo em um único arquivo .npz"""
+        arrays = {"dates": self.dates.values.astype("datetime64[ns]")}
+        for dim, agg in self.dimensions.items():
+            arrays[f"{dim}/keys"] = np.asarray(agg.keys.astype(str), dtype=str)
+            arrays[f"{dim}/flights"] = agg.flights
+            for col in agg.sums:
+                arrays[f"{dim}/sum/{col}"] = agg.sums[col]
+                arrays[f"{dim}/count/{col}"] = agg.counts[col]
+            if agg.sketch is not None:
+                arrays[f"{dim}/sketch"] = agg.sketch
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """Lê um cubo gravado com save (rótulos dos grupos voltam como texto)"""
+        with np.load(path, allow_pickle=False) as data:
+            dims = sorted({name.split("/")[0] for name in data.files if "/" in name})
+            built = {}
+            for dim in dims:
+                sums = {name.rsplit("/", 1)[1]: data[name] for name in data.files if name.startswith(f"{dim}/sum/")}
+                counts = {col: data[f"{dim}/count/{col}"] for col in sums}
+                sketch = data[f"{dim}/sketch"] if f"{dim}/sketch" in data.files else None
+                built[dim] = DimensionAggregate(pd.Index(data[f"{dim}/keys"], name=dim), data[f"{dim}/flights"], sums, counts, sketch)
+            return cls(pd.DatetimeIndex(data["dates"]), built)
+
+
+def cause_breakdown(cube, dim, start=None, end=None):
+    """Participação de cada causa nos minutos de atraso por grupo, lida das somas do cubo
+
+    Devolve (participações, minutos totais), ordenados pelo total de minutos de atraso.
+    """
+    agg = cube.dimensions[dim]
+    mask = cube.date_mask(start, end)
+    causes = [col for col in DELAY_CAUSES if col in agg.sums]
+    minutes = np.stack([agg.sums[col][mask].sum(axis=0) for col in causes], axis=1)
+    total = minutes.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        shares = minutes / total[:, None]
+
+    order = np.argsort(-total, kind="stable")
+    order = order[total[order] > 0]
+    index = agg.keys[order]
+    shares = pd.DataFrame(shares[order], index=index, columns=[DELAY_CAUSES[col] for col in causes])
+    return shares, pd.Series(total[order], index=index, name="DELAY_MINUTES")
+
+
+def relative_risk(cube, dim, event, start=None, end=None):
+    """Risco relativo de um evento binário (DELAY, CANCELLED, DIVERTED) por grupo
+
+    Cada grupo é comparado com todos os demais voos (RR = taxa do grupo / taxa dos outros),
+    com o qui-quadrado da tabela 2x2 (correção de Yates, como o chi2_contingency da análise)
+    calculado de uma vez para todos os grupos a partir das somas do cubo.
+    """
+    from scipy.stats import chi2
+
+    agg = cube.dimensions[dim]
+    mask = cube.date_mask(start, end)
+    flights = agg.flights[mask].sum(axis=0).astype(np.float64)
+    events = agg.sums[event][mask].sum(axis=0)
+    total_flights, total_events = flights.sum(), events.sum()
+    other_flights, other_events = total_flights - flights, total_events - events
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rate = events / flights
+        other_rate = other_events / other_flights
+        rr = rate / other_rate
+
+        # Tabela 2x2 [grupo, outros] x [evento, sem evento]
+        observed = np.stack([events, flights - events, other_events, other_flights - other_events], axis=1)
+        row_totals = np.repeat(np.stack([flights, other_flights], axis=1), 2, axis=1)
+        col_totals = np.tile(np.stack([np.full_like(flights, total_events), np.full_like(flights, total_flights - total_events)], axis=1), 2)
+        expected = row_totals * col_totals / total_flights
+        diff = np.maximum(np.abs(observed - expected) - 0.5, 0)
+        statistic = (diff ** 2 / expected).sum(axis=1)
+    p_value = chi2.sf(statistic, df=1)
+
+    table = pd.DataFrame({
+        "FLIGHTS": flights.astype(np.int64), "EVENTS": events.astype(np.int64),
+        "RATE": rate, "OTHER_RATE": other_rate, "RELATIVE_RISK": rr, "CHI2": statistic, "P_VALUE": p_value,
+    }, index=agg.keys)
+    return table[table["FLIGHTS"] > 0].sort_values("RELATIVE_RISK", ascending=False)
@@ -0,0 +1,89 @@
+"""Dimensão de aeroportos: airports.csv indexado por código IATA
+
+O arquivo é lido uma vez por processo em arrays compactos ordenados pelo código
+(iata -> id de linha -> lat/lon/estado). As coordenadas dos voos são anexadas por
+gather inteiro: cada código distinto é resolvido com np.searchsorted e o resultado
+é espalhado para as linhas pelos códigos do pd.factorize, em O(n) e sem merge.
+"""
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+AIRPORTS_PATH = Path(__file__).resolve().parents[1] / "project_development" / "dataset" / "airports.csv"
+
+
+class AirportIndex:
+    """Aeroportos em arrays alinhados, ordenados pelo código IATA"""
+
+    def __init__(self, codes, lat, lon, state, city):
+        self.codes = codes
+        self.lat = lat
+        self.lon = lon
+        self.state = state
+        self.city = city
+
+    @classmethod
+    def from_csv(cls, path=AIRPORTS_PATH):
+        airports = pd.read_csv(path, usecols=["iata", "city", "state", "latitude", "longitude"], keep_default_na=False, na_values=[""])
+        airports = airports.dropna(subset=["iata"]).drop_duplicates("iata").sort_values("iata")
+        return cls(
+            airports["iata"].to_numpy(dtype=str),
+            airports["latitude"].to_numpy(dtype=np.float64),
+            airports["longitude"].to_numpy(dtype=np.float64),
+            airports["state"].to_numpy(dtype=object),
+            airports["city"].to_numpy(dtype=object),
+        )
+
+    def lookup(self, codes):
+        """Id de linha de cada código (-1 quando não existe em airports.csv)"""
+        codes = np.asarray(codes, dtype=str)
+        pos = np.clip(np.searchsorted(self.codes, codes), 0, len(self.codes) - 1)
+        return np.where(self.codes[pos] == codes, pos, -1)
+
+    def attach_coordinates(self, df, roles=("ORIGIN", "DEST")):
+        """Anexa {ROLE}_LAT/{ROLE}_LON (e {ROLE}_STATE se faltar) e devolve o relatório de cobertura"""
+        unmatched = []
+        matched = np.ones(len(df), dtype=bool)
+        for role in roles:
+            codes, uniques = pd.factorize(df[role])
+            ids = np.append(self.lookup(pd.Index(uniques).astype(str).str.strip().str.upper()), -1)
+            row_ids = ids[codes]  # código -1 (nulo) cai no sentinela -1
+            found = row_ids >= 0
+
+            df[f"{role}_LAT"] = np.where(found, self.lat[row_ids], np.nan)
+            df[f"{role}_LON"] = np.where(found, self.lon[row_ids], np.nan)
+            if f"{role}_STATE" not in df.columns:
+                df[f"{role}_STATE"] = pd.Series(np.where(found, self.state[row_ids], None), index=df.index)
+            matched &= found
+
+            missing = ids[:-1] < 0
+            if missing.any():
+                counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+                unmatched.append(pd.DataFrame({"ROLE": role, "CODE": np.asarray(uniques)[missing], "FLIGHTS": counts[missing]}))
+
+        unmatched = pd.concat(unmatched, ignore_index=True) if unmatched else pd.DataFrame(columns=["ROLE", "CODE", "FLIGHTS"])
+        report = {
+            "flights": len(df),
+            "unmatched_flights": int((~matched).sum()),
+            "unmatched_codes": unmatched.sort_values("FLIGHTS", ascending=False, ignore_index=True),
+        }
+        return df, report
+
+
+@lru_cache(maxsize=1)
+def get_airport_index(path=AIRPORTS_PATH):
+    """Índice de aeroportos compartilhado pelo processo (lido uma única vez)"""
+    return AirportIndex.from_csv(path)
+
+
+def describe_coverage(report):
+    """Resumo em texto do relatório de cobertura (para avisos nos dashboards)"""
+    if not report["unmatched_flights"]:
+        return None
+    codes = report["unmatched_codes"]
+    sample = ", ".join(f"{row.CODE} ({row.FLIGHTS})" for row in codes.head(5).itertuples())
+    pct = report["unmatched_flights"] / max(report["flights"], 1) * 100
+    return (f"{report['unmatched_flights']:,} voos ({pct:.2f}%) têm aeroportos sem coordenadas em airports.csv "
+            f"e ficam fora do mapa. Códigos: {sample}")
@@ -0,0 +1,114 @@
+"""Detecção de dias anômalos por aeroporto e por companhia
+
+As séries diárias saem do cubo de agregados (arrays (n_datas, n_grupos)) e todos os
+grupos são avaliados de uma vez: cada dia é comparado com a mediana do mesmo dia
+da semana (linha de base sazonal) e o resíduo é escalado pela MAD do grupo
+(z-score robusto). Não há laço por aeroporto.
+"""
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from voos.airports import get_airport_index
+
+ANOMALY_DIMENSIONS = {"ORIGIN": "Aeroporto", "AIRLINE_Description": "Companhia"}
+ANOMALY_MEASURES = {"DELAY": "Taxa de atraso", "CANCELLED": "Taxa de cancelamento"}
+
+THRESHOLD = 3.5  # z-score robusto a partir do qual o dia é marcado
+MIN_FLIGHTS = 20  # dias com menos voos no grupo não são avaliados
+MIN_WEEKS = 3  # semanas necessárias para usar a linha de base por dia da semana
+
+
+def daily_rates(agg, col, min_flights=MIN_FLIGHTS):
+    """Taxa diária (soma / não nulos) de cada grupo: array (n_datas, n_grupos), NaN sem volume"""
+    counts = agg.counts[col]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts >= min_flights, agg.sums[col] / counts, np.nan)
+
+
+def seasonal_baseline(values, weekdays, min_weeks=MIN_WEEKS):
+    """Mediana de cada grupo no mesmo dia da semana (mediana geral se houver poucas semanas)"""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # grupos sem nenhum dia válido
+        overall = np.nanmedian(values, axis=0)
+        baseline = np.broadcast_to(overall, values.shape).copy()
+        for day in range(7):  # sete fatias, cada uma com todos os grupos
+            rows = weekdays == day
+            if rows.sum() >= min_weeks:
+                baseline[rows] = np.nanmedian(values[rows], axis=0)
+    return baseline
+
+
+def robust_zscores(values, baseline):
+    """(valor - linha de base) / (1,4826 * MAD) por grupo; desvio médio quando a MAD é zero"""
+    residual = values - baseline
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mad = np.nanmedian(np.abs(residual), axis=0)
+        mean_dev = np.nanmean(np.abs(residual), axis=0)
+    scale = np.where(mad > 0, 1.4826 * mad, 1.2533 * mean_dev)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return residual / np.where(scale > 0, scale, np.nan)
+
+
+def detect_anomalies(cube, dimensions=ANOMALY_DIMENSIONS, measures=ANOMALY_MEASURES,
+                     threshold=THRESHOLD, min_flights=MIN_FLIGHTS):
+    """Dias em que a taxa de um grupo ficou muito acima da sua linha de base
+
+    Devolve um DataFrame (DIMENSION, KEY, DATE, MEASURE, VALUE, BASELINE, ZSCORE, FLIGHTS)
+    ordenado pelo z-score.
+    """
+    weekdays = cube.dates.dayofweek.to_numpy()
+    found = []
+    for dim in dimensions:
+        if dim not in cube.dimensions:
+            continue
+        agg = cube.dimensions[dim]
+        for col in measures:
+            if col not in agg.sums:
+                continue
+            rates = daily_rates(agg, col, min_flights)
+            baseline = seasonal_baseline(rates, weekdays)
+            zscores = robust_zscores(rates, baseline)
+            with np.errstate(invalid="ignore"):
+                rows, keys = np.nonzero(zscores > threshold)
+            found.append(pd.DataFrame({
+                "DIMENSION": dim,
+                "KEY": np.asarray(agg.keys)[keys],
+                "DATE": cube.dates[rows],
+                "MEASURE": col,
+                "VALUE": rates[rows, keys],
+                "BASELINE": baseline[rows, keys],
+                "ZSCORE": zscores[rows, keys],
+                "FLIGHTS": agg.flights[rows, keys],
+            }))
+
+    columns = ["DIMENSION", "KEY", "DATE", "MEASURE", "VALUE", "BASELINE", "ZSCORE", "FLIGHTS"]
+    if not found:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(found, ignore_index=True).sort_values("ZSCORE", ascending=False, ignore_index=True)
+
+
+def describe_anomaly(row):
+    """Rótulo curto de uma anomalia para hovers (ex.: 'JFK: Taxa de atraso 62% (base 31%, z=5.2)')"""
+    return (f"{row.KEY}: {ANOMALY_MEASURES.get(row.MEASURE, row.MEASURE)} {row.VALUE:.0%} "
+            f"(base {row.BASELINE:.0%}, z={row.ZSCORE:.1f})")
+
+
+def airport_anomaly_points(anomalies):
+    """Aeroportos com dias anômalos e suas coordenadas (índice de aeroportos), para o mapa"""
+    airports = anomalies[anomalies["DIMENSION"] == "ORIGIN"]
+    if airports.empty:
+        return pd.DataFrame(columns=["AIRPORT", "LAT", "LON", "N_DAYS", "ZMAX", "DETAILS"])
+
+    grouped = airports.groupby("KEY")
+    points = grouped.agg(N_DAYS=("DATE", "nunique"), ZMAX=("ZSCORE", "max"))
+    points["DETAILS"] = [
+        "<br>".join(f"{row.DATE:%d/%m} - {describe_anomaly(row)}" for row in group.head(5).itertuples())
+        for _, group in grouped
+    ]
+    index = get_airport_index()
+    ids = index.lookup(points.index.astype(str))
+    points = points[ids >= 0].assign(LAT=index.lat[ids[ids >= 0]], LON=index.lon[ids[ids >= 0]])
+    return points.rename_axis("AIRPORT").reset_index()
@@ -0,0 +1,209 @@
+"""API JSON somente leitura com os cálculos dos dashboards
+
+Responde big numbers, métricas por dimensão (create_metric_data), top rotas e tabelas
+de risco relativo a partir do dataset e do cubo mantidos no processo. Sem filtros além
+do intervalo de datas, as respostas saem do cubo de agregados; com filtros, do backend
+de consulta (voos.backends, escolhido por FLIGHTS_BACKEND): em pandas, só as colunas
+necessárias das linhas selecionadas são lidas; em DuckDB, o acervo Parquet. Cada resposta é serializada
+uma vez por versão do dataset e parâmetros, e sai com ETag (If-None-Match -> 304).
+
+Uso: uvicorn voos.api:app --workers 4
+"""
+import hashlib
+import json
+import threading
+from collections import namedtuple
+from contextlib import asynccontextmanager
+from datetime import date
+from functools import lru_cache
+
+import pandas as pd
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from starlette.concurrency import run_in_threadpool
+
+from voos.aggregates import FlightCube, relative_risk
+from voos.backends import get_backend
+from voos.charts import DISTRIBUTION_CHARTS
+from voos.dataset import DF_VIEW_PATH
+from voos.export import FILTER_COLUMNS
+from voos.metrics import METRIC_CONFIG, calculate_big_numbers, dataset_version
+from voos.store import FlightStore
+from voos.topk import CANDIDATES, RouteAccumulator
+
+DIMENSIONS = [spec["col"] for spec in DISTRIBUTION_CHARTS] + ["ORIGIN"]
+RISK_EVENTS = ["DELAY", "CANCELLED", "DIVERTED"]
+ROUTE_COLUMNS = ["ORIGIN_CITY", "DEST_CITY", "DISTANCE", "TOTAL_VOOS", "DELAY_OVERALL", "DELAY", "CANCELLED", "DIVERTED"]
+MAX_PAGE_SIZE = 500
+CACHE_SIZE = 512
+MAX_AGE = 60  # segundos (Cache-Control)
+
+Snapshot = namedtuple("Snapshot", ["version", "df", "cube", "routes", "backend"])
+
+
+class _DatasetState:
+    """Snapshot do dataset em memória, recarregado quando o arquivo muda (mtime + tamanho)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def current(self):
+        version = dataset_version(self.path)
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != version:
+                df = FlightStore.load(self.path, version).df
+                self._snapshot = Snapshot(version, df, FlightCube.build(df), RouteAccumulator.from_frame(df),
+                                          get_backend(df=df))
+            return self._snapshot
+
+
+dataset = _DatasetState(DF_VIEW_PATH)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await run_in_threadpool(dataset.current)
+    yield
+
+
+app = FastAPI(title="API de Voos", description="Agregados somente leitura dos dashboards de voos", lifespan=lifespan)
+
+
+# --- Cálculos (sobre um snapshot; resultado em tabelas prontas para JSON) ---
+
+def _filters(**values):
+    return {name: list(value) for name, value in values.items() if value}
+
+
+def _metric_table(data, dimension, metric, start, end, filters):
+    config = METRIC_CONFIG[metric]
+    if not filters and dimension in data.cube.dimensions:
+        series = data.cube.metric_series(dimension, config, start, end)
+    else:
+        series, _ = data.backend.metric_data(dimension, metric, start, end, **filters)
+    table = series.rename("VALUE").rename_axis("KEY").reset_index()
+    table["KEY"] = table["KEY"].astype(str)
+    return table, {"metric": metric, "title": config["title"], "unit": config["unit"]}
+
+
+def _big_numbers(data, start, end, filters):
+    if not filters and start is None and end is None:
+        return calculate_big_numbers(data.df)
+    return data.backend.big_numbers(start, end, **filters)
+
+
+def _top_routes(data, metric):
+    """Rotas ranqueadas da métrica: os candidatos mantidos pelo acumulador (no máximo CANDIDATES)"""
+    table = data.routes.top(METRIC_CONFIG[metric], data.routes.candidates)
+    columns = ROUTE_COLUMNS + ([METRIC_CONFIG[metric]["col"]] if METRIC_CONFIG[metric]["agg"] == "quantile" else [])
+    return table[columns]
+
+
+def _risk_table(data, dimension, event, start, end):
+    table = relative_risk(data.cube, dimension, event, start, end)
+    table = table.rename_axis("KEY").reset_index()
+    table["KEY"] = table["KEY"].astype(str)
+    return table
+
+
+def _records(table):
+    """Linhas de uma tabela como dicionários JSON (NaN/inf viram null)"""
+    return json.loads(table.to_json(orient="records", date_format="iso"))
+
+
+def _page(table, page, page_size):
+    start = (page - 1) * page_size
+    return {"total": len(table), "page": page, "page_size": page_size,
+            "items": _records(table.iloc[start:start + page_size])}
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _render(version, endpoint, params):
+    """Corpo JSON de uma resposta; a versão na chave invalida o cache quando o dataset muda"""
+    data = dataset.current()
+    args = dict(params)
+    filters = _filters(**{name: args.pop(name) for name in FILTER_COLUMNS})
+    if endpoint == "big-numbers":
+        payload = _big_numbers(data, args["start"], args["end"], filters)
+        payload = _records(pd.DataFrame([payload]))[0]
+    elif endpoint == "metrics":
+        table, meta = _metric_table(data, args["dimension"], args["metric"], args["start"], args["end"], filters)
+        payload = {**meta, "dimension": args["dimension"], **_page(table, args["page"], args["page_size"])}
+    elif endpoint == "routes":
+        table = _top_routes(data, args["metric"])
+        payload = {"metric": args["metric"], **_page(table, args["page"], args["page_size"])}
+    else:
+        table = _risk_table(data, args["dimension"], args["event"], args["start"], args["end"])
+        payload = {"dimension": args["dimension"], "event": args["event"], **_page(table, args["page"], args["page_size"])}
+    payload["version"] = data.version
+    body = json.dumps(payload, ensure_ascii=False, allow_nan=False).encode("utf-8")
+    return body, '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+async def _respond(request, endpoint, **params):
+    """Resposta em cache por (versão, parâmetros), com ETag e 304 para clientes atualizados"""
+    version = await run_in_threadpool(lambda: dataset.current().version)
+    key = tuple(sorted((name, tuple(value) if isinstance(value, list) else value) for name, value in params.items()))
+    body, etag = await run_in_threadpool(_render, version, endpoint, key)
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={MAX_AGE}"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _check(value, allowed, name):
+    if value not in allowed:
+        raise HTTPException(status_code=404, detail=f"{name} desconhecido: {value}. Opções: {', '.join(allowed)}")
+
+
+# --- Rotas ---
+
+@app.get("/api/version")
+async def version():
+    data = await run_in_threadpool(dataset.current)
+    return {"version": data.version, "flights": len(data.df), "start": str(data.cube.dates.min().date()),
+            "end": str(data.cube.dates.max().date())}
+
+
+@app.get("/api/big-numbers")
+async def big_numbers(request: Request, start: date | None = None, end: date | None = None,
+                      airline: list[str] = Query(None), origin: list[str] = Query(None),
+                      dest: list[str] = Query(None), state: list[str] = Query(None)):
+    return await _respond(request, "big-numbers", start=start, end=end,
+                          airline=airline, origin=origin, dest=dest, state=state)
+
+
+@app.get("/api/metrics/{dimension}")
+async def metrics(request: Request, dimension: str, metric: str = "avg_delay",
+                  start: date | None = None, end: date | None = None,
+                  airline: list[str] = Query(None), origin: list[str] = Query(None),
+                  dest: list[str] = Query(None), state: list[str] = Query(None),
+                  page: int = Query(1, ge=1), page_size: int = Query(50, ge=1, le=MAX_PAGE_SIZE)):
+    _check(dimension, DIMENSIONS, "Dimensão")
+    _check(metric, list(METRIC_CONFIG), "Métrica")
+    return await _respond(request, "metrics", dimension=dimension, metric=metric, start=start, end=end,
+                          airline=airline, origin=origin, dest=dest, state=state, page=page, page_size=page_size)
+
+
+@app.get("/api/routes/top")
+async def top_routes(request: Request, metric: str = "avg_delay",
+                     page: int = Query(1, ge=1), page_size: int = Query(20, ge=1, le=100)):
+    _check(metric, list(METRIC_CONFIG), "Métrica")
+    if (page - 1) * page_size >= CANDIDATES:
+        raise HTTPException(status_code=404, detail=f"Só as {CANDIDATES} primeiras rotas são ranqueadas")
+    return await _respond(request, "routes", metric=metric, page=page, page_size=page_size,
+                          airline=None, origin=None, dest=None, state=None)
+
+
+@app.get("/api/relative-risk/{dimension}")
+async def risk(request: Request, dimension: str, event: str = "DELAY",
+               start: date | None = None, end: date | None = None,
+               page: int = Query(1, ge=1), page_size: int = Query(50, ge=1, le=MAX_PAGE_SIZE)):
+    _check(dimension, DIMENSIONS, "Dimensão")
+    _check(event, RISK_EVENTS, "Evento")
+    return await _respond(request, "relative-risk", dimension=dimension, event=event, start=start, end=end,
+                          page=page, page_size=page_size, airline=None, origin=None, dest=None, state=None)
@@ -0,0 +1,227 @@
+"""Backends de consulta para as agregações dos dashboards
+
+A mesma interface (métrica por dimensão, big numbers e tabela de rotas) com duas
+implementações:
+
+- PandasBackend: o caminho atual, sobre o DataFrame em memória (FlightStore);
+- DuckDBBackend: SQL colunar embarcado direto sobre o acervo Parquet particionado por
+  ano/mês (YEAR=/MONTH=), com filtros e projeção empurrados para a leitura: só as
+  partições do intervalo e as colunas usadas são lidas. Serve intervalos que não cabem
+  na memória.
+
+Uso: python -m voos.backends --to-parquet project_development/dataset/created/parquet
+"""
+import argparse
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+from voos.dataset import DF_VIEW_PATH, read_df_view
+from voos.export import FILTER_COLUMNS, filter_rows
+from voos.geometry import add_route_geometry
+from voos.maps import _processar_dados_rotas
+from voos.metrics import METRIC_CONFIG, METRIC_SUFFIXES, calculate_big_numbers, create_metric_data
+
+PARQUET_PATH = os.environ.get("FLIGHTS_PARQUET", os.path.join("project_development", "dataset", "created", "parquet"))
+PARTITION_COLUMNS = ["YEAR", "MONTH"]
+DERIVED_COLUMNS = ["DISTANCE_BIN"]  # recalculadas na consulta (não vão para o Parquet)
+ROW_GROUP_ROWS = 128_000
+DISTANCE_BINS = 10
+
+ROUTE_KEYS = ["ORIGIN_CITY", "DEST_CITY", "ORIGIN_LAT", "ORIGIN_LON", "DEST_LAT", "DEST_LON", "DISTANCE"]
+BIG_NUMBER_COLUMNS = ["DELAY_OVERALL", "DELAY", "CANCELLED", "DIVERTED"]
+
+
+def write_parquet_store(df, root=PARQUET_PATH, row_group_rows=ROW_GROUP_ROWS):
+    """Grava o dataset em root/YEAR=aaaa/MONTH=m/part-0.parquet, uma partição por vez
+
+    Dentro da partição as linhas ficam ordenadas por data, para que as estatísticas dos
+    row groups também descartem dias fora do intervalo pedido.
+    """
+    columns = [col for col in df.columns if col not in DERIVED_COLUMNS]
+    dates = df["FL_DATE"]
+    month_key = (dates.dt.year * 100 + dates.dt.month).to_numpy()
+    written = []
+    for key in np.unique(month_key):
+        year, month = divmod(int(key), 100)
+        rows = np.flatnonzero(month_key == key)
+        part = df.iloc[rows][columns].sort_values("FL_DATE", kind="stable")
+        directory = os.path.join(root, f"YEAR={year}", f"MONTH={month}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, "part-0.parquet")
+        part.to_parquet(path, index=False, row_group_size=row_group_rows)
+        written.append(path)
+    return written
+
+
+def distance_bins(low, high, bins=DISTANCE_BINS):
+    """Limites e rótulos das faixas de DISTANCE_BIN (os mesmos do pd.cut de read_df_view)"""
+    labels, edges = pd.cut(pd.Series([low, high], dtype=float), bins=bins, precision=0, retbins=True)
+    return edges, labels.cat.categories
+
+
+class QueryBackend:
+    """Interface das agregações: filtros = intervalo de datas + valores de FILTER_COLUMNS"""
+
+    def metric_data(self, group_col, metric, start=None, end=None, **filters):
+        """(série da métrica por grupo em ordem decrescente, sufixo do título)"""
+        raise NotImplementedError
+
+    def big_numbers(self, start=None, end=None, **filters):
+        """Mesmo dicionário de calculate_big_numbers"""
+        raise NotImplementedError
+
+    def route_table(self, config, top_n, start=None, end=None, **filters):
+        """Top-N rotas pela métrica, no formato de _processar_dados_rotas (com geometria)"""
+        raise NotImplementedError
+
+
+class PandasBackend(QueryBackend):
+    """Agregações em pandas sobre o DataFrame em memória; filtros viram arrays de índices"""
+
+    def __init__(self, df):
+        self.df = df
+
+    def _select(self, columns, start, end, filters):
+        if start is None and end is None and not any(filters.values()):
+            return self.df
+        rows = filter_rows(self.df, start, end, **filters)
+        return self.df[columns].iloc[rows]
+
+    def metric_data(self, group_col, metric, start=None, end=None, **filters):
+        value_col = "DELAY_OVERALL" if METRIC_CONFIG[metric]["agg"] == "quantile" else METRIC_CONFIG[metric]["col"]
+        frame = self._select([group_col, value_col], start, end, filters)
+        return create_metric_data(frame, group_col, metric, observed=True)
+
+    def big_numbers(self, start=None, end=None, **filters):
+        return calculate_big_numbers(self._select(BIG_NUMBER_COLUMNS, start, end, filters))
+
+    def route_table(self, config, top_n, start=None, end=None, **filters):
+        columns = ROUTE_KEYS + ["DELAY_OVERALL", "DELAY", "CANCELLED", "DIVERTED", "DELAY_PER_DISTANCE", "TAXI_OUT",
+                                "ORIGIN_LOAD_1H", "FL_DATE", "TIME_HOUR"]
+        return _processar_dados_rotas(self._select(columns, start, end, filters), config, top_n)
+
+
+# Expressão SQL de cada métrica de METRIC_CONFIG
+_SQL_METRICS = {
+    "avg_delay": "AVG(DELAY_OVERALL)",
+    "delay_count": "SUM(CAST(DELAY AS INTEGER))",
+    "cancelled_count": "SUM(CAST(CANCELLED AS INTEGER))",
+    "diverted_count": "SUM(CAST(DIVERTED AS INTEGER))",
+    "avg_delay_per_distance": "AVG(DELAY_PER_DISTANCE)",
+    "avg_taxi_out": "AVG(TAXI_OUT)",
+    "airport_load": "AVG(ORIGIN_LOAD_1H)",
+    "delay_percentile": f"QUANTILE_CONT(DELAY_OVERALL, {METRIC_CONFIG['delay_percentile']['q']})",
+}
+
+
+class DuckDBBackend(QueryBackend):
+    """Agregações em SQL (DuckDB) lendo o acervo Parquet particionado sob demanda"""
+
+    def __init__(self, root=PARQUET_PATH):
+        import duckdb
+
+        files = glob.glob(os.path.join(root, "**", "*.parquet"), recursive=True)
+        if not files:
+            raise FileNotFoundError(f"Nenhum arquivo Parquet em {root}. Gere com: python -m voos.backends --to-parquet {root}")
+        self.root = root
+        self._con = duckdb.connect()
+        pattern = os.path.join(root, "**", "*.parquet").replace("'", "''")
+        self._source = f"read_parquet('{pattern}', hive_partitioning = true)"
+        low, high = self._query(f"SELECT MIN(DISTANCE), MAX(DISTANCE) FROM {self._source}").fetchone()
+        self._distance_edges, self._distance_labels = distance_bins(low, high)
+
+    def _query(self, sql, params=None):
+        # Um cursor por consulta: a conexão é compartilhada entre threads
+        return self._con.cursor().execute(sql, params or [])
+
+    def _where(self, start, end, filters, extra=()):
+        clauses, params = list(extra), []
+        for bound, op in ((start, ">="), (end, "<=")):
+            if bound is None:
+                continue
+            bound = pd.Timestamp(bound)
+            # Poda de partições pelas colunas YEAR/MONTH e de row groups pela data
+            year_op = ">" if op == ">=" else "<"
+            clauses.append(f"(YEAR {year_op} ? OR (YEAR = ? AND MONTH {op} ?))")
+            params += [bound.year, bound.year, bound.month]
+            clauses.append(f"FL_DATE {op} ?")
+            params.append(bound.to_pydatetime())
+        for name, values in filters.items():
+            if values:
+                values = [values] if isinstance(values, str) else list(values)
+                clauses.append(f"{FILTER_COLUMNS[name]} IN ({', '.join('?' * len(values))})")
+                params += values
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _group_expression(self, group_col):
+        if group_col != "DISTANCE_BIN":
+            return group_col
+        # Mesmas faixas do pd.cut: índice da faixa pelos limites internos
+        cases = " ".join(f"WHEN DISTANCE <= {float(edge)!r} THEN {i}" for i, edge in enumerate(self._distance_edges[1:-1]))
+        return f"CASE {cases} ELSE {len(self._distance_edges) - 2} END"
+
+    def metric_data(self, group_col, metric, start=None, end=None, **filters):
+        if metric not in _SQL_METRICS:
+            raise ValueError(f"Métrica sem expressão SQL: {metric}. Opções: {', '.join(_SQL_METRICS)}")
+        key = self._group_expression(group_col)
+        source_col = "DISTANCE" if group_col == "DISTANCE_BIN" else group_col
+        where, params = self._where(start, end, filters, extra=[f"{source_col} IS NOT NULL"])
+        sql = f"SELECT {key} AS KEY, {_SQL_METRICS[metric]} AS VALUE FROM {self._source}{where} GROUP BY 1"
+        result = self._query(sql, params).df()
+        keys = result["KEY"]
+        if group_col == "DISTANCE_BIN":
+            keys = pd.CategoricalIndex(self._distance_labels[keys.to_numpy()], categories=self._distance_labels, ordered=True)
+        data = pd.Series(result["VALUE"].to_numpy(), index=pd.Index(keys, name=group_col), name=METRIC_CONFIG[metric]["col"])
+        return data.sort_values(ascending=False), METRIC_SUFFIXES[metric]
+
+    def big_numbers(self, start=None, end=None, **filters):
+        where, params = self._where(start, end, filters)
+        total, avg_delay, delayed, cancelled, diverted = self._query(
+            f"SELECT COUNT(*), AVG(DELAY_OVERALL), SUM(CAST(DELAY AS INTEGER)), SUM(CAST(CANCELLED AS INTEGER)), "
+            f"SUM(CAST(DIVERTED AS INTEGER)) FROM {self._source}{where}", params).fetchone()
+        percent = (lambda value: (value or 0) / total * 100) if total else (lambda value: 0)
+        return {
+            "total_flights": total,
+            "avg_delay": avg_delay if avg_delay is not None else np.nan,
+            "delay_percentage": percent(delayed),
+            "cancelled_percentage": percent(cancelled),
+            "diverted_percentage": percent(diverted),
+        }
+
+    def route_table(self, config, top_n, start=None, end=None, **filters):
+        not_null = [f"{col} IS NOT NULL" for col in ROUTE_KEYS[2:] + ["DELAY_OVERALL"]]
+        where, params = self._where(start, end, filters, extra=not_null)
+        quantile = f", QUANTILE_CONT(DELAY_OVERALL, {config['q']}) AS {config['col']}" if config["agg"] == "quantile" else ""
+        keys = ", ".join(ROUTE_KEYS)
+        sql = (f"SELECT {keys}, AVG(DELAY_OVERALL) AS DELAY_OVERALL, SUM(CAST(DELAY AS INTEGER)) AS DELAY, "
+               f"SUM(CAST(CANCELLED AS INTEGER)) AS CANCELLED, SUM(CAST(DIVERTED AS INTEGER)) AS DIVERTED, "
+               f"AVG(DELAY_PER_DISTANCE) AS DELAY_PER_DISTANCE, AVG(TAXI_OUT) AS TAXI_OUT, AVG(ORIGIN_LOAD_1H) AS ORIGIN_LOAD_1H, "
+               f"COUNT(*) AS TOTAL_VOOS, AVG(TIME_HOUR) AS TIME_HOUR{quantile} "
+               f"FROM {self._source}{where} GROUP BY {keys} ORDER BY {config['col']} DESC LIMIT {int(top_n)}")
+        return add_route_geometry(self._query(sql, params).df())
+
+
+def get_backend(name=None, df=None, root=PARQUET_PATH):
+    """Backend escolhido por nome ou pela variável FLIGHTS_BACKEND ("pandas" ou "duckdb")"""
+    name = name or os.environ.get("FLIGHTS_BACKEND", "pandas")
+    if name == "duckdb":
+        return DuckDBBackend(root)
+    if name == "pandas":
+        return PandasBackend(df if df is not None else read_df_view()[0])
+    raise ValueError(f"Backend desconhecido: {name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Grava o df_view no acervo Parquet particionado por ano/mês")
+    parser.add_argument("--data", default=DF_VIEW_PATH, help="caminho do df_view.csv")
+    parser.add_argument("--to-parquet", default=PARQUET_PATH, help="diretório do acervo Parquet")
+    args = parser.parse_args()
+
+    df, notices = read_df_view(args.data)
+    for _, message in notices:
+        print(message)
+    paths = write_parquet_store(df, args.to_parquet)
+    print(f"{len(df):,} voos gravados em {len(paths)} partições em {args.to_parquet}")
@@ -0,0 +1,421 @@
+"""Build incremental das tabelas derivadas (df_view, df_map, df_problems, df_regression)
+
+Cada tabela é declarada como um passo (Step) com suas entradas e sua saída. Os dados
+brutos (flights_AAAAMM.csv) geram partições mensais em Parquet, no mesmo layout
+YEAR=/MONTH= do acervo de voos.backends:
+
+    flights_AAAAMM.csv + dicionário de companhias -> clean/      (tratamento do notebook)
+    clean + airports.csv                          -> df_view/, df_problems/
+    clean                                         -> df_regression/
+    partições de df_problems                      -> df_map.parquet (top 100 por atraso)
+    partições / df_map.parquet                    -> df_*.csv (consumidos pelos apps e notebooks)
+
+A impressão digital de um passo combina o código da função, os parâmetros e as
+impressões das entradas (conteúdo dos arquivos brutos; impressão do passo que gerou as
+intermediárias). Só os passos cuja impressão mudou, ou cuja saída sumiu, são
+reconstruídos, em paralelo assim que suas dependências terminam. Um mês novo gera
+apenas as partições desse mês e refaz os agregados que dependem de todos os meses.
+
+Uso: python -m voos.build [--workers 4] [--dry-run] [--force]
+"""
+import argparse
+import glob
+import hashlib
+import inspect
+import json
+import os
+import re
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from voos.backends import ROW_GROUP_ROWS
+from voos.congestion import attach_congestion
+from voos.hierarchy import HierarchyRollup
+from voos.metrics import dataset_version
+from voos.schema import PERIOD_ORDER, WEEKDAY_ORDER
+
+RAW_DIR = os.path.join("project_development", "dataset")
+CREATED_DIR = os.path.join(RAW_DIR, "created")
+BUILD_ROOT = os.environ.get("FLIGHTS_BUILD", os.path.join(CREATED_DIR, "build"))
+HIERARCHY_FILE = "hierarchy.npz"
+HIERARCHY_PATH = os.path.join(BUILD_ROOT, HIERARCHY_FILE)  # lido pelo dashboard
+RAW_PATTERN = re.compile(r"flights_(\d{4})(\d{2})\.csv$")
+BUILD_VERSION = 2  # incrementar para forçar a reconstrução de tudo
+
+DELAY_COLUMNS = ["DELAY_DUE_CARRIER", "DELAY_DUE_WEATHER", "DELAY_DUE_NAS", "DELAY_DUE_SECURITY", "DELAY_DUE_LATE_AIRCRAFT"]
+TIME_COLUMNS = ["DEP_TIME", "ARR_TIME", "CRS_DEP_TIME", "CRS_ARR_TIME", "AIR_TIME"]
+NUMERIC_COLUMNS = ["TAXI_IN", "TAXI_OUT", "ELAPSED_TIME", "CRS_ELAPSED_TIME", "DEP_DELAY", "ARR_DELAY"] + DELAY_COLUMNS
+TEXT_COLUMNS = ["AIRLINE_CODE", "ORIGIN", "ORIGIN_CITY", "DEST", "DEST_CITY", "CANCELLATION_CODE", "AIRLINE_Description"]
+MISSING_MARKERS = ["NA", "N/A", "NONE", "NULL", "?", "UNKNOWN", ""]
+PROBLEM_COLUMNS = ["DELAY", "CANCELLED", "DIVERTED"]
+
+VIEW_COLUMNS = ["FL_DATE", "FL_DAY", "ORIGIN", "DEST", "ORIGIN_CITY", "ORIGIN_STATE", "DEST_CITY",
+                "CANCELLED", "DIVERTED", "DELAY", "DISTANCE", "AIRLINE_Description", "DELAY_OVERALL",
+                "TIME_PERIOD", "DAY_OF_WEEK", "TIME_HOUR", "ORIGIN_LAT", "ORIGIN_LON", "DEST_LAT", "DEST_LON"] + DELAY_COLUMNS + [
+                "CRS_DEP_TIME", "DEP_TIME", "CRS_ARR_TIME", "ARR_TIME", "TAXI_OUT", "TAXI_IN"]
+MAP_COLUMNS = ["ORIGIN", "DEST", "CANCELLED", "DIVERTED", "DELAY", "DISTANCE", "ORIGIN_LAT", "ORIGIN_LON",
+               "DEST_LAT", "DEST_LON", "FL_DAY", "FL_DATE", "DELAY_OVERALL", "DELAY_TOTAL", "TIME_PERIOD"]
+MAP_ROWS = 100
+
+# Colunas do df_regression (one-hot das companhias com a primeira, Alaska, como referência)
+REGRESSION_AIRLINES = [
+    "ALLEGIANT AIR", "AMERICAN AIRLINES INC.", "DELTA AIR LINES INC.", "ENDEAVOR AIR INC.", "ENVOY AIR",
+    "FRONTIER AIRLINES INC.", "HAWAIIAN AIRLINES INC.", "JETBLUE AIRWAYS", "PSA AIRLINES INC.", "REPUBLIC AIRLINE",
+    "SKYWEST AIRLINES INC.", "SOUTHWEST AIRLINES CO.", "SPIRIT AIR LINES", "UNITED AIR LINES INC.",
+]
+
+# func(entradas, saída, **params) grava a saída; entradas e saída são caminhos
+Step = namedtuple("Step", ["name", "func", "inputs", "output", "params"], defaults=((),))
+
+
+class BuildError(RuntimeError):
+    """Um ou mais passos falharam (os dependentes não foram executados)"""
+
+
+# --- Transformações (portadas do notebook vitoria-1-development) ---
+
+def prepare_month(raw_path, airline_path):
+    """Voos brutos de um mês tratados e enriquecidos (o `df` do notebook)"""
+    df = pd.read_csv(raw_path, dtype={col: "object" for col in TEXT_COLUMNS})
+    df = df.drop(columns=["FL_MONTH", "FL_YEAR"], errors="ignore")
+    df["FL_DATE"] = pd.to_datetime(df["FL_DATE"].astype(str), format="ISO8601", errors="coerce")
+    df["FL_DAY"] = df["FL_DATE"].dt.day.astype("float32")
+    df["DISTANCE"] = df["DISTANCE"].astype(np.int64)
+    df["CANCELLED"] = df["CANCELLED"].astype(bool)
+    df["DIVERTED"] = df["DIVERTED"].astype(bool)
+    for col in TIME_COLUMNS + NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+
+    airlines = pd.read_csv(airline_path, dtype=str).rename(columns={"Code": "AIRLINE_CODE", "Description": "AIRLINE_Description"})
+    df = df.merge(airlines.drop_duplicates("AIRLINE_CODE"), on="AIRLINE_CODE", how="left")
+    df = df.dropna(subset=["CRS_ELAPSED_TIME"])
+
+    # Causas ausentes em voos não cancelados = nenhum minuto atribuído
+    not_cancelled = ~df["CANCELLED"]
+    df.loc[not_cancelled, DELAY_COLUMNS] = df.loc[not_cancelled, DELAY_COLUMNS].fillna(0)
+    for col in TIME_COLUMNS:
+        if col in df.columns:
+            df.loc[df[col] == 2400, col] = 0
+
+    # Padrão dos textos: sem espaços nas pontas, maiúsculas, marcadores de ausência -> NaN
+    for col in TEXT_COLUMNS:
+        if col in df.columns:
+            text = df[col].str.strip().str.upper()
+            df[col] = text.where(~text.isin(MISSING_MARKERS))
+
+    df["DELAY_TOTAL"] = df[DELAY_COLUMNS].sum(axis=1, min_count=len(DELAY_COLUMNS)).astype(np.float64)
+    df["DELAY_OVERALL"] = df["ARR_DELAY"].fillna(0).clip(lower=0).astype(np.int64)
+    df["DELAY"] = df["DELAY_OVERALL"] > 0
+    df["TIME_PERIOD"] = pd.cut(df["DEP_TIME"], bins=[0, 600, 1200, 1800, 2400], labels=PERIOD_ORDER, right=False)
+    weekday = df["FL_DATE"].dt.dayofweek.fillna(-1).astype(int).to_numpy()
+    df["DAY_OF_WEEK"] = pd.Categorical.from_codes(weekday, categories=WEEKDAY_ORDER, ordered=True)
+    df["ORIGIN_STATE"] = df["ORIGIN_CITY"].str.split(", ").str[-1]
+    hour = df["DEP_TIME"] // 100
+    df["TIME_HOUR"] = hour.where((df["DEP_TIME"] >= 0) & (df["DEP_TIME"] < 2400)).astype("float64")
+    return df.reset_index(drop=True)
+
+
+def attach_airports(df, airports_path):
+    """Junção (inner) com as coordenadas de origem e destino (o `df_complete` do notebook)"""
+    airports = pd.read_csv(airports_path, usecols=["iata", "latitude", "longitude"])
+    for side in ("ORIGIN", "DEST"):
+        df = df.merge(airports.rename(columns={"iata": side, "latitude": f"{side}_LAT", "longitude": f"{side}_LON"}),
+                      on=side, how="inner")
+    return df
+
+
+def _write_parquet(df, path):
+    if "FL_DATE" in df.columns:
+        df = df.sort_values("FL_DATE", kind="stable")
+    df.to_parquet(path, index=False, row_group_size=ROW_GROUP_ROWS)
+
+
+def _read_parts(paths, columns=None):
+    frames = [pd.read_parquet(path, columns=columns) for path in paths]
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+
+# --- Passos: func(entradas, saída) ---
+
+def build_clean(inputs, output):
+    raw_path, airline_path = inputs
+    _write_parquet(prepare_month(raw_path, airline_path), output)
+
+
+def build_view(inputs, output):
+    clean_path, airports_path = inputs
+    df = attach_airports(pd.read_parquet(clean_path), airports_path)[VIEW_COLUMNS]
+    df[DELAY_COLUMNS] = df[DELAY_COLUMNS].fillna(0).astype("uint16")
+    _write_parquet(df, output)
+
+
+def build_problems(inputs, output):
+    clean_path, airports_path = inputs
+    df = attach_airports(pd.read_parquet(clean_path), airports_path)
+    _write_parquet(df[df[PROBLEM_COLUMNS].any(axis=1)], output)
+
+
+def build_regression(inputs, output):
+    (clean_path,) = inputs
+    df = pd.read_parquet(clean_path, columns=["AIR_TIME", "DISTANCE", "DEP_DELAY", "AIRLINE_Description", "DAY_OF_WEEK", "TIME_PERIOD"])
+    # One-hot com a lista fixa de companhias: todas as partições têm as mesmas colunas
+    dummies = {f"AIRLINE_{name}": (df["AIRLINE_Description"] == name).astype(int) for name in REGRESSION_AIRLINES}
+    table = pd.concat([df[["AIR_TIME", "DISTANCE", "DEP_DELAY"]], pd.DataFrame(dummies)], axis=1)
+    table["DAY_OF_WEEK_NUM"] = df["DAY_OF_WEEK"].cat.codes
+    table["TIME_OF_DAY_NUM"] = df["TIME_PERIOD"].cat.codes
+    _write_parquet(table, output)
+
+
+def build_map(inputs, output, rows=MAP_ROWS):
+    """Os `rows` voos problemáticos de maior atraso entre todas as partições"""
+    # O top global está contido na união dos tops de cada partição
+    tops = [pd.read_parquet(path, columns=MAP_COLUMNS).sort_values("DELAY_OVERALL", ascending=False, kind="stable").head(rows)
+            for path in inputs]
+    table = pd.concat(tops, ignore_index=True).sort_values("DELAY_OVERALL", ascending=False, kind="stable").head(rows)
+    table.to_parquet(output, index=False)
+
+
+def build_hierarchy(inputs, output, dataset=None):
+    """Rollup estado -> cidade -> aeroporto -> rota de todas as partições de df_view
+
+    `dataset` é o df_view.csv exportado das mesmas partições (também uma entrada, para
+    rodar depois dele): sua versão fica gravada no rollup e o dashboard só usa o arquivo
+    quando ela é a do CSV carregado.
+    """
+    df = _read_parts([path for path in inputs if path != dataset])
+    df["DELAY_PER_DISTANCE"] = np.where(df["DISTANCE"] != 0, df["DELAY_OVERALL"] / df["DISTANCE"], 0)
+    attach_congestion(df)
+    HierarchyRollup.build(df).save(output, version=dataset_version(dataset) if dataset else None)
+
+
+def export_csv(inputs, output):
+    """Concatena as partições (em ordem) em um CSV"""
+    _read_parts(inputs).to_csv(output, index=False, encoding="utf-8")
+
+
+# --- Declaração das tabelas ---
+
+def raw_months(raw_dir=RAW_DIR):
+    """{(ano, mês): caminho} dos arquivos flights_AAAAMM.csv"""
+    months = {}
+    for path in glob.glob(os.path.join(raw_dir, "flights_*.csv")):
+        match = RAW_PATTERN.search(os.path.basename(path))
+        if match:
+            months[int(match.group(1)), int(match.group(2))] = path
+    return dict(sorted(months.items()))
+
+
+def partition_path(root, table, year, month):
+    return os.path.join(root, table, f"YEAR={year}", f"MONTH={month}", "part-0.parquet")
+
+
+def declare_steps(raw_dir=RAW_DIR, root=BUILD_ROOT, created_dir=CREATED_DIR, csv=True):
+    """Passos do build para os meses brutos encontrados em raw_dir"""
+    airline_path = os.path.join(raw_dir, "AIRLINE_CODE_DICTIONARY.csv")
+    airports_path = os.path.join(raw_dir, "airports.csv")
+    steps = []
+    parts = {"df_view": [], "df_problems": [], "df_regression": []}
+    for (year, month), raw_path in raw_months(raw_dir).items():
+        label = f"{year}-{month:02d}"
+        clean = partition_path(root, "clean", year, month)
+        steps.append(Step(f"clean {label}", build_clean, (raw_path, airline_path), clean))
+        for table, func, inputs in (("df_view", build_view, (clean, airports_path)),
+                                    ("df_problems", build_problems, (clean, airports_path)),
+                                    ("df_regression", build_regression, (clean,))):
+            output = partition_path(root, table, year, month)
+            steps.append(Step(f"{table} {label}", func, inputs, output))
+            parts[table].append(output)
+    if not parts["df_problems"]:
+        return steps
+
+    map_path = os.path.join(root, "df_map.parquet")
+    steps.append(Step("df_map", build_map, tuple(parts["df_problems"]), map_path, (("rows", MAP_ROWS),)))
+    hierarchy_inputs, hierarchy_params = tuple(parts["df_view"]), ()
+    if csv:
+        for table, inputs in list(parts.items()) + [("df_map", (map_path,))]:
+            steps.append(Step(f"{table}.csv", export_csv, tuple(inputs), os.path.join(created_dir, f"{table}.csv")))
+        view_csv = os.path.join(created_dir, "df_view.csv")
+        hierarchy_inputs, hierarchy_params = hierarchy_inputs + (view_csv,), (("dataset", view_csv),)
+    steps.append(Step("hierarchy", build_hierarchy, hierarchy_inputs, os.path.join(root, HIERARCHY_FILE), hierarchy_params))
+    return steps
+
+
+# --- Impressões digitais e execução ---
+
+def _hash(*parts):
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _code_fingerprint(func):
+    """Código da função e das funções deste módulo que ela chama (transitivamente)"""
+    sources, queue, seen = [], [func], set()
+    while queue:
+        current = queue.pop()
+        if current.__name__ in seen:
+            continue
+        seen.add(current.__name__)
+        sources.append(inspect.getsource(current))
+        for name in current.__code__.co_names:
+            value = current.__globals__.get(name)
+            if inspect.isfunction(value) and value.__module__ == func.__module__:
+                queue.append(value)
+    return _hash(*sorted(sources))
+
+
+def _file_fingerprint(path, files):
+    """Hash do conteúdo; reaproveitado enquanto tamanho e mtime não mudam"""
+    stat = os.stat(path)
+    cached = files.get(path)
+    if cached and cached[:2] == [stat.st_size, stat.st_mtime_ns]:
+        return cached[2]
+    digest = hashlib.sha1()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    files[path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+    return files[path][2]
+
+
+def _ordered(steps):
+    """Passos em ordem topológica (as dependências antes)"""
+    by_output = {step.output: step for step in steps}
+    ordered, seen = [], set()
+
+    def visit(step, path=()):
+        if step.output in seen:
+            return
+        if step.output in path:
+            raise BuildError(f"Ciclo no build: {step.name}")
+        for item in step.inputs:
+            if item in by_output:
+                visit(by_output[item], path + (step.output,))
+        seen.add(step.output)
+        ordered.append(step)
+
+    for step in steps:
+        visit(step)
+    return ordered
+
+
+def fingerprints(steps, files):
+    """Impressão de cada passo (chave: saída), calculada antes de executar qualquer passo"""
+    result = {}
+    for step in _ordered(steps):
+        inputs = [result[item] if item in result else _file_fingerprint(item, files) for item in step.inputs]
+        result[step.output] = _hash(step.name, _code_fingerprint(step.func), BUILD_VERSION, step.params, *inputs)
+    return result
+
+
+def _load_manifest(path):
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+    return {"outputs": {}, "files": {}}
+
+
+def _save_manifest(manifest, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _execute(func, inputs, output, params):
+    """Roda o passo gravando em um arquivo temporário (a saída só aparece completa)"""
+    start = time.perf_counter()
+    base, ext = os.path.splitext(output)
+    tmp = f"{base}.tmp{ext}"
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    func(inputs, tmp, **dict(params))
+    os.replace(tmp, output)
+    return time.perf_counter() - start
+
+
+def stale_steps(steps, manifest, prints, force=False):
+    """Passos a refazer: impressão mudou, saída sumiu ou alguma entrada será refeita"""
+    stale = set()
+    for step in _ordered(steps):
+        if (force or not os.path.exists(step.output) or manifest["outputs"].get(step.output) != prints[step.output]
+                or any(item in stale for item in step.inputs)):
+            stale.add(step.output)
+    return [step for step in steps if step.output in stale]
+
+
+def run_build(steps, root=BUILD_ROOT, workers=None, force=False, dry_run=False, log=print):
+    """Reconstrói os passos desatualizados; devolve {nome: segundos} dos executados"""
+    manifest_path = os.path.join(root, "manifest.json")
+    manifest = _load_manifest(manifest_path)
+    prints = fingerprints(steps, manifest["files"])
+    pending = {step.output: step for step in stale_steps(steps, manifest, prints, force)}
+    log(f"{len(steps) - len(pending)} de {len(steps)} passos atualizados; {len(pending)} a reconstruir")
+    if dry_run:
+        for step in pending.values():
+            log(f"  · {step.name}")
+        return {}
+
+    timings, failed = {}, []
+    running = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            # Passos prontos: nenhuma entrada ainda pendente, em execução ou com falha
+            blocked = set(pending) | {step.output for step in running.values()}
+            for output, step in list(pending.items()):
+                if any(item in blocked for item in step.inputs):
+                    continue
+                del pending[output]
+                running[pool.submit(_execute, step.func, step.inputs, step.output, step.params)] = step
+            if not running:
+                break  # o restante depende de passos que falharam
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step = running.pop(future)
+                try:
+                    timings[step.name] = future.result()
+                except Exception as exc:
+                    failed.append(step.name)
+                    log(f"  ✗ {step.name}: {exc}")
+                    # Dependentes (diretos e indiretos) não rodam
+                    blocked_outputs = {step.output}
+                    for other in _ordered(list(pending.values())):
+                        if any(item in blocked_outputs for item in other.inputs):
+                            blocked_outputs.add(other.output)
+                            del pending[other.output]
+                            failed.append(other.name)
+                    continue
+                manifest["outputs"][step.output] = prints[step.output]
+                _save_manifest(manifest, manifest_path)
+                log(f"  ✓ {step.name} ({timings[step.name]:.1f} s)")
+
+    _save_manifest(manifest, manifest_path)
+    if failed:
+        raise BuildError(f"Passos com falha ou não executados: {', '.join(failed)}")
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build incremental das tabelas derivadas (Parquet por mês + CSVs)")
+    parser.add_argument("--raw", default=RAW_DIR, help="diretório com flights_AAAAMM.csv e os dicionários")
+    parser.add_argument("--root", default=BUILD_ROOT, help="diretório das partições Parquet e do manifesto")
+    parser.add_argument("--created", default=CREATED_DIR, help="diretório dos CSVs exportados")
+    parser.add_argument("--workers", type=int, default=None, help="processos em paralelo (padrão: núcleos)")
+    parser.add_argument("--no-csv", action="store_true", help="não exporta os CSVs consolidados")
+    parser.add_argument("--force", action="store_true", help="reconstrói tudo")
+    parser.add_argument("--dry-run", action="store_true", help="só lista os passos desatualizados")
+    args = parser.parse_args()
+
+    steps = declare_steps(args.raw, args.root, args.created, csv=not args.no_csv)
+    if not steps:
+        parser.error(f"Nenhum arquivo flights_AAAAMM.csv em {args.raw}")
+    start = time.perf_counter()
+    run_build(steps, args.root, args.workers, args.force, args.dry_run)
+    print(f"Build concluído em {time.perf_counter() - start:.1f} s")
@@ -0,0 +1,347 @@
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from voos.aggregates import crosstab_metric
+from voos.anomalies import describe_anomaly
+from voos.comparison import compare_series, period_label
+from voos.congestion import EVENT_LABELS
+from voos.metrics import METRIC_CONFIG, METRIC_SUFFIXES, create_metric_data
+
+# --- Estilos de Gráficos (Adaptados de creating_fig.ipynb) ---
+palette = ["#0077C8", "#005EA8", "#003F72", "#0094D8", "#66C5E3"]
+palette_red = ["#DC1C13", "#EA4C46", "#F07470"]
+heatmap_scale = ["#66C5E3", "#0094D8", "#0077C8", "#005EA8", "#003F72"]  # paleta, do claro ao escuro
+
+# Gráficos da seção de distribuições: (id, coluna de agrupamento, tipo, top N, título, rótulo)
+DISTRIBUTION_CHARTS = [
+    {"id": "airlines", "col": "AIRLINE_Description", "kind": "bar", "top": 10, "title": "🏢 Top 10 Companhias - {suffix}", "label": "Companhia"},
+    {"id": "distance", "col": "DISTANCE_BIN", "kind": "bar", "top": None, "title": "✈️ Distância vs {suffix}", "label": "Faixa de Distância"},
+    {"id": "cities", "col": "ORIGIN_CITY", "kind": "bar", "top": 10, "title": "🏙️ Top 10 Cidades de Origem - {suffix}", "label": "Cidade"},
+    {"id": "states", "col": "ORIGIN_STATE", "kind": "bar", "top": 10, "title": "🗺️ Top 10 Estados de Origem - {suffix}", "label": "Estado"},
+    {"id": "day", "col": "FL_DAY", "kind": "line", "top": None, "title": "📅 Dia do Mês vs {suffix}", "label": "Dia do Mês"},
+    {"id": "weekday", "col": "DAY_OF_WEEK", "kind": "bar", "top": None, "title": "📆 Dia da Semana vs {suffix}", "label": "Dia da Semana"},
+    {"id": "hour", "col": "TIME_HOUR", "kind": "line", "top": None, "title": "🕐 Hora do Dia vs {suffix}", "label": "Hora"},
+    {"id": "period", "col": "TIME_PERIOD", "kind": "bar", "top": None, "title": "🌅 Período do Dia vs {suffix}", "label": "Período"},
+]
+
+
+def get_plotly_template():
+    # Baseado no estilo do creating_fig.ipynb e adaptado para Plotly
+    return go.layout.Template(
+        layout=go.Layout(
+            font=dict(family="Arial, sans-serif", size=12, color="#333"),
+            title_font_size=18,
+            plot_bgcolor="rgba(0,0,0,0)",
+            paper_bgcolor="rgba(0,0,0,0)",
+            margin=dict(l=50, r=20, t=60, b=40),
+            xaxis=dict(
+                showgrid=True, gridwidth=1, gridcolor="lightgray",
+                linecolor="lightgray", linewidth=1,
+                tickfont=dict(size=10)
+            ),
+            yaxis=dict(
+                showgrid=True, gridwidth=1, gridcolor="lightgray",
+                linecolor="lightgray", linewidth=1,
+                tickfont=dict(size=10)
+            ),
+            colorway=palette, # Aplicar paleta de cores
+            hoverlabel=dict(
+                bgcolor="white",
+                font=dict(family="Arial", size=12)
+            )
+        )
+    )
+
+# Construído uma única vez por processo (e não a cada rerun do Streamlit)
+plotly_template = get_plotly_template()
+
+# --- Funções de Visualização ---
+def create_simple_bar_chart(data, title, x_label, y_label):
+    if data.empty:
+        fig = px.bar(title=f"{title} (Sem dados)")
+        fig.update_layout(height=400, title_x=0.5, template=plotly_template)
+        return fig
+
+    y_values = [str(x) for x in data.index]
+
+    fig = px.bar(
+        x=data.values,
+        y=y_values,
+        orientation="h",
+        title=f"<b>{title}</b>",
+        labels={"x": x_label, "y": y_label},
+        color=data.values,
+        color_continuous_scale=palette # Usar a paleta definida
+    )
+
+    fig.update_layout(
+        height=400,
+        yaxis={"categoryorder": "total ascending"},
+        title_x=0.5,
+        title_font_size=14,
+        font=dict(size=10),
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        margin=dict(l=50, r=20, t=60, b=40),
+        showlegend=False,
+        coloraxis_showscale=False,
+        template=plotly_template # Aplicar template
+    )
+    return fig
+
+def create_line_chart_continuous(data, title, x_label, y_label, group_col):
+    if data.empty:
+        fig = px.line(title=f"{title} (Sem dados)")
+        fig.update_layout(height=400, title_x=0.5, template=plotly_template)
+        return fig
+
+    if group_col in ["FL_DAY", "TIME_HOUR"]:
+        data = data.sort_index()
+        x_values = data.index
+    else:
+        x_values = data.index
+
+    fig = px.line(
+        x=x_values,
+        y=data.values,
+        title=f"<b>{title}</b>",
+        labels={"x": x_label, "y": y_label}
+    )
+
+    fig.update_traces(
+        line_color=palette[0], # Usar a primeira cor da paleta
+        line_width=3,
+        marker=dict(size=6),
+        mode="lines+markers"
+    )
+
+    fig.update_layout(
+        height=400,
+        title_x=0.5,
+        title_font_size=14,
+        font=dict(size=10),
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        margin=dict(l=50, r=20, t=60, b=40),
+        xaxis=dict(showgrid=True, gridwidth=1, gridcolor="lightgray"),
+        yaxis=dict(showgrid=True, gridwidth=1, gridcolor="lightgray"),
+        template=plotly_template # Aplicar template
+    )
+    return fig
+
+def create_distribution_chart(data, spec, title_suffix):
+    """Monta o gráfico de um item de DISTRIBUTION_CHARTS a partir da série agregada"""
+    if spec["top"]:
+        data = data.head(spec["top"])
+    title = spec["title"].format(suffix=title_suffix)
+    if spec["kind"] == "line":
+        return create_line_chart_continuous(data, title, spec["label"], title_suffix, spec["col"])
+    return create_simple_bar_chart(data, title, title_suffix, spec["label"])
+
+def add_anomaly_markers(fig, anomalies, data):
+    """Marca na linha do dia do mês os dias com anomalias (voos.anomalies) de aeroportos/companhias"""
+    if anomalies is None or anomalies.empty or data.empty:
+        return fig
+
+    days = anomalies["DATE"].dt.day
+    by_day = anomalies.groupby(days)
+    line = data.sort_index()
+    line.index = line.index.astype(int)
+    flagged = by_day.size().reindex(line.index).dropna()
+    if flagged.empty:
+        return fig
+
+    details = [
+        "<br>".join(describe_anomaly(row) for row in by_day.get_group(day).head(5).itertuples())
+        for day in flagged.index
+    ]
+    fig.add_trace(go.Scatter(
+        x=flagged.index,
+        y=line.loc[flagged.index].values,
+        mode="markers",
+        marker=dict(color=palette_red[0], size=8 + 2 * flagged.clip(upper=10).values, symbol="diamond",
+                    line=dict(width=1, color="white")),
+        customdata=list(zip(flagged.astype(int).values, details)),
+        hovertemplate="<b>Dia %{x}: %{customdata[0]} anomalias</b><br>%{customdata[1]}<extra></extra>",
+        name="Dias anômalos",
+        showlegend=False
+    ))
+    return fig
+
+def build_distribution_figures(df, selected_metric, cube=None, anomalies=None):
+    """Gera todos os gráficos de distribuição que dependem da métrica selecionada"""
+    figures = {}
+    for spec in DISTRIBUTION_CHARTS:
+        data, title_suffix = create_metric_data(df, spec["col"], selected_metric, observed=True, cube=cube)
+        figures[spec["id"]] = create_distribution_chart(data, spec, title_suffix)
+        if spec["col"] == "FL_DAY":
+            add_anomaly_markers(figures[spec["id"]], anomalies, data)
+    return figures
+
+def create_comparison_chart(table, spec, title_suffix, labels):
+    """Os dois períodos de um item de DISTRIBUTION_CHARTS (barras agrupadas ou duas linhas), com Δ no hover"""
+    title = spec["title"].format(suffix=title_suffix)
+    if table.empty:
+        fig = px.bar(title=f"{title} (Sem dados)")
+        fig.update_layout(height=400, title_x=0.5, template=plotly_template)
+        return fig
+
+    if spec["kind"] == "line":
+        table = table.sort_index()
+    elif spec["top"]:
+        table = table.head(spec["top"])
+    keys = [str(key) for key in table.index]
+    customdata = table[["DELTA", "DELTA_PCT"]].assign(DELTA_PCT=table["DELTA_PCT"] * 100).values
+    key_axis, value_axis = ("y", "x") if spec["kind"] == "bar" else ("x", "y")
+
+    fig = go.Figure()
+    for col, label, color in (("A", labels[0], palette[4]), ("B", labels[1], palette[0])):
+        hover = (f"<b>%{{{key_axis}}}</b><br>{label}: %{{{value_axis}:.2f}}<br>"
+                 "Δ (B - A): %{customdata[0]:+.2f} (%{customdata[1]:+.1f}%)<extra></extra>")
+        if spec["kind"] == "line":
+            fig.add_trace(go.Scatter(x=keys, y=table[col], name=label, mode="lines+markers", line=dict(color=color, width=3),
+                                     marker=dict(size=6), customdata=customdata, hovertemplate=hover))
+        else:
+            fig.add_trace(go.Bar(x=table[col], y=keys, name=label, orientation="h", marker_color=color,
+                                 customdata=customdata, hovertemplate=hover))
+
+    axis_values, axis_keys = dict(title=title_suffix), dict(title=spec["label"])
+    fig.update_layout(
+        barmode="group",
+        height=400,
+        title=dict(text=f"<b>{title}</b>", x=0.5),
+        title_font_size=14,
+        font=dict(size=10),
+        xaxis=axis_values if spec["kind"] == "bar" else axis_keys,
+        yaxis=dict(axis_keys, autorange="reversed") if spec["kind"] == "bar" else axis_values,
+        legend=dict(orientation="h", y=-0.2),
+        margin=dict(l=50, r=20, t=60, b=40),
+        template=plotly_template
+    )
+    return fig
+
+def build_comparison_figures(cube, selected_metric, period_a, period_b):
+    """Gráficos de distribuição com os dois períodos, lidos das fatias diárias do cubo"""
+    config = METRIC_CONFIG[selected_metric]
+    labels = (period_label(period_a), period_label(period_b))
+    return {spec["id"]: create_comparison_chart(compare_series(cube, spec["col"], config, period_a, period_b),
+                                                spec, METRIC_SUFFIXES[selected_metric], labels)
+            for spec in DISTRIBUTION_CHARTS}
+
+def create_cause_breakdown_chart(shares, title, y_label):
+    """Barras horizontais empilhadas com a participação (%) de cada causa nos minutos de atraso"""
+    if shares.empty:
+        fig = px.bar(title=f"{title} (Sem dados)")
+        fig.update_layout(height=400, title_x=0.5, template=plotly_template)
+        return fig
+
+    y_values = [str(x) for x in shares.index]
+    colors = palette + palette_red
+    fig = go.Figure()
+    for i, cause in enumerate(shares.columns):
+        fig.add_trace(go.Bar(
+            x=shares[cause].values * 100,
+            y=y_values,
+            orientation="h",
+            name=cause,
+            marker_color=colors[i % len(colors)],
+            hovertemplate=f"<b>%{{y}}</b><br>{cause}: %{{x:.1f}}%<extra></extra>"
+        ))
+
+    fig.update_layout(
+        barmode="stack",
+        height=450,
+        title=dict(text=f"<b>{title}</b>", x=0.5),
+        title_font_size=14,
+        font=dict(size=10),
+        xaxis=dict(title="Participação nos minutos de atraso (%)", range=[0, 100]),
+        yaxis=dict(title=y_label, autorange="reversed"),
+        legend=dict(orientation="h", y=-0.2),
+        margin=dict(l=50, r=20, t=60, b=40),
+        template=plotly_template
+    )
+    return fig
+
+def create_heatmap_chart(matrix, title, x_label, y_label, value_label, height=450):
+    """Mapa de calor de uma grade já agregada (linhas x colunas de um DataFrame)"""
+    if matrix.empty:
+        fig = px.imshow([[0]], title=f"{title} (Sem dados)")
+        fig.update_layout(height=height, title_x=0.5, template=plotly_template)
+        return fig
+
+    fig = go.Figure(go.Heatmap(
+        z=matrix.values,
+        x=[str(x.date()) if hasattr(x, "date") else str(x) for x in matrix.columns],
+        y=[str(y) for y in matrix.index],
+        colorscale=[[i / (len(heatmap_scale) - 1), color] for i, color in enumerate(heatmap_scale)],
+        colorbar=dict(title=value_label),
+        hovertemplate=f"{y_label}: %{{y}}<br>{x_label}: %{{x}}<br>{value_label}: %{{z:.2f}}<extra></extra>"
+    ))
+    fig.update_layout(
+        height=height,
+        title=dict(text=f"<b>{title}</b>", x=0.5),
+        title_font_size=14,
+        font=dict(size=10),
+        xaxis=dict(title=x_label, showgrid=False),
+        yaxis=dict(title=y_label, showgrid=False, autorange="reversed"),
+        margin=dict(l=50, r=20, t=60, b=40),
+        template=plotly_template
+    )
+    return fig
+
+def create_congestion_chart(profile, title, height=600):
+    """Movimentos programados x realizados por faixa de 15 min, carga da última hora e taxi-out"""
+    if profile.empty:
+        fig = px.bar(title=f"{title} (Sem dados)")
+        fig.update_layout(height=height, title_x=0.5, template=plotly_template)
+        return fig
+
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.7, 0.3], vertical_spacing=0.06,
+                        specs=[[{"secondary_y": True}], [{}]])
+    x_values = list(profile.index)
+    colors = {"SCHED_DEP": palette[4], "DEP": palette[0], "SCHED_ARR": palette[4], "ARR": palette[2]}
+    for event in ["SCHED_DEP", "DEP"]:
+        fig.add_trace(go.Bar(x=x_values, y=profile[event], name=EVENT_LABELS[event], marker_color=colors[event],
+                             hovertemplate=f"%{{x}}<br>{EVENT_LABELS[event]}: %{{y:.1f}}<extra></extra>"), row=1, col=1)
+    for event in ["SCHED_ARR", "ARR"]:
+        fig.add_trace(go.Scatter(x=x_values, y=profile[event], name=EVENT_LABELS[event], mode="lines",
+                                 line=dict(color=colors[event], dash="dot" if event == "SCHED_ARR" else "solid"),
+                                 hovertemplate=f"%{{x}}<br>{EVENT_LABELS[event]}: %{{y:.1f}}<extra></extra>"), row=1, col=1)
+    for col, name, dash in (("SCHED_LOAD_1H", "Carga programada (1 h)", "dot"), ("LOAD_1H", "Carga realizada (1 h)", "solid")):
+        fig.add_trace(go.Scatter(x=x_values, y=profile[col], name=name, mode="lines",
+                                 line=dict(color=palette_red[0], width=3, dash=dash),
+                                 hovertemplate=f"%{{x}}<br>{name}: %{{y:.1f}} mov.<extra></extra>"), row=1, col=1, secondary_y=True)
+    fig.add_trace(go.Scatter(x=x_values, y=profile["TAXI_OUT"], name="Taxi-out médio", mode="lines+markers",
+                             line=dict(color=palette[1], width=2), marker=dict(size=4), connectgaps=False,
+                             hovertemplate="%{x}<br>Taxi-out: %{y:.1f} min<extra></extra>"), row=2, col=1)
+
+    fig.update_layout(
+        barmode="group",
+        height=height,
+        title=dict(text=f"<b>{title}</b>", x=0.5),
+        title_font_size=14,
+        font=dict(size=10),
+        legend=dict(orientation="h", y=-0.12),
+        margin=dict(l=50, r=50, t=60, b=40),
+        template=plotly_template
+    )
+    fig.update_yaxes(title_text="Voos por faixa de 15 min", row=1, col=1, secondary_y=False)
+    fig.update_yaxes(title_text="Movimentos na última hora", row=1, col=1, secondary_y=True, showgrid=False)
+    fig.update_yaxes(title_text="Taxi-out (min)", row=2, col=1)
+    fig.update_xaxes(title_text="Horário local", nticks=24, row=2, col=1)
+    return fig
+
+def build_heatmap_figures(df, selected_metric, cube, airport_dim="ORIGIN", top_airports=50):
+    """Mapas de calor hora x dia da semana (bincount 2D) e aeroporto x dia (lido do cubo)"""
+    config = METRIC_CONFIG[selected_metric]
+    value_label = f"{config['title']} ({config['unit']})"
+    if airport_dim not in cube.dimensions:
+        airport_dim = "ORIGIN_CITY"
+
+    weekday_hour = crosstab_metric(df, "DAY_OF_WEEK", "TIME_HOUR", config)
+    airport_day = cube.day_matrix(airport_dim, config, top=top_airports)
+    return {
+        "weekday_hour": create_heatmap_chart(weekday_hour, f"🗓️ Dia da Semana x Hora - {config['title']}", "Hora", "Dia da Semana", value_label),
+        "airport_day": create_heatmap_chart(airport_day, f"🛫 Top {top_airports} Aeroportos x Dia - {config['title']}", "Data", "Aeroporto", value_label, height=900),
+    }
@@ -0,0 +1,153 @@
+"""Comparação entre dois períodos a partir de agregados parciais diários
+
+Cada período é respondido somando fatias diárias já agregadas: o cubo (voos.aggregates)
+para as dimensões dos gráficos e DailyRoutes para as rotas do mapa. Somas, contagens e
+sketches de quantis se mesclam por soma, então comparar dois trimestres custa
+O(dias x grupos) e nenhuma linha de voo é relida.
+
+DailyRoutes guarda só os pares (data, rota) que têm voos, em ordem de data: um período
+é uma fatia contígua dos arrays (duas buscas binárias) reduzida por rota com np.bincount.
+"""
+import numpy as np
+import pandas as pd
+
+from voos.aggregates import SKETCH_COLUMN
+from voos.geometry import add_route_geometry
+from voos.sketches import N_BUCKETS, bucket_index, sketch_quantiles
+from voos.topk import ROUTE_KEYS, ROUTE_MEASURES
+
+MIN_ROUTE_FLIGHTS = 10  # rotas com menos voos em algum dos períodos ficam fora do mapa de variação
+BIG_NUMBER_DIMENSION = "DAY_OF_WEEK"  # dimensão sem nulos: a soma dos grupos é o total de voos
+
+
+def period_label(period):
+    """Rótulo legível de um período (início, fim)"""
+    start, end = (pd.Timestamp(value) for value in period)
+    return f"{start:%d/%m/%Y}" if start == end else f"{start:%d/%m/%Y} – {end:%d/%m/%Y}"
+
+
+def _with_delta(table):
+    """Acrescenta DELTA (B - A) e DELTA_PCT (relativa a A; NaN quando A é 0 ou ausente)"""
+    table["DELTA"] = table["B"] - table["A"]
+    table["DELTA_PCT"] = table["DELTA"] / table["A"].where(table["A"] != 0)
+    return table
+
+
+def compare_series(cube, dim, metric_config, period_a, period_b):
+    """Métrica por grupo nos dois períodos (colunas A e B) com as diferenças, ordenada por B"""
+    table = pd.concat({
+        "A": cube.metric_series(dim, metric_config, *period_a),
+        "B": cube.metric_series(dim, metric_config, *period_b),
+    }, axis=1)
+    table.index.name = dim
+    return _with_delta(table.sort_values("B", ascending=False, na_position="last"))
+
+
+def period_big_numbers(cube, start=None, end=None):
+    """Big numbers de um período lidos das somas do cubo (mesmas chaves de calculate_big_numbers)"""
+    totals = cube.dimensions[BIG_NUMBER_DIMENSION].totals(cube.date_mask(start, end)).sum()
+    flights = int(totals["FLIGHTS"])
+
+    def percent(col):
+        return totals[f"{col}_SUM"] / flights * 100 if flights > 0 else 0
+
+    return {
+        "total_flights": flights,
+        "avg_delay": totals["DELAY_OVERALL_SUM"] / totals["DELAY_OVERALL_N"] if totals["DELAY_OVERALL_N"] else np.nan,
+        "delay_percentage": percent("DELAY"),
+        "cancelled_percentage": percent("CANCELLED"),
+        "diverted_percentage": percent("DIVERTED"),
+    }
+
+
+def compare_big_numbers(cube, period_a, period_b):
+    """{chave: (valor em A, valor em B)} para os big numbers"""
+    a, b = period_big_numbers(cube, *period_a), period_big_numbers(cube, *period_b)
+    return {key: (a[key], b[key]) for key in a}
+
+
+class DailyRoutes:
+    """Somas, contagens e sketches por (data, rota), esparsos e em ordem de data"""
+
+    def __init__(self, dates, route_info, pair_dates, pair_routes, flights, sums, counts, cells):
+        self.dates = dates  # DatetimeIndex ordenado
+        self.route_info = route_info  # ROUTE_KEYS de cada rota (posição = id da rota)
+        self.pair_dates = pair_dates  # código da data de cada par (não decrescente)
+        self.pair_routes = pair_routes
+        self.flights = flights
+        self.sums = sums
+        self.counts = counts
+        self.cells = cells  # (par, faixa, contagem) das células não vazias dos sketches
+
+    @property
+    def n_routes(self):
+        return len(self.route_info)
+
+    @classmethod
+    def build(cls, df):
+        """Agrega os voos por (data, rota) em uma passada (np.unique + np.bincount)"""
+        valid = df[ROUTE_KEYS].notna().all(axis=1).to_numpy() & df["FL_DATE"].notna().to_numpy()
+        rows = np.flatnonzero(valid)
+        route_codes, routes = pd.MultiIndex.from_frame(df[ROUTE_KEYS].iloc[rows]).factorize()
+        date_codes, dates = pd.factorize(df["FL_DATE"].iloc[rows].dt.normalize(), sort=True)
+        n_routes = len(routes)
+
+        pairs, inverse = np.unique(date_codes.astype(np.int64) * n_routes + route_codes, return_inverse=True)
+        n_pairs = len(pairs)
+        flights = np.bincount(inverse, minlength=n_pairs).astype(np.int64)
+        sums, counts = {}, {}
+        for col in ROUTE_MEASURES:
+            if col in df.columns:
+                values = df[col].to_numpy(dtype=np.float64, na_value=np.nan)[rows]
+                not_null = ~np.isnan(values)
+                sums[col] = np.bincount(inverse, weights=np.where(not_null, values, 0.0), minlength=n_pairs)
+                counts[col] = np.bincount(inverse, weights=not_null, minlength=n_pairs).astype(np.int64)
+
+        delays = df[SKETCH_COLUMN].to_numpy(dtype=np.float64, na_value=np.nan)[rows]
+        known = ~np.isnan(delays)
+        cell_keys, cell_counts = np.unique(inverse[known] * N_BUCKETS + bucket_index(delays[known]), return_counts=True)
+        cells = (cell_keys // N_BUCKETS, (cell_keys % N_BUCKETS).astype(np.int16), cell_counts.astype(np.uint32))
+
+        route_info = pd.DataFrame(list(routes), columns=ROUTE_KEYS)
+        return cls(pd.DatetimeIndex(dates), route_info, pairs // n_routes, pairs % n_routes, flights, sums, counts, cells)
+
+    def _pair_slice(self, start=None, end=None):
+        """Pares das datas em [start, end]: uma fatia contígua (os pares estão em ordem de data)"""
+        first = 0 if start is None else self.dates.searchsorted(pd.Timestamp(start), side="left")
+        last = len(self.dates) if end is None else self.dates.searchsorted(pd.Timestamp(end), side="right")
+        return slice(*np.searchsorted(self.pair_dates, [first, last]))
+
+    def _reduce(self, values, rows):
+        return np.bincount(self.pair_routes[rows], weights=values[rows], minlength=self.n_routes)
+
+    def values(self, metric_config, start=None, end=None):
+        """(voos, valor da métrica) de cada rota no período; NaN nas rotas sem voos"""
+        rows = self._pair_slice(start, end)
+        flights = self._reduce(self.flights, rows).astype(np.int64)
+        if metric_config["agg"] == "quantile":
+            pair, bucket, count = self.cells
+            cells = slice(*np.searchsorted(pair, [rows.start, rows.stop]))
+            flat = self.pair_routes[pair[cells]] * N_BUCKETS + bucket[cells]
+            sketch = np.bincount(flat, weights=count[cells], minlength=self.n_routes * N_BUCKETS)
+            values = sketch_quantiles(sketch.reshape(self.n_routes, N_BUCKETS), metric_config["q"])[:, 0]
+        else:
+            col = metric_config["col"]
+            values = self._reduce(self.sums[col], rows)
+            if metric_config["agg"] == "mean":
+                n = self._reduce(self.counts[col], rows)
+                values = values / np.where(n > 0, n, np.nan)
+        return flights, np.where(flights > 0, values, np.nan)
+
+
+def compare_routes(daily, metric_config, period_a, period_b, top_n=30, min_flights=MIN_ROUTE_FLIGHTS):
+    """As `top_n` rotas de maior variação absoluta da métrica entre os períodos (com geometria)"""
+    flights_a, value_a = daily.values(metric_config, *period_a)
+    flights_b, value_b = daily.values(metric_config, *period_b)
+    table = daily.route_info.copy()
+    table["FLIGHTS_A"], table["FLIGHTS_B"] = flights_a, flights_b
+    table["A"], table["B"] = value_a, value_b
+    table = _with_delta(table)
+    eligible = (flights_a >= min_flights) & (flights_b >= min_flights) & table["DELTA"].notna().to_numpy()
+    table = table[eligible]
+    order = np.argsort(-table["DELTA"].abs().to_numpy(), kind="stable")[:top_n]
+    return add_route_geometry(table.iloc[order].reset_index(drop=True))
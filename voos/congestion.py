@@ -0,0 +1,208 @@
+"""Congestionamento dos aeroportos: movimentos por faixa de 15 minutos e carga horária móvel
+
+Os horários HHMM (locais de cada aeroporto) viram minutos absolutos desde a primeira
+data do dataset. Partidas e chegadas de todos os aeroportos ficam em eixos ordenados
+com chave = aeroporto * passo + minuto, e o passo deixa um intervalo entre aeroportos
+maior que a janela, de modo que nenhuma janela atravessa de um aeroporto para outro.
+Contagens por faixa saem de np.unique/np.bincount, a carga da última hora de uma faixa
+é a diferença de duas posições da soma acumulada (np.cumsum + np.searchsorted) e a
+carga em torno de cada voo é a diferença de duas buscas no eixo: nada de groupby ou
+rolling por aeroporto.
+"""
+import numpy as np
+import pandas as pd
+
+SLOT_MINUTES = 15
+WINDOW_MINUTES = 60
+DAY_MINUTES = 24 * 60
+SLOTS_PER_DAY = DAY_MINUTES // SLOT_MINUTES
+# Um horário local menor que o de referência por mais que isto cai em um dia seguinte
+# (os fusos dos EUA diferem em até 6 h entre origem e destino)
+NEXT_DAY_SLACK = 6 * 60
+
+TIME_COLUMNS = ["CRS_DEP_TIME", "DEP_TIME", "CRS_ARR_TIME", "ARR_TIME"]
+EVENTS = ["SCHED_DEP", "DEP", "SCHED_ARR", "ARR"]
+EVENT_LABELS = {
+    "SCHED_DEP": "Partidas programadas",
+    "DEP": "Partidas realizadas",
+    "SCHED_ARR": "Chegadas programadas",
+    "ARR": "Chegadas realizadas",
+}
+LOAD_COLUMN = "ORIGIN_LOAD_1H"  # movimentos programados na origem na hora em torno da partida
+
+
+def hhmm_minutes(values):
+    """HHMM (número, com NaN) -> minutos desde a meia-noite"""
+    values = np.asarray(values, dtype=np.float64)
+    return values // 100 * 60 + values % 100
+
+
+def _after(minutes, reference):
+    """Minutos de um evento posterior a `reference`, somando os dias em que o relógio 'voltou'"""
+    days = np.ceil((reference - NEXT_DAY_SLACK - minutes) / DAY_MINUTES)
+    return minutes + DAY_MINUTES * np.where(days > 0, days, 0)
+
+
+def flight_keys(df):
+    """Chaves (aeroporto * passo + minuto) dos quatro eventos de cada voo; -1 onde falta o horário
+
+    Devolve (aeroportos, início, passo, {evento: chaves alinhadas às linhas de df}).
+    """
+    n = len(df)
+    codes, airports = pd.factorize(pd.concat([df["ORIGIN"], df["DEST"]], ignore_index=True), sort=True)
+    origin, dest = codes[:n].astype(np.int64), codes[n:].astype(np.int64)
+
+    dates = df["FL_DATE"].to_numpy().astype("datetime64[D]")
+    start = dates.min() if n else np.datetime64("1970-01-01")
+    day = np.where(np.isnat(dates), np.nan, (dates - start).astype(np.float64)) * DAY_MINUTES
+
+    sched_dep = hhmm_minutes(df["CRS_DEP_TIME"])
+    dep = _after(hhmm_minutes(df["DEP_TIME"]), sched_dep)
+    minutes = {
+        "SCHED_DEP": day + sched_dep,
+        "DEP": day + dep,
+        "SCHED_ARR": day + _after(hhmm_minutes(df["CRS_ARR_TIME"]), sched_dep),
+        "ARR": day + _after(hhmm_minutes(df["ARR_TIME"]), np.where(np.isnan(dep), sched_dep, dep)),
+    }
+    last = max([np.nanmax(values) for values in minutes.values() if np.isfinite(values).any()], default=0)
+    span = (int(last // DAY_MINUTES) + 2) * DAY_MINUTES  # múltiplo de SLOT_MINUTES, folga > janela
+
+    keys = {}
+    for event, values in minutes.items():
+        airport = origin if event.endswith("DEP") else dest
+        valid = ~np.isnan(values) & (airport >= 0)
+        keys[event] = np.where(valid, airport * span + np.where(valid, values, 0).astype(np.int64), -1)
+    return pd.Index(airports), pd.Timestamp(start), span, keys
+
+
+def _trailing(slots, cumulative, at, width):
+    """Soma das contagens nas faixas (at - width, at] lida da soma acumulada das faixas ocupadas"""
+    end = np.searchsorted(slots, at, side="right")
+    begin = np.searchsorted(slots, at - width, side="right")
+    return cumulative[end] - cumulative[begin]
+
+
+class AirportTimeline:
+    """Eventos programados e realizados de todos os aeroportos em eixos ordenados"""
+
+    def __init__(self, airports, start, span, keys, taxi_out=None):
+        self.airports = airports  # código IATA de cada aeroporto (posição = código)
+        self.start = start  # meia-noite da primeira data
+        self.span = span  # minutos reservados por aeroporto no eixo
+        self.events = {}
+        self.taxi_out = None  # TAXI_OUT alinhado às partidas realizadas ordenadas
+        for event in EVENTS:
+            valid = keys[event] >= 0
+            order = np.argsort(keys[event][valid], kind="stable")
+            self.events[event] = keys[event][valid][order]
+            if event == "DEP" and taxi_out is not None:
+                self.taxi_out = np.asarray(taxi_out, dtype=np.float64)[valid][order]
+
+    @classmethod
+    def build(cls, df):
+        taxi_out = df["TAXI_OUT"].to_numpy(dtype=np.float64, na_value=np.nan) if "TAXI_OUT" in df.columns else None
+        return cls(*flight_keys(df), taxi_out=taxi_out)
+
+    def movements_around(self, centers, events=("SCHED_DEP", "SCHED_ARR"), window=WINDOW_MINUTES):
+        """Quantidade de eventos no mesmo aeroporto em [centro - janela/2, centro + janela/2)"""
+        half = window // 2
+        total = np.zeros(len(centers), dtype=np.int64)
+        for event in events:
+            axis = self.events[event]
+            total += np.searchsorted(axis, centers + half) - np.searchsorted(axis, centers - half)
+        return total
+
+    def _slot_counts(self, low=0, high=None):
+        """Faixas ocupadas no trecho [low, high) do eixo e as contagens de cada evento nelas"""
+        pieces = {}
+        for event in EVENTS:
+            axis = self.events[event]
+            stop = len(axis) if high is None else np.searchsorted(axis, high)
+            pieces[event] = axis[np.searchsorted(axis, low):stop] // SLOT_MINUTES
+        slots = np.unique(np.concatenate(list(pieces.values())))
+        counts = {event: np.bincount(np.searchsorted(slots, values), minlength=len(slots))
+                  for event, values in pieces.items()}
+
+        taxi_sum, taxi_n = np.zeros(len(slots)), np.zeros(len(slots))
+        if self.taxi_out is not None:
+            first = np.searchsorted(self.events["DEP"], low)
+            taxi = self.taxi_out[first:first + len(pieces["DEP"])]
+            where = np.searchsorted(slots, pieces["DEP"])
+            known = ~np.isnan(taxi)
+            taxi_sum = np.bincount(where[known], weights=taxi[known], minlength=len(slots))
+            taxi_n = np.bincount(where[known], minlength=len(slots)).astype(np.float64)
+        return slots, counts, taxi_sum, taxi_n
+
+    def _slot_table(self, slots, counts, taxi_sum, taxi_n, at):
+        """Tabela das faixas `at` (não precisam estar ocupadas) com as cargas da última hora"""
+        where = np.minimum(np.searchsorted(slots, at), max(len(slots) - 1, 0))
+        hit = slots[where] == at if len(slots) else np.zeros(len(at), dtype=bool)
+
+        def gather(values):
+            return np.where(hit, values[where], 0) if len(slots) else np.zeros(len(at), dtype=values.dtype)
+
+        per_airport = self.span // SLOT_MINUTES
+        table = {
+            "AIRPORT": self.airports[at // per_airport],
+            "SLOT": self.start + pd.to_timedelta((at % per_airport) * SLOT_MINUTES, unit="min"),
+        }
+        for event in EVENTS:
+            table[event] = gather(counts[event])
+        for name, events in (("SCHED_LOAD_1H", ("SCHED_DEP", "SCHED_ARR")), ("LOAD_1H", ("DEP", "ARR"))):
+            cumulative = np.concatenate([[0], np.cumsum(counts[events[0]] + counts[events[1]])])
+            table[name] = _trailing(slots, cumulative, at, WINDOW_MINUTES // SLOT_MINUTES)
+        table["TAXI_OUT_SUM"] = gather(taxi_sum)
+        table["TAXI_OUT_N"] = gather(taxi_n)
+        return pd.DataFrame(table)
+
+    def slot_table(self):
+        """Todas as faixas ocupadas de todos os aeroportos (movimentos, cargas e soma do taxi-out)"""
+        slots, counts, taxi_sum, taxi_n = self._slot_counts()
+        return self._slot_table(slots, counts, taxi_sum, taxi_n, slots)
+
+    def summary(self):
+        """Por aeroporto: movimentos, pico da carga horária (programada e realizada) e taxi-out médio"""
+        table = self.slot_table()
+        grouped = table.groupby("AIRPORT", sort=False)
+        summary = pd.DataFrame({
+            "SCHED_MOVEMENTS": grouped["SCHED_DEP"].sum() + grouped["SCHED_ARR"].sum(),
+            "MOVEMENTS": grouped["DEP"].sum() + grouped["ARR"].sum(),
+            "PEAK_SCHED_LOAD_1H": grouped["SCHED_LOAD_1H"].max(),
+            "PEAK_LOAD_1H": grouped["LOAD_1H"].max(),
+            "TAXI_OUT": grouped["TAXI_OUT_SUM"].sum() / grouped["TAXI_OUT_N"].sum().replace(0, np.nan),
+        })
+        return summary.sort_values("SCHED_MOVEMENTS", ascending=False)
+
+    def slots(self, airport):
+        """Todas as faixas (inclusive as vazias) do período para um aeroporto"""
+        code = self.airports.get_loc(airport)
+        low, high = code * self.span, (code + 1) * self.span
+        slots, counts, taxi_sum, taxi_n = self._slot_counts(low, high)
+        if not len(slots):
+            return self._slot_table(slots, counts, taxi_sum, taxi_n, np.empty(0, dtype=np.int64))
+        # Grade densa do primeiro ao último dia com movimento
+        first = slots[0] - slots[0] % SLOTS_PER_DAY
+        last = slots[-1] - slots[-1] % SLOTS_PER_DAY + SLOTS_PER_DAY
+        return self._slot_table(slots, counts, taxi_sum, taxi_n, np.arange(first, last))
+
+    def profile(self, airport, day=None):
+        """Perfil de 15 em 15 minutos de um aeroporto em um dia ou na média dos dias do período"""
+        table = self.slots(airport)
+        if day is not None:
+            table = table[table["SLOT"].dt.normalize() == pd.Timestamp(day)]
+        n_days = max(table["SLOT"].dt.normalize().nunique(), 1)
+        time_of_day = table["SLOT"].dt.strftime("%H:%M")
+        sums = table.drop(columns=["AIRPORT", "SLOT"]).groupby(time_of_day).sum()
+        profile = sums[EVENTS + ["SCHED_LOAD_1H", "LOAD_1H"]] / n_days
+        profile["TAXI_OUT"] = sums["TAXI_OUT_SUM"] / sums["TAXI_OUT_N"].replace(0, np.nan)
+        return profile
+
+
+def attach_congestion(df):
+    """Acrescenta ORIGIN_LOAD_1H: movimentos programados na origem na hora em torno da partida"""
+    airports, start, span, keys = flight_keys(df)
+    timeline = AirportTimeline(airports, start, span, keys)
+    centers = keys["SCHED_DEP"]
+    load = timeline.movements_around(centers)
+    df[LOAD_COLUMN] = np.where(centers >= 0, load, np.nan).astype(np.float32)
+    return df
@@ -0,0 +1,59 @@
+"""Leitura e preparo do df_view.csv, compartilhados pelo dashboard e pelas ferramentas de linha de comando"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from voos.airports import describe_coverage, get_airport_index
+from voos.congestion import LOAD_COLUMN, TIME_COLUMNS, attach_congestion
+from voos.geometry import great_circle_miles
+from voos.schema import describe_validation, read_validated_csv
+
+DF_VIEW_PATH = os.environ.get("FLIGHTS_DF_VIEW", os.path.join("project_development", "dataset", "created", "df_view.csv"))
+
+
+def read_df_view(path=DF_VIEW_PATH):
+    """Lê o df_view e acrescenta as colunas derivadas
+
+    Devolve (df, avisos), com avisos = [(nível, mensagem)] para quem exibe (st.warning, print...).
+    """
+    notices = []
+    # Tipos, faixas e categorias validados bloco a bloco (voos.schema); as linhas
+    # inválidas ficam em quarentena e as colunas já chegam com os tipos finais
+    df, validation = read_validated_csv(path)
+    if describe_validation(validation):
+        notices.append(("warning", describe_validation(validation)))
+
+    # Coordenadas por gather inteiro no índice de aeroportos (sem merge), com relatório
+    # dos códigos IATA que não existem em airports.csv
+    if {"ORIGIN", "DEST"} <= set(df.columns):
+        df, coverage = get_airport_index().attach_coordinates(df)
+        if describe_coverage(coverage):
+            notices.append(("warning", describe_coverage(coverage)))
+
+    # Dados ausentes ficam ausentes (NaN): o mapa mostra só o que é real
+    missing_coords = [col for col in ["ORIGIN_LAT", "ORIGIN_LON", "DEST_LAT", "DEST_LON"] if col not in df.columns]
+    if missing_coords:
+        notices.append(("warning", f"Colunas {', '.join(missing_coords)} não encontradas e sem códigos ORIGIN/DEST para geocodificar. O mapa ficará indisponível."))
+        for col in missing_coords:
+            df[col] = np.nan
+    if "DISTANCE" not in df.columns:
+        notices.append(("info", "Coluna 'DISTANCE' não encontrada. Usando a distância de círculo máximo entre os aeroportos."))
+        df["DISTANCE"] = great_circle_miles(df["ORIGIN_LAT"], df["ORIGIN_LON"], df["DEST_LAT"], df["DEST_LON"]).round()
+
+    # Adicionar DELAY_PER_DISTANCE para a nova métrica
+    df["DELAY_PER_DISTANCE"] = np.where(df["DISTANCE"] != 0, df["DELAY_OVERALL"] / df["DISTANCE"], 0)
+
+    # Carga horária na origem a partir dos horários programados (voos.congestion)
+    if {"ORIGIN", "DEST", *TIME_COLUMNS} <= set(df.columns):
+        df = attach_congestion(df)
+    else:
+        notices.append(("info", "Horários de partida/chegada não encontrados. As métricas de congestionamento ficarão indisponíveis."))
+        df[LOAD_COLUMN] = np.nan
+    if "TAXI_OUT" not in df.columns:
+        df["TAXI_OUT"] = np.nan
+
+    # Faixas de distância calculadas uma vez na carga
+    df["DISTANCE_BIN"] = pd.cut(df["DISTANCE"], bins=10, precision=0)
+
+    return df, notices
@@ -0,0 +1,180 @@
+"""Exportação em CSV/XLSX, em fluxo e com memória limitada
+
+As linhas filtradas são selecionadas por um array de índices (sem cópia do
+DataFrame) e serializadas em blocos de CHUNK_ROWS linhas: o CSV sai como um
+gerador de bytes, pronto para uma resposta HTTP em partes; o XLSX usa o modo
+write-only do openpyxl (linhas vão direto para arquivos temporários) e depois é lido
+em blocos.
+
+Uso: python -m voos.export --what rows --airline "DELTA AIR LINES INC." --format xlsx --out voos.xlsx
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+from voos.charts import DISTRIBUTION_CHARTS
+from voos.dataset import DF_VIEW_PATH, read_df_view
+from voos.metrics import METRIC_CONFIG, create_metric_data
+
+CHUNK_ROWS = 50_000
+READ_BYTES = 1 << 20
+XLSX_MAX_ROWS = 1_048_576  # limite de linhas de uma planilha (inclui o cabeçalho)
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# Filtros aceitos: nome do filtro -> coluna do df_view
+FILTER_COLUMNS = {"airline": "AIRLINE_Description", "origin": "ORIGIN", "dest": "DEST", "state": "ORIGIN_STATE"}
+
+
+def filter_rows(df, start=None, end=None, **filters):
+    """Índices das linhas no intervalo de datas e nos valores pedidos (filtros vazios = tudo)"""
+    mask = np.ones(len(df), dtype=bool)
+    if start is not None:
+        mask &= (df["FL_DATE"] >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        mask &= (df["FL_DATE"] <= pd.Timestamp(end)).to_numpy()
+    for name, values in filters.items():
+        if values:
+            values = [values] if isinstance(values, str) else list(values)
+            mask &= df[FILTER_COLUMNS[name]].isin(values).to_numpy()
+    return np.flatnonzero(mask)
+
+
+def metric_column(metric):
+    """Coluna do df_view lida pela métrica (o percentil é calculado sobre DELAY_OVERALL)"""
+    config = METRIC_CONFIG[metric]
+    return "DELAY_OVERALL" if config["agg"] == "quantile" else config["col"]
+
+
+def chart_aggregate(df, chart_id, metric, rows=None, cube=None):
+    """Série agregada de um gráfico de DISTRIBUTION_CHARTS como tabela (grupo, valor)
+
+    Sem filtro (rows=None) o percentil sai dos sketches do cubo; com filtro, só as duas
+    colunas usadas (grupo e métrica) das linhas selecionadas são copiadas.
+    """
+    spec = next(spec for spec in DISTRIBUTION_CHARTS if spec["id"] == chart_id)
+    value_col = metric_column(metric)
+    missing = [col for col in (spec["col"], value_col) if col not in df.columns]
+    if missing:
+        raise ValueError(f"Coluna '{missing[0]}' não encontrada no dataset (gráfico {chart_id}, métrica {metric})")
+    if rows is not None:
+        df, cube = df[[spec["col"], value_col]].iloc[rows], None
+    data, title_suffix = create_metric_data(df, spec["col"], metric, observed=True, cube=cube)
+    return pd.DataFrame({spec["label"]: data.index.astype(str), title_suffix: data.to_numpy()})
+
+
+def _chunks(df, rows, columns, chunk_rows):
+    rows = np.arange(len(df)) if rows is None else rows
+    for start in range(0, len(rows), chunk_rows):
+        yield df[columns].iloc[rows[start:start + chunk_rows]]
+
+
+def iter_csv(df, rows=None, columns=None, chunk_rows=CHUNK_ROWS):
+    """Gera o CSV em blocos de bytes (cabeçalho + um bloco a cada chunk_rows linhas)"""
+    columns = list(df.columns) if columns is None else list(columns)
+    yield (",".join(columns) + "\n").encode("utf-8")
+    for chunk in _chunks(df, rows, columns, chunk_rows):
+        yield chunk.to_csv(index=False, header=False, date_format="%Y-%m-%d").encode("utf-8")
+
+
+def write_xlsx(target, df, rows=None, columns=None, chunk_rows=CHUNK_ROWS, sheet="voos"):
+    """Grava o XLSX em modo write-only; passa para uma nova planilha ao atingir o limite de linhas"""
+    columns = list(df.columns) if columns is None else list(columns)
+    workbook = Workbook(write_only=True)
+    sheet_rows = XLSX_MAX_ROWS
+    part = 0
+    for chunk in _chunks(df, rows, columns, chunk_rows):
+        # Faixas (Interval) viram texto; NaN vira célula vazia
+        intervals = [col for col in columns if isinstance(chunk[col].dtype, pd.IntervalDtype)
+                     or (isinstance(chunk[col].dtype, pd.CategoricalDtype) and isinstance(chunk[col].cat.categories.dtype, pd.IntervalDtype))]
+        values = chunk.astype({col: str for col in intervals}).astype(object).where(chunk.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            if sheet_rows >= XLSX_MAX_ROWS:
+                part += 1
+                worksheet = workbook.create_sheet(sheet if part == 1 else f"{sheet}_{part}")
+                worksheet.append(columns)
+                sheet_rows = 1
+            worksheet.append(row)
+            sheet_rows += 1
+    if part == 0:
+        workbook.create_sheet(sheet).append(columns)
+    workbook.save(target)
+
+
+def iter_xlsx(df, rows=None, columns=None, chunk_rows=CHUNK_ROWS):
+    """Gera o XLSX em blocos de bytes a partir de um arquivo temporário (apagado no fim)"""
+    handle, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(handle)
+    try:
+        write_xlsx(path, df, rows, columns, chunk_rows)
+        with open(path, "rb") as file:
+            while block := file.read(READ_BYTES):
+                yield block
+    finally:
+        os.remove(path)
+
+
+def iter_export(df, fmt, rows=None, columns=None, chunk_rows=CHUNK_ROWS):
+    """Blocos de bytes do arquivo no formato pedido ("csv" ou "xlsx")"""
+    if fmt == "csv":
+        return iter_csv(df, rows, columns, chunk_rows)
+    if fmt == "xlsx":
+        return iter_xlsx(df, rows, columns, chunk_rows)
+    raise ValueError(f"Formato não suportado: {fmt}")
+
+
+def export_file(path, df, fmt=None, rows=None, columns=None, chunk_rows=CHUNK_ROWS):
+    """Grava o arquivo em disco em blocos; o formato sai da extensão se não for informado"""
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt == "xlsx":
+        write_xlsx(path, df, rows, columns, chunk_rows)
+        return path
+    with open(path, "wb") as file:
+        for block in iter_export(df, fmt, rows, columns, chunk_rows):
+            file.write(block)
+    return path
+
+
+
+def export_tempfile(df, fmt, rows=None, columns=None, chunk_rows=CHUNK_ROWS):
+    """Arquivo temporário aberto (posição 0) com a exportação; some do disco ao ser fechado"""
+    file = tempfile.TemporaryFile(suffix=f".{fmt}")
+    if fmt == "xlsx":
+        write_xlsx(file, df, rows, columns, chunk_rows)
+    else:
+        for block in iter_export(df, fmt, rows, columns, chunk_rows):
+            file.write(block)
+    file.seek(0)
+    return file
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta voos filtrados ou o agregado de um gráfico em CSV/XLSX")
+    parser.add_argument("--what", choices=["rows", "aggregate"], default="rows")
+    parser.add_argument("--chart", choices=[spec["id"] for spec in DISTRIBUTION_CHARTS], default="airlines")
+    parser.add_argument("--metric", choices=list(METRIC_CONFIG), default="avg_delay")
+    parser.add_argument("--data", default=DF_VIEW_PATH, help="caminho do df_view.csv")
+    parser.add_argument("--start", help="data inicial (AAAA-MM-DD)")
+    parser.add_argument("--end", help="data final (AAAA-MM-DD)")
+    for name in FILTER_COLUMNS:
+        parser.add_argument(f"--{name}", nargs="*")
+    parser.add_argument("--columns", nargs="*", help="colunas exportadas (padrão: todas)")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS))
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    df, _ = read_df_view(args.data)
+    rows = filter_rows(df, args.start, args.end, **{name: getattr(args, name) for name in FILTER_COLUMNS})
+    if args.what == "aggregate":
+        table = chart_aggregate(df, args.chart, args.metric, rows)
+        export_file(args.out, table, args.format)
+        print(f"{len(table)} grupos exportados em {args.out}")
+    else:
+        export_file(args.out, df, args.format, rows, args.columns)
+        print(f"{len(rows):,} voos exportados em {args.out}")
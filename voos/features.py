@@ -0,0 +1,206 @@
+"""Matrizes de desenho esparsas (CSR) para os modelos de regressão
+
+As categóricas viram one-hot direto dos códigos, sem DataFrame de dummies: cada linha
+tem no máximo uma entrada por termo, então a matriz CSR sai de arrays (linhas, termos)
+de índices e valores. Interações entre categóricas usam o código combinado dos níveis;
+termos de alta cardinalidade (aeroportos, rotas) podem ir para um espaço de hashing de
+tamanho fixo. Os ajustes usam só produtos matriz-vetor esparsos: a memória é
+O(entradas não nulas), não O(linhas x colunas).
+"""
+import numpy as np
+import pandas as pd
+from scipy import optimize, sparse
+from scipy.sparse.linalg import LinearOperator, lsqr
+from scipy.special import expit
+
+CONST = "const"
+
+
+def term_name(term):
+    """Nome de um termo: a coluna ou as colunas da interação unidas por ':'"""
+    return term if isinstance(term, str) else ":".join(term)
+
+
+def _columns(term):
+    return [term] if isinstance(term, str) else list(term)
+
+
+class FeaturePipeline:
+    """Termos do modelo -> matriz CSR
+
+    numeric: colunas numéricas (uma coluna da matriz cada)
+    categorical: colunas ou tuplas de colunas (interação), com one-hot dos níveis vistos
+        no fit; com intercepto, o primeiro nível de cada termo é a referência
+    hashed: {coluna ou tupla: n_features}, one-hot em n_features baldes com sinal
+        (hashing trick), sem fit e sem vocabulário
+    Níveis que não apareceram no fit ficam sem entrada (efeito zero).
+    """
+
+    def __init__(self, numeric=(), categorical=(), hashed=None, intercept=True, dtype=np.float64):
+        self.numeric = list(numeric)
+        self.categorical = list(categorical)
+        self.hashed = dict(hashed or {})
+        self.intercept = intercept
+        self.dtype = dtype
+        self.column_levels = {}  # coluna -> níveis observados (ordenados)
+        self.term_levels = {}  # termo -> códigos combinados observados (ordenados)
+        self.feature_names = []
+
+    @property
+    def columns(self):
+        """Colunas do DataFrame usadas pelos termos"""
+        cols = list(self.numeric)
+        for term in self.categorical + list(self.hashed):
+            cols += [col for col in _columns(term) if col not in cols]
+        return cols
+
+    def _combined_codes(self, df, term):
+        """Código combinado (base mista) dos níveis do termo; -1 se algum nível é desconhecido"""
+        combined = np.zeros(len(df), dtype=np.int64)
+        valid = np.ones(len(df), dtype=bool)
+        for col in _columns(term):
+            levels = self.column_levels[col]
+            codes = pd.Categorical(df[col], categories=levels).codes.astype(np.int64)
+            valid &= codes >= 0
+            combined = combined * len(levels) + codes
+        return np.where(valid, combined, -1)
+
+    def fit(self, df):
+        """Aprende os níveis das categóricas e os nomes das colunas da matriz"""
+        for term in self.categorical:
+            for col in _columns(term):
+                if col not in self.column_levels:
+                    values = df[col]
+                    levels = values.cat.categories[np.unique(values.cat.codes[values.cat.codes >= 0])] \
+                        if isinstance(values.dtype, pd.CategoricalDtype) else np.sort(values.dropna().unique())
+                    self.column_levels[col] = pd.Index(levels)
+        names = [CONST] if self.intercept else []
+        names += self.numeric
+        for term in self.categorical:
+            combined = self._combined_codes(df, term)
+            self.term_levels[term_name(term)] = np.unique(combined[combined >= 0])
+            labels = self._level_labels(term)
+            names += [f"{term_name(term)}[{label}]" for label in labels[1 if self.intercept else 0:]]
+        for term, n_features in self.hashed.items():
+            names += [f"{term_name(term)}#{bucket}" for bucket in range(n_features)]
+        self.feature_names = names
+        return self
+
+    def _level_labels(self, term):
+        """Rótulos legíveis dos níveis de um termo (ex.: 'JFK:LAX' para uma rota)"""
+        combined = self.term_levels[term_name(term)]
+        parts = []
+        for col in reversed(_columns(term)):
+            levels = self.column_levels[col]
+            parts.append(np.asarray(levels.astype(str))[combined % len(levels)])
+            combined = combined // len(levels)
+        return [":".join(values) for values in zip(*reversed(parts))]
+
+    def transform(self, df):
+        """Matriz CSR (linhas de df x feature_names); uma entrada por termo e linha, no máximo"""
+        if not self.feature_names:
+            raise RuntimeError("FeaturePipeline.transform antes de fit")
+        n = len(df)
+        indices, values = [], []
+        offset = 0
+        if self.intercept:
+            indices.append(np.zeros(n, dtype=np.int64))
+            values.append(np.ones(n))
+            offset = 1
+        for col in self.numeric:
+            indices.append(np.full(n, offset, dtype=np.int64))
+            values.append(df[col].to_numpy(dtype=np.float64, na_value=np.nan))
+            offset += 1
+        for term in self.categorical:
+            levels = self.term_levels[term_name(term)]
+            combined = self._combined_codes(df, term)
+            position = np.searchsorted(levels, combined)
+            found = (combined >= 0) & (position < len(levels))
+            found[found] = levels[position[found]] == combined[found]
+            first = 1 if self.intercept else 0  # nível de referência sem coluna
+            found &= position >= first
+            indices.append(np.where(found, offset + position - first, -1))
+            values.append(np.ones(n))
+            offset += len(levels) - first
+        for term, n_features in self.hashed.items():
+            hashes = pd.util.hash_pandas_object(df[_columns(term)], index=False).to_numpy()
+            indices.append(offset + (hashes % np.uint64(n_features)).astype(np.int64))
+            values.append(np.where(hashes >> np.uint64(63), -1.0, 1.0))  # sinal: colisões se cancelam em média
+            offset += n_features
+
+        indices = np.column_stack(indices)
+        values = np.column_stack(values).astype(self.dtype)
+        keep = indices >= 0
+        index_dtype = np.int32 if offset < np.iinfo(np.int32).max else np.int64
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(keep.sum(axis=1), out=indptr[1:])
+        return sparse.csr_matrix((values[keep], indices[keep].astype(index_dtype), indptr), shape=(n, offset))
+
+    def fit_transform(self, df):
+        return self.fit(df).transform(df)
+
+
+class SparseFit:
+    """Coeficientes de um ajuste esparso (sem erros-padrão: não há matriz densa de covariância)"""
+
+    def __init__(self, kind, params, n_obs, converged, iterations):
+        self.kind = kind
+        self.params = params
+        self.n_obs = n_obs
+        self.converged = converged
+        self.iterations = iterations
+
+    def predict(self, X):
+        """Valor previsto (linear) ou probabilidade (logística)"""
+        z = X @ self.params.to_numpy()
+        return expit(z) if self.kind == "logistic" else z
+
+    def __repr__(self):
+        return f"<SparseFit {self.kind}: {len(self.params)} coeficientes, {self.n_obs} observações>"
+
+
+def _penalty(names, alpha):
+    """Peso L2 por coeficiente (o intercepto não é penalizado)"""
+    weights = np.full(len(names), float(alpha))
+    if names and names[0] == CONST:
+        weights[0] = 0.0
+    return weights
+
+
+def _column_scale(X):
+    """Norma de cada coluna (1 nas vazias): os solvers trabalham com colunas de norma 1"""
+    norms = np.sqrt(np.bincount(X.indices, weights=X.data**2, minlength=X.shape[1]))
+    return np.where(norms > 0, norms, 1.0)
+
+
+def fit_linear(X, y, names, alpha=0.0, tol=1e-10, max_iter=None):
+    """Mínimos quadrados (ridge com alpha > 0) por LSQR, só com produtos esparsos"""
+    y = np.asarray(y, dtype=np.float64)
+    n, scale = X.shape[0], _column_scale(X)
+    # Penalização nas coordenadas escaladas: alpha ||b||² = sum(alpha / scale² * b_s²)
+    damp = np.sqrt(_penalty(names, alpha)) / scale
+    # ||X b - y||² + ||damp b_s||² como um único sistema [X D⁻¹; diag(damp)], sem copiar X
+    operator = LinearOperator(
+        (n + len(scale), len(scale)),
+        matvec=lambda v: np.concatenate([X @ (v / scale), damp * v]),
+        rmatvec=lambda u: (X.T @ u[:n]) / scale + damp * u[n:],
+        dtype=np.float64,
+    )
+    result = lsqr(operator, np.concatenate([y, np.zeros(len(scale))]), atol=tol, btol=tol, iter_lim=max_iter)
+    return SparseFit("linear", pd.Series(result[0] / scale, index=names), n, result[1] in (1, 2), result[2])
+
+
+def fit_logistic(X, y, names, alpha=1.0, tol=1e-8, max_iter=1000):
+    """Regressão logística com penalização L2 por L-BFGS (gradiente por produtos esparsos)"""
+    y = np.asarray(y, dtype=np.float64)
+    scale = _column_scale(X)
+    penalty = _penalty(names, alpha) / scale**2
+
+    def loss(coef):
+        z = X @ (coef / scale)
+        grad = (X.T @ (expit(z) - y)) / scale + penalty * coef
+        return np.logaddexp(0, z).sum() - y @ z + 0.5 * penalty @ coef**2, grad
+
+    result = optimize.minimize(loss, np.zeros(X.shape[1]), jac=True, method="L-BFGS-B",
+                               options={"maxiter": max_iter, "gtol": tol})
+    return SparseFit("logistic", pd.Series(result.x / scale, index=names), len(y), bool(result.success), int(result.nit))
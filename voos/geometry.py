@@ -0,0 +1,80 @@
+"""Geometria das rotas: arcos de círculo máximo, rumo e ponto médio, vetorizados em NumPy
+
+Todas as funções recebem arrays de coordenadas (graus) de várias rotas e calculam
+tudo em lote, sem trigonometria escalar por linha.
+"""
+import numpy as np
+
+ARC_POINTS = 24
+EARTH_RADIUS_MILES = 3958.8
+
+
+def _to_unit_vectors(lat, lon):
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def _to_lat_lon(vectors):
+    x, y, z = vectors[..., 0], vectors[..., 1], vectors[..., 2]
+    return np.degrees(np.arctan2(z, np.hypot(x, y))), np.degrees(np.arctan2(y, x))
+
+
+def great_circle_arcs(lat1, lon1, lat2, lon2, n_points=ARC_POINTS):
+    """Polilinhas densificadas (n_rotas, n_points) sobre o círculo máximo de cada rota"""
+    p1 = _to_unit_vectors(np.asarray(lat1, dtype=np.float64), np.asarray(lon1, dtype=np.float64))
+    p2 = _to_unit_vectors(np.asarray(lat2, dtype=np.float64), np.asarray(lon2, dtype=np.float64))
+    omega = np.arccos(np.clip((p1 * p2).sum(axis=-1), -1.0, 1.0))[:, None]
+    t = np.linspace(0.0, 1.0, n_points)[None, :]
+
+    # Interpolação esférica (slerp); pontos coincidentes caem na interpolação linear
+    sin_omega = np.sin(omega)
+    degenerate = sin_omega < 1e-12
+    safe = np.where(degenerate, 1.0, sin_omega)
+    w1 = np.where(degenerate, 1 - t, np.sin((1 - t) * omega) / safe)
+    w2 = np.where(degenerate, t, np.sin(t * omega) / safe)
+    points = w1[..., None] * p1[:, None, :] + w2[..., None] * p2[:, None, :]
+    return _to_lat_lon(points)
+
+
+def initial_bearing(lat1, lon1, lat2, lon2):
+    """Rumo inicial (graus a partir do norte, sentido horário) de cada rota"""
+    lat1, lat2 = np.radians(lat1), np.radians(lat2)
+    d_lon = np.radians(np.asarray(lon2) - np.asarray(lon1))
+    x = np.cos(lat2) * np.sin(d_lon)
+    y = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(d_lon)
+    return (np.degrees(np.arctan2(x, y)) + 360) % 360
+
+
+def great_circle_miles(lat1, lon1, lat2, lon2):
+    """Distância de círculo máximo (milhas, fórmula de haversine); NaN quando falta coordenada"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return EARTH_RADIUS_MILES * 2 * np.arcsin(np.sqrt(a))
+
+
+def route_geometry(lat1, lon1, lat2, lon2, n_points=ARC_POINTS):
+    """Arcos, ponto médio e rumo no ponto médio (direção da seta) de um lote de rotas"""
+    arc_lat, arc_lon = great_circle_arcs(lat1, lon1, lat2, lon2, n_points)
+    mid_lat, mid_lon = great_circle_arcs(lat1, lon1, lat2, lon2, 3)
+    mid_lat, mid_lon = mid_lat[:, 1], mid_lon[:, 1]
+    return {
+        "ARC_LAT": arc_lat,
+        "ARC_LON": arc_lon,
+        "MID_LAT": mid_lat,
+        "MID_LON": mid_lon,
+        "DIRECAO": initial_bearing(mid_lat, mid_lon, lat2, lon2),
+    }
+
+
+def add_route_geometry(rotas_data, n_points=ARC_POINTS):
+    """Acrescenta à tabela de rotas os arcos (uma lista de pontos por linha), o ponto médio e o rumo"""
+    geometry = route_geometry(
+        rotas_data["ORIGIN_LAT"].to_numpy(), rotas_data["ORIGIN_LON"].to_numpy(),
+        rotas_data["DEST_LAT"].to_numpy(), rotas_data["DEST_LON"].to_numpy(), n_points
+    )
+    rotas_data = rotas_data.copy()
+    rotas_data["ARC_LAT"] = list(geometry["ARC_LAT"])
+    rotas_data["ARC_LON"] = list(geometry["ARC_LON"])
+    for col in ["MID_LAT", "MID_LON", "DIRECAO"]:
+        rotas_data[col] = geometry[col]
+    return rotas_data
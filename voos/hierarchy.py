@@ -0,0 +1,186 @@
+"""Rollup hierárquico estado -> cidade -> aeroporto -> rota para o drill-down
+
+Calculado em uma passada (estilo ROLLUP/GROUPING SETS): somas, contagens e sketches de
+atraso por rota (a folha) saem de np.bincount; cada nível acima soma os filhos com
+np.add.reduceat. Os nós de cada nível ficam em ordem lexicográfica do caminho, de modo
+que os filhos de qualquer nó são uma fatia contígua do nível seguinte: abrir um nó é
+uma busca no dicionário de caminhos e a leitura de O(filhos) posições, sem groupby.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from voos.aggregates import SKETCH_COLUMN
+from voos.geometry import add_route_geometry
+from voos.sketches import build_sketches, sketch_quantiles
+from voos.topk import ROUTE_AGGREGATIONS, ROUTE_KEYS
+
+HIERARCHY = ["ORIGIN_STATE", "ORIGIN_CITY", "ORIGIN", "DEST"]
+LEVEL_LABELS = ["Estado", "Cidade", "Aeroporto", "Rota"]
+MEASURES = ["DELAY_OVERALL", "DELAY", "CANCELLED", "DIVERTED", "DELAY_PER_DISTANCE", "TAXI_OUT", "ORIGIN_LOAD_1H", "TIME_HOUR"]
+
+
+class HierarchyLevel:
+    """Nós de um nível: rótulo, pai, voos, somas/contagens das medidas e sketches"""
+
+    def __init__(self, keys, parent, flights, sums, counts, sketch):
+        self.keys = keys
+        self.parent = parent
+        self.flights = flights
+        self.sums = sums
+        self.counts = counts
+        self.sketch = sketch
+
+    def values(self, rows, metric_config):
+        """Valor da métrica nos nós `rows` (NaN onde não há observações)"""
+        if metric_config["agg"] == "quantile":
+            return sketch_quantiles(self.sketch[rows], metric_config["q"])[:, 0]
+        col = metric_config["col"]
+        if metric_config["agg"] == "mean":
+            counts = self.counts[col][rows]
+            return self.sums[col][rows] / np.where(counts > 0, counts, np.nan)
+        return self.sums[col][rows].astype(np.float64)
+
+
+class HierarchyRollup:
+    """Rollup dos voos pela hierarquia HIERARCHY com acesso aos filhos por fatia"""
+
+    def __init__(self, levels, bounds, route_info, version=None):
+        self.levels = levels
+        self.version = version  # versão do df_view de origem (voos.metrics.dataset_version), quando gravada pelo build
+        self.bounds = bounds  # bounds[n][i]:bounds[n][i + 1] = filhos do nó i do nível n
+        self.route_info = route_info
+        # Caminho -> índice do nó, para os níveis que têm filhos (o pai do nível 0 é a raiz)
+        self._index, paths = [], [()]
+        for level in levels[:-1]:
+            paths = [paths[parent] + (key,) for key, parent in zip(level.keys, level.parent)]
+            self._index.append({path: i for i, path in enumerate(paths)})
+
+    @classmethod
+    def build(cls, df):
+        """Agrega as folhas (rotas) em uma passada e sobe a hierarquia somando os filhos"""
+        valid = np.ones(len(df), dtype=bool)
+        codes, labels = [], []
+        for col in HIERARCHY:
+            code, label = pd.factorize(df[col], sort=True)
+            codes.append(code)
+            labels.append(np.asarray(label, dtype=object))
+            valid &= code >= 0
+        rows = np.flatnonzero(valid)
+
+        # Posto denso de cada linha em cada nível: (posto do pai, código) em ordem lexicográfica
+        ranks, rank = [], np.zeros(len(rows), dtype=np.int64)
+        for code, label in zip(codes, labels):
+            _, rank = np.unique(rank * len(label) + code[rows], return_inverse=True)
+            ranks.append(rank.astype(np.int64))
+        leaf = ranks[-1]
+        n_leaves = int(leaf.max()) + 1 if len(leaf) else 0
+        first_rows = np.unique(leaf, return_index=True)[1]
+
+        flights = np.bincount(leaf, minlength=n_leaves).astype(np.int64)
+        sums, counts = {}, {}
+        for col in MEASURES:
+            if col in df.columns:
+                values = df[col].to_numpy(dtype=np.float64, na_value=np.nan)[rows]
+                not_null = ~np.isnan(values)
+                sums[col] = np.bincount(leaf, weights=np.where(not_null, values, 0.0), minlength=n_leaves)
+                counts[col] = np.bincount(leaf, weights=not_null, minlength=n_leaves).astype(np.int64)
+        sketch = build_sketches(leaf, df[SKETCH_COLUMN].to_numpy(dtype=np.float64, na_value=np.nan)[rows], n_leaves)
+
+        levels, bounds = [None] * len(HIERARCHY), []
+        for depth in range(len(HIERARCHY)):
+            # Nó de cada folha neste nível (não decrescente, pois os postos são lexicográficos)
+            node_of_leaf = ranks[depth][first_rows]
+            starts = np.flatnonzero(np.r_[True, node_of_leaf[1:] != node_of_leaf[:-1]]) if n_leaves else np.empty(0, dtype=np.int64)
+            sample = rows[first_rows[starts]]
+            parent = ranks[depth - 1][first_rows[starts]] if depth else np.zeros(len(starts), dtype=np.int64)
+            reduce = (lambda array: np.add.reduceat(array, starts, axis=0)) if len(starts) else (lambda array: array[:0])
+            levels[depth] = HierarchyLevel(
+                labels[depth][codes[depth][sample]], parent, reduce(flights),
+                {col: reduce(values) for col, values in sums.items()},
+                {col: reduce(values) for col, values in counts.items()},
+                reduce(sketch),
+            )
+        for depth in range(len(HIERARCHY) - 1):
+            bounds.append(np.searchsorted(levels[depth + 1].parent, np.arange(len(levels[depth].keys) + 1)))
+
+        info_cols = [col for col in ROUTE_KEYS if col in df.columns]
+        route_info = df[info_cols].iloc[rows[first_rows]].reset_index(drop=True)
+        return cls(levels, bounds, route_info)
+
+    def _children_slice(self, path):
+        depth = len(path)
+        if depth >= len(HIERARCHY):
+            raise KeyError(f"O nível {LEVEL_LABELS[-1]} não tem filhos")
+        if depth == 0:
+            return slice(0, len(self.levels[0].keys))
+        node = self._index[depth - 1].get(tuple(path))
+        if node is None:
+            raise KeyError(f"Caminho inexistente na hierarquia: {' > '.join(map(str, path))}")
+        return slice(int(self.bounds[depth - 1][node]), int(self.bounds[depth - 1][node + 1]))
+
+    def children(self, path, metric_config):
+        """Filhos do nó `path` (() = estados): KEY, FLIGHTS e VALUE, em ordem decrescente"""
+        rows = self._children_slice(path)
+        level = self.levels[len(path)]
+        table = pd.DataFrame({"KEY": level.keys[rows], "FLIGHTS": level.flights[rows],
+                              "VALUE": level.values(rows, metric_config)})
+        return table.sort_values("VALUE", ascending=False, kind="stable").reset_index(drop=True)
+
+    def routes(self, path, metric_config, top_n=None):
+        """Rotas que partem do aeroporto `path` no formato da tabela do mapa (com geometria)"""
+        if len(path) != len(HIERARCHY) - 1:
+            raise KeyError("As rotas são filhas de um aeroporto (estado > cidade > aeroporto)")
+        rows = self._children_slice(path)
+        level = self.levels[-1]
+        table = self.route_info.iloc[rows].reset_index(drop=True)
+        for col, agg in ROUTE_AGGREGATIONS.items():
+            if col in level.sums:
+                table[col] = level.values(rows, {"col": col, "agg": agg})
+        table["TOTAL_VOOS"] = level.flights[rows]
+        if metric_config["agg"] == "quantile":
+            table[metric_config["col"]] = level.values(rows, metric_config)
+        table = table.sort_values(metric_config["col"], ascending=False, kind="stable").head(top_n)
+        return add_route_geometry(table.dropna(subset=["ORIGIN_LAT", "ORIGIN_LON", "DEST_LAT", "DEST_LON"]).reset_index(drop=True))
+
+    def save(self, path, version=None):
+        """Grava o rollup em um único arquivo .npz (com a versão do df_view de origem, se dada)"""
+        arrays = {} if version is None else {"version": np.asarray(version, dtype=str)}
+        for depth, level in enumerate(self.levels):
+            arrays[f"{depth}/keys"] = np.asarray(level.keys.astype(str), dtype=str)
+            arrays[f"{depth}/parent"] = level.parent
+            arrays[f"{depth}/flights"] = level.flights
+            arrays[f"{depth}/sketch"] = level.sketch
+            for col in level.sums:
+                arrays[f"{depth}/sum/{col}"] = level.sums[col]
+                arrays[f"{depth}/count/{col}"] = level.counts[col]
+        for depth, bound in enumerate(self.bounds):
+            arrays[f"bounds/{depth}"] = bound
+        for col in self.route_info.columns:
+            values = self.route_info[col]
+            arrays[f"route/{col}"] = values.to_numpy(dtype=str) if values.dtype == object else values.to_numpy()
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            levels = []
+            for depth in range(len(HIERARCHY)):
+                sums = {name.rsplit("/", 1)[1]: data[name] for name in data.files if name.startswith(f"{depth}/sum/")}
+                counts = {col: data[f"{depth}/count/{col}"] for col in sums}
+                levels.append(HierarchyLevel(data[f"{depth}/keys"].astype(object), data[f"{depth}/parent"],
+                                             data[f"{depth}/flights"], sums, counts, data[f"{depth}/sketch"]))
+            bounds = [data[f"bounds/{depth}"] for depth in range(len(HIERARCHY) - 1)]
+            route_info = pd.DataFrame({name.split("/", 1)[1]: data[name] for name in data.files if name.startswith("route/")})
+            version = str(data["version"]) if "version" in data.files else None
+            return cls(levels, bounds, route_info, version)
+
+    @classmethod
+    def load_or_build(cls, path, df, version):
+        """Rollup gravado pelo build quando é da versão `version` do df_view; senão, montado de df"""
+        if os.path.exists(path):
+            rollup = cls.load(path)
+            if version is not None and rollup.version == version:
+                return rollup
+        return cls.build(df)
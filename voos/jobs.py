@@ -0,0 +1,136 @@
+"""Gerenciador local de jobs em segundo plano (pool de processos)
+
+Cálculos pesados dos dashboards (mapa, mapas de calor, painéis estatísticos) rodam
+fora da thread da requisição. Cada job tem uma chave: pedidos idênticos enquanto o
+job está na fila ou rodando reaproveitam o mesmo job (deduplicação), e o resultado
+fica guardado para os próximos pedidos. O job informa o progresso e pode ser cancelado:
+antes de começar, é retirado da fila; depois, é interrompido no próximo report().
+"""
+import multiprocessing
+import threading
+import traceback
+from collections import OrderedDict
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+
+MAX_FINISHED = 64  # resultados mantidos para reuso (os mais antigos saem primeiro)
+
+
+class JobCancelled(Exception):
+    """Levantada dentro do job quando o cancelamento é pedido"""
+
+
+class _Reporter:
+    """Passado ao job como primeiro argumento: report(fração, mensagem)"""
+
+    def __init__(self, progress, cancel):
+        self.progress = progress
+        self.cancel = cancel
+
+    def __call__(self, fraction, message=""):
+        if self.cancel.is_set():
+            raise JobCancelled()
+        self.progress.update(fraction=float(fraction), message=message)
+
+
+def _run(fn, args, progress, cancel):
+    report = _Reporter(progress, cancel)
+    report(0.0, "Iniciando")
+    result = fn(report, *args)
+    progress.update(fraction=1.0, message="Concluído")
+    return result
+
+
+class _Job:
+    def __init__(self, future, progress, cancel):
+        self.future = future
+        self.progress = progress
+        self.cancel = cancel
+
+
+class JobManager:
+    """Pool de processos com progresso, cancelamento e deduplicação de jobs por chave"""
+
+    def __init__(self, max_workers=None, start_method=None):
+        if start_method is None:
+            # fork: os workers herdam o dataset já carregado (copy-on-write)
+            start_method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+        context = multiprocessing.get_context(start_method)
+        self._shared = context.Manager()
+        self._pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+        # Sobe os workers já na criação, antes das threads do servidor (fork seguro)
+        self._pool.submit(int).result()
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, key, fn, *args):
+        """Enfileira fn(report, *args) sob a chave; um job igual ativo ou concluído é reaproveitado"""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and not job.future.cancelled() and not job.cancel.is_set():
+                if job.future.done() and job.future.exception() is not None:
+                    del self._jobs[key]  # falhou: tenta de novo
+                else:
+                    self._jobs.move_to_end(key)
+                    return key
+
+            progress = self._shared.dict(fraction=0.0, message="Na fila")
+            cancel = self._shared.Event()
+            future = self._pool.submit(_run, fn, args, progress, cancel)
+            self._jobs[key] = _Job(future, progress, cancel)
+            self._evict()
+        return key
+
+    def _evict(self):
+        finished = [key for key, job in self._jobs.items() if job.future.done()]
+        for key in finished[:max(len(finished) - MAX_FINISHED, 0)]:
+            del self._jobs[key]
+
+    def status(self, key):
+        """Estado do job: queued, running, done, error, cancelled ou unknown"""
+        job = self._jobs.get(key)
+        if job is None:
+            return {"state": "unknown", "fraction": 0.0, "message": ""}
+        info = {"fraction": 0.0, "message": ""}
+        try:
+            info.update(job.progress)
+        except (EOFError, OSError):
+            pass  # gerenciador encerrado
+        future = job.future
+        if future.cancelled() or (future.done() and isinstance(future.exception(), JobCancelled)):
+            info.update(state="cancelled", message="Cancelado")
+        elif future.done() and future.exception() is not None:
+            error = future.exception()
+            info.update(state="error", message="".join(traceback.format_exception_only(error)).strip())
+        elif future.done():
+            info["state"] = "done"
+        elif job.cancel.is_set():
+            info.update(state="running", message="Cancelando...")
+        else:
+            info["state"] = "running" if future.running() else "queued"
+        return info
+
+    def result(self, key):
+        """Resultado de um job concluído (None se ainda não terminou, falhou ou foi cancelado)"""
+        job = self._jobs.get(key)
+        if job is None or not job.future.done():
+            return None
+        try:
+            return job.future.result() if job.future.exception() is None else None
+        except CancelledError:
+            return None
+
+    def cancel(self, key):
+        """Cancela o job: sai da fila se não começou, senão é interrompido no próximo report()"""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None or job.future.done():
+                return False
+            if not job.future.cancel():
+                job.cancel.set()
+            return True
+
+    def shutdown(self):
+        for key in list(self._jobs):
+            self.cancel(key)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._shared.shutdown()
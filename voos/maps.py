@@ -0,0 +1,487 @@
+import base64
+
+import pandas as pd
+import plotly.graph_objects as go
+
+from voos.aggregates import SKETCH_COLUMN
+from voos.charts import palette, palette_red, plotly_template
+from voos.geometry import add_route_geometry
+from voos.metrics import METRIC_CONFIG
+from voos.sketches import build_sketches, sketch_quantiles
+
+# --- Funções de Mapa (Adaptadas do creating_fig.ipynb) ---
+GEO_USA = dict(
+    scope="usa",
+    projection_type="albers usa",
+    showland=True,
+    landcolor="rgb(243, 243, 238)",
+    showlakes=True,
+    lakecolor="rgb(220, 235, 255)",
+    showsubunits=True,
+    subunitcolor="rgb(200, 200, 200)",
+    subunitwidth=0.5,
+    showcoastlines=True,
+    coastlinecolor="rgb(180, 180, 180)",
+    coastlinewidth=0.5,
+    bgcolor="rgba(255,255,255,0.1)",
+)
+
+def _create_error_figure(message, altura):
+    fig = go.Figure()
+    fig.update_layout(
+        title=dict(text=message, x=0.5, xanchor="center"),
+        height=altura,
+        xaxis=dict(visible=False),
+        yaxis=dict(visible=False),
+        template=plotly_template
+    )
+    return fig
+
+def _processar_dados_rotas(df, config, top_n, routes=None):
+    # Com um RouteAccumulator (voos.topk) o top-N sai dos acumuladores incrementais
+    if routes is not None:
+        return routes.top(config, top_n)
+
+    metric_col = config["col"] if config["col"] in df.columns else SKETCH_COLUMN
+    df_filtered = df.dropna(subset=[metric_col, "ORIGIN_LAT", "ORIGIN_LON", "DEST_LAT", "DEST_LON", "DISTANCE"])
+    
+    agg_dict = {
+        "DELAY_OVERALL": "mean",
+        "DELAY": "sum",
+        "CANCELLED": "sum",
+        "DIVERTED": "sum",
+        "DELAY_PER_DISTANCE": "mean",
+        "TAXI_OUT": "mean",
+        "ORIGIN_LOAD_1H": "mean",
+        "FL_DATE": "count",
+        "TIME_HOUR": "mean"
+    }
+    
+    agg_dict = {col: agg for col, agg in agg_dict.items() if col in df_filtered.columns}
+    grouped = df_filtered.groupby(["ORIGIN_CITY", "DEST_CITY", "ORIGIN_LAT", "ORIGIN_LON", "DEST_LAT", "DEST_LON", "DISTANCE"], 
+                                  as_index=False)
+    rotas_data = grouped.agg(agg_dict).rename(columns={"FL_DATE": "TOTAL_VOOS"})
+
+    if config["agg"] == "quantile":
+        # Um sketch por rota (mesma ordem dos grupos do agg) e o quantil de cada um
+        sketches = build_sketches(grouped.ngroup().to_numpy(), df_filtered[SKETCH_COLUMN], len(rotas_data))
+        rotas_data[config["col"]] = sketch_quantiles(sketches, config["q"])[:, 0]
+
+    rotas_data = (
+        rotas_data
+        .sort_values(by=config["col"], ascending=False)
+        .head(top_n)
+        .reset_index(drop=True)
+    )
+    
+    return add_route_geometry(rotas_data)
+
+def _adicionar_rotas(fig, rotas_data, espessuras, config):
+    for idx, rota in rotas_data.iterrows():
+        cor = _calcular_cor_horario(rota["TIME_HOUR"])
+        
+        fig.add_trace(go.Scattergeo(
+            lon=rota["ARC_LON"],
+            lat=rota["ARC_LAT"],
+            mode="lines",
+            line=dict(width=espessuras[idx], color=cor),
+            name=f"{rota["ORIGIN_CITY"]} → {rota["DEST_CITY"]}",
+            showlegend=False,
+            hovertemplate=(
+                f"<b>{rota["ORIGIN_CITY"]} → {rota["DEST_CITY"]}</b><br>"+
+                f"Atraso Médio: {rota["DELAY_OVERALL"]:.1f} min<br>"+
+                f"{config["title"]}: {rota[config["col"]]:.3f} {config["unit"]}<br>"+
+                f"Hora Média: {rota["TIME_HOUR"]:.1f}h<br>"+
+                f"Total de Voos: {rota["TOTAL_VOOS"]}<br>"+
+                f"Distância: {rota["DISTANCE"]:.0f} milhas<br>"+
+                "<extra></extra>"
+            )
+        ))
+
+def _adicionar_setas(fig, rotas_data):
+    # Uma única trace com todas as setas, no ponto médio do arco e apontando para o destino
+    fig.add_trace(go.Scattergeo(
+        lon=rotas_data["MID_LON"],
+        lat=rotas_data["MID_LAT"],
+        mode="markers",
+        marker=dict(
+            size=9,
+            color=[_calcular_cor_horario(hora) for hora in rotas_data["TIME_HOUR"]],
+            symbol="arrow",
+            angle=rotas_data["DIRECAO"],
+            line=dict(width=1, color="white")
+        ),
+        hoverinfo="skip",
+        showlegend=False
+    ))
+
+def _adicionar_marcadores_comuns(fig, rotas_data):
+    fig.add_trace(go.Scattergeo(
+        lon=rotas_data["ORIGIN_LON"],
+        lat=rotas_data["ORIGIN_LAT"],
+        mode="markers",
+        marker=dict(size=7, color="green", symbol="circle", line=dict(width=1, color="white")),
+        text=rotas_data["ORIGIN_CITY"],
+        name="Origem",
+        hovertemplate="<b>%{text}</b><br><i>Aeroporto de Origem</i><extra></extra>",
+        showlegend=False
+    ))
+    
+    fig.add_trace(go.Scattergeo(
+        lon=rotas_data["DEST_LON"],
+        lat=rotas_data["DEST_LAT"],
+        mode="markers",
+        marker=dict(size=7, color="red", symbol="circle", line=dict(width=1, color="white")),
+        text=rotas_data["DEST_CITY"],
+        name="Destino",
+        hovertemplate="<b>%{text}</b><br><i>Aeroporto de Destino</i><extra></extra>",
+        showlegend=False
+    ))
+
+def _adicionar_destaque_cidades(fig):
+    cidades_destaque = {
+        "Chicago": {"lat": 41.8781, "lon": -87.6298},
+        "Denver": {"lat": 39.7392, "lon": -104.9903},
+        "Atlanta": {"lat": 33.7490, "lon": -84.3880},
+        "Dallas": {"lat": 32.7767, "lon": -96.7970}
+    }
+    
+    for cidade, coords in cidades_destaque.items():
+        fig.add_trace(go.Scattergeo(
+            lon=[coords["lon"]],
+            lat=[coords["lat"]],
+            mode="markers+text",
+            marker=dict(
+                size=5, 
+                color="#FFD700", 
+                symbol="star", 
+                line=dict(width=3, color="#FF8C00")
+            ),
+            text=[cidade],
+            textposition="top center",
+            textfont=dict(size=12, color="#000", family="Arial Black"),
+            name="Cidade Crítica",
+            hovertemplate=f"<b>⭐ {cidade}</b><br>"+
+                         f"<i>Cidade com métricas críticas</i><br>"+
+                         f"• 1.2x mais problemas operacionais<br>"+
+                         f"• Cancelamentos e desvios elevados<extra></extra>",
+            showlegend=False
+        ))
+
+def _adicionar_marcadores_estados(fig):
+    estados_centros = {
+        "CA": {"lon": -119.4, "lat": 36.7, "nome": "Califórnia"},
+        "FL": {"lon": -81.5, "lat": 27.9, "nome": "Flórida"},
+        "TX": {"lon": -99.9, "lat": 31.0, "nome": "Texas"},
+        "CO": {"lon": -105.5, "lat": 39.0, "nome": "Colorado"}
+    }
+    
+    for estado, dados in estados_centros.items():
+        fig.add_trace(go.Scattergeo(
+            lon=[dados["lon"]],
+            lat=[dados["lat"]],
+            mode="markers+text",
+            marker=dict(
+                size=35,
+                color="rgba(255, 100, 100, 0.25)",
+                symbol="hexagon",
+                line=dict(width=2, color="rgba(255, 50, 50, 0.6)")
+            ),
+            text=[estado],
+            textfont=dict(size=14, color="rgba(200, 0, 0, 0.8)", family="Arial Black"),
+            textposition="middle center",
+            name=f"Estado Crítico: {dados["nome"]}",
+            showlegend=False,
+            hovertemplate=(
+                f"<b>🔴 {dados["nome"]} ({estado})</b><br>"+
+                f"<i>Estado com indicadores críticos</i><br>"+
+                f"• Atraso médio 1.19x maior<br>"+
+                f"• Risco elevado de problemas<extra></extra>"
+            )
+        ))
+
+def _calcular_cor_horario(time_hour):
+    hora_normalizada = time_hour / 23.0
+    hue = 200 + (hora_normalizada * 80)
+    saturation = 60 + (hora_normalizada * 30)
+    if time_hour <= 12:
+        lightness = 30 + (time_hour / 12.0) * 40
+    else:
+        lightness = 70 - ((time_hour - 12) / 11.0) * 40
+    
+    hue = max(0, min(hue, 360))
+    saturation = max(0, min(saturation, 100))
+    lightness = max(0, min(lightness, 100))
+    
+    return f"hsl({hue:.0f}, {saturation:.0f}%, {lightness:.0f}%)"
+
+def _calcular_espessuras(rotas_data, col_metric):
+    min_metric = rotas_data[col_metric].min()
+    max_metric = rotas_data[col_metric].max()
+    
+    if max_metric <= min_metric or pd.isna(min_metric) or pd.isna(max_metric):
+        return [3] * len(rotas_data)
+    
+    espessuras = []
+    for valor in rotas_data[col_metric]:
+        if pd.isna(valor):
+            espessuras.append(3)
+            continue
+        metric_normalizada = (valor - min_metric) / (max_metric - min_metric)
+        espessura = 1.5 + (metric_normalizada ** 1.5) * 7
+        espessuras.append(max(1.5, min(espessura, 8.5)))
+    
+    return espessuras
+
+def _atualizar_layout(fig, config, altura):
+    subtitle_text = (
+        f"🎨 Cor: Hora média do voo | "+
+        f"📏 Espessura: {config["title"]} | "+
+        f"➤ Direção | 🟢 Origem | 🔴 Destino"
+    )
+    
+    destaque_text = (
+        f"<br><sub>⭐ <b>Cidades críticas:</b> Chicago, Denver, Atlanta, Dallas/Fort Worth (1.2x mais problemas) | "+
+        f"🔴 <b>Estados críticos:</b> CA, FL, TX, CO (Atraso 1.19x maior)</sub>"
+    )
+    
+    fig.update_layout(
+        title=dict(
+            text=f"<b>Principais Rotas Aéreas - {config["title"]}</b><br>"+
+                 f"<sub>{subtitle_text}</sub>"+
+                 f"{destaque_text}",
+            x=0.5,
+            xanchor="center",
+            font=dict(size=14)
+        ),
+        geo=GEO_USA,
+        height=altura,
+        margin=dict(l=0, r=0, t=120, b=0),
+        showlegend=False,
+        hoverlabel=dict(
+            bgcolor="white",
+            font_size=12,
+            font_family="Arial"
+        ),
+        template=plotly_template
+    )
+
+def adicionar_marcadores_anomalias(fig, pontos):
+    """Destaca no mapa os aeroportos com dias anômalos (voos.anomalies.airport_anomaly_points)"""
+    if pontos is None or pontos.empty:
+        return fig
+    fig.add_trace(go.Scattergeo(
+        lon=pontos["LON"],
+        lat=pontos["LAT"],
+        mode="markers",
+        marker=dict(
+            size=9 + 2 * pontos["N_DAYS"].clip(upper=8),
+            color=palette_red[0],
+            symbol="diamond",
+            opacity=0.85,
+            line=dict(width=1, color="white")
+        ),
+        customdata=pontos[["AIRPORT", "N_DAYS", "DETAILS"]].values,
+        hovertemplate="<b>🚨 %{customdata[0]}: %{customdata[1]} dia(s) anômalo(s)</b><br>%{customdata[2]}<extra></extra>",
+        name="Dias anômalos",
+        showlegend=False
+    ))
+    return fig
+
+def criar_mapa_rotas_avancado(df, top_n=30, altura=600, selected_metric="avg_delay_per_distance", routes=None, anomalias=None):
+    config = METRIC_CONFIG.get(selected_metric, METRIC_CONFIG["avg_delay_per_distance"])
+    
+    required_cols = ["ORIGIN_CITY", "DEST_CITY", "ORIGIN_LAT", "ORIGIN_LON", "DEST_LAT", "DEST_LON", "DISTANCE"]
+    missing_cols = [col for col in required_cols if col not in df.columns]
+    
+    if missing_cols:
+        return _create_error_figure(f"Dados de coordenadas ou distância não disponíveis: {", ".join(missing_cols)}", altura)
+    
+    rotas_data = _processar_dados_rotas(df, config, top_n, routes=routes)
+    return desenhar_mapa_rotas(rotas_data, config, altura, anomalias)
+
+def desenhar_mapa_rotas(rotas_data, config, altura=600, anomalias=None):
+    """Desenha uma tabela de rotas já agregada (formato de _processar_dados_rotas, com geometria)"""
+    if rotas_data.empty:
+        return _create_error_figure("Nenhuma rota válida encontrada", altura)
+    
+    fig = go.Figure()
+    
+    _adicionar_marcadores_estados(fig)
+    
+    espessuras = _calcular_espessuras(rotas_data, config["col"])
+    
+    _adicionar_rotas(fig, rotas_data, espessuras, config)
+    
+    _adicionar_setas(fig, rotas_data)
+    
+    _adicionar_marcadores_comuns(fig, rotas_data)
+    
+    _adicionar_destaque_cidades(fig)
+    
+    adicionar_marcadores_anomalias(fig, anomalias)
+    
+    _atualizar_layout(fig, config, altura)
+    
+    return fig
+
+
+# --- Visão de Hubs (voos.network) ---
+def criar_mapa_hubs(hubs, top_n=30, altura=600):
+    """Mapa dos principais hubs: tamanho = PageRank do atraso, cor = saldo de atraso (saída - entrada)"""
+    if hubs.empty:
+        return _create_error_figure("Nenhum aeroporto válido encontrado", altura)
+
+    hubs = hubs.head(top_n)
+    tamanhos = 10 + 40 * (hubs["PAGERANK"] / hubs["PAGERANK"].max()) ** 0.5
+    limite = max(hubs["DELAY_NET"].abs().max(), 1)
+
+    fig = go.Figure()
+    _adicionar_marcadores_estados(fig)
+    fig.add_trace(go.Scattergeo(
+        lon=hubs["LON"],
+        lat=hubs["LAT"],
+        mode="markers+text",
+        text=hubs.index,
+        textposition="top center",
+        textfont=dict(size=9, color="#333"),
+        marker=dict(
+            size=tamanhos,
+            color=hubs["DELAY_NET"],
+            colorscale="RdBu_r",
+            cmin=-limite,
+            cmax=limite,
+            line=dict(width=1, color="white"),
+            colorbar=dict(title="Saldo de atraso (min)", thickness=12)
+        ),
+        customdata=hubs[["PAGERANK", "BETWEENNESS", "DEGREE_OUT", "DELAY_OUTFLOW", "DELAY_INFLOW", "FLIGHTS_OUT"]].values,
+        hovertemplate=(
+            "<b>%{text}</b><br>"+
+            "PageRank (atraso): %{customdata[0]:.4f}<br>"+
+            "Intermediação: %{customdata[1]:.4f}<br>"+
+            "Destinos: %{customdata[2]}<br>"+
+            "Atraso que sai: %{customdata[3]:,.0f} min<br>"+
+            "Atraso que chega: %{customdata[4]:,.0f} min<br>"+
+            "Partidas: %{customdata[5]:,.0f}"+
+            "<extra></extra>"
+        ),
+        showlegend=False
+    ))
+
+    _atualizar_layout(fig, {"title": "PageRank do Atraso"}, altura)
+    fig.update_layout(title=dict(
+        text=f"<b>Principais Hubs - Propagação de Atrasos</b><br>"+
+             f"<sub>📏 Tamanho: PageRank ponderado pelos minutos de atraso | "+
+             f"🎨 Cor: atraso que sai - atraso que chega (vermelho = exportador de atraso)</sub>"
+    ))
+    return fig
+
+
+# --- Todas as rotas (voos.raster) ---
+def criar_mapa_fluxo(raster, aeroportos, level=1, altura=600, selected_metric="avg_delay"):
+    """Todas as rotas como uma imagem rasterizada sobreposta ao mapa base (tamanho fixo)
+
+    `aeroportos`: tabela com LAT/LON indexada pelo aeroporto (ex.: AirportNetwork.hub_metrics()).
+    """
+    config = METRIC_CONFIG.get(selected_metric, METRIC_CONFIG["avg_delay"])
+    if not raster.levels[level].any():
+        return _create_error_figure("Nenhuma rota válida encontrada", altura)
+
+    source = "data:image/png;base64," + base64.b64encode(raster.image(level)).decode("ascii")
+    fig = go.Figure(go.Scattermap(
+        lon=aeroportos["LON"],
+        lat=aeroportos["LAT"],
+        mode="markers",
+        marker=dict(size=4, color="#003F72"),
+        text=aeroportos.index,
+        hovertemplate="<b>%{text}</b><extra></extra>",
+        showlegend=False
+    ))
+    largura = raster.levels[level].shape[1]
+    fig.update_layout(
+        title=dict(
+            text=f"<b>Todas as Rotas - {config["title"]}</b><br>"+
+                 f"<sub>🔥 Intensidade: soma de {config["title"]} ({config["unit"]}) das rotas que passam por cada pixel | "+
+                 f"Imagem de {largura} px de largura</sub>",
+            x=0.5,
+            xanchor="center",
+            font=dict(size=14)
+        ),
+        map=dict(
+            style="carto-positron",
+            center=dict(lat=39, lon=-98),
+            zoom=2.6,
+            layers=[dict(sourcetype="image", source=source, coordinates=raster.corners(), opacity=0.9)]
+        ),
+        height=altura,
+        margin=dict(l=0, r=0, t=80, b=0),
+        template=plotly_template
+    )
+    return fig
+
+def _cor_variacao(delta, escala):
+    """Vermelho para aumento e azul para queda, mais forte quanto maior a variação"""
+    intensidade = min(abs(delta) / escala, 1.0) if escala > 0 else 0.0
+    base = palette_red[0] if delta > 0 else palette[0]
+    r, g, b = (int(base[i:i + 2], 16) for i in (1, 3, 5))
+    mistura = [round(200 + (canal - 200) * (0.35 + 0.65 * intensidade)) for canal in (r, g, b)]
+    return f"rgb({mistura[0]}, {mistura[1]}, {mistura[2]})"
+
+def desenhar_mapa_variacao(rotas_data, config, rotulos, altura=600):
+    """Rotas coloridas pela variação da métrica entre dois períodos (voos.comparison.compare_routes)"""
+    if rotas_data.empty:
+        return _create_error_figure("Nenhuma rota com voos suficientes nos dois períodos.", altura)
+
+    fig = go.Figure()
+    escala = rotas_data["DELTA"].abs().max()
+    rotas_data = rotas_data.assign(ABS_DELTA=rotas_data["DELTA"].abs())
+    espessuras = _calcular_espessuras(rotas_data, "ABS_DELTA")
+    for idx, rota in rotas_data.iterrows():
+        variacao = f"{rota["DELTA_PCT"] * 100:+.1f}%" if pd.notna(rota["DELTA_PCT"]) else "sem base"
+        fig.add_trace(go.Scattergeo(
+            lon=rota["ARC_LON"],
+            lat=rota["ARC_LAT"],
+            mode="lines",
+            line=dict(width=espessuras[idx], color=_cor_variacao(rota["DELTA"], escala)),
+            showlegend=False,
+            hovertemplate=(
+                f"<b>{rota["ORIGIN_CITY"]} → {rota["DEST_CITY"]}</b><br>"+
+                f"{config["title"]} ({rotulos[0]}): {rota["A"]:.2f} {config["unit"]}<br>"+
+                f"{config["title"]} ({rotulos[1]}): {rota["B"]:.2f} {config["unit"]}<br>"+
+                f"Variação: {rota["DELTA"]:+.2f} {config["unit"]} ({variacao})<br>"+
+                f"Voos: {rota["FLIGHTS_A"]} → {rota["FLIGHTS_B"]}<br>"+
+                "<extra></extra>"
+            )
+        ))
+    fig.add_trace(go.Scattergeo(
+        lon=rotas_data["MID_LON"],
+        lat=rotas_data["MID_LAT"],
+        mode="markers",
+        marker=dict(
+            size=9,
+            color=[_cor_variacao(delta, escala) for delta in rotas_data["DELTA"]],
+            symbol="arrow",
+            angle=rotas_data["DIRECAO"],
+            line=dict(width=1, color="white")
+        ),
+        hoverinfo="skip",
+        showlegend=False
+    ))
+    _adicionar_marcadores_comuns(fig, rotas_data)
+
+    fig.update_layout(
+        title=dict(
+            text=f"<b>Maiores Variações por Rota - {config["title"]}</b><br>"+
+                 f"<sub>{rotulos[0]} → {rotulos[1]} | 🔴 Aumento | 🔵 Queda | 📏 Espessura: tamanho da variação</sub>",
+            x=0.5,
+            xanchor="center",
+            font=dict(size=14)
+        ),
+        geo=GEO_USA,
+        height=altura,
+        margin=dict(l=0, r=0, t=90, b=0),
+        showlegend=False,
+        hoverlabel=dict(bgcolor="white", font_size=12, font_family="Arial"),
+        template=plotly_template
+    )
+    return fig
@@ -0,0 +1,89 @@
+import os
+
+# --- Configuração das Métricas ---
+METRIC_CONFIG = {
+    "avg_delay": {"col": "DELAY_OVERALL", "agg": "mean", "title": "Atraso Médio", "unit": "min"},
+    "delay_count": {"col": "DELAY", "agg": "sum", "title": "Quantidade de Atrasos", "unit": "voos"},
+    "cancelled_count": {"col": "CANCELLED", "agg": "sum", "title": "Quantidade de Cancelamentos", "unit": "voos"},
+    "diverted_count": {"col": "DIVERTED", "agg": "sum", "title": "Quantidade de Desvios", "unit": "voos"},
+    "avg_delay_per_distance": {"col": "DELAY_PER_DISTANCE", "agg": "mean", "title": "Atraso Médio por Distância", "unit": "min/milha"},
+    # Congestionamento (voos.congestion): taxi-out e movimentos programados na origem na hora da partida
+    "avg_taxi_out": {"col": "TAXI_OUT", "agg": "mean", "title": "Taxi-out Médio", "unit": "min"},
+    "airport_load": {"col": "ORIGIN_LOAD_1H", "agg": "mean", "title": "Carga Horária na Origem", "unit": "mov./h"},
+    # Respondida pelos sketches de quantis do cubo de agregados (voos.aggregates)
+    "delay_percentile": {"col": "DELAY_PERCENTILE", "agg": "quantile", "q": 0.9, "title": "Percentil de Atraso (p90)", "unit": "min"}
+}
+
+METRIC_LABELS = {
+    "avg_delay": "⏱️ Média de Atraso",
+    "delay_count": "🔢 Quantidade de Atrasos",
+    "cancelled_count": "❌ Quantidade de Cancelamentos",
+    "diverted_count": "🔄 Quantidade de Desvios",
+    "avg_delay_per_distance": "⏱️ Atraso Médio por Distância",
+    "avg_taxi_out": "🛬 Taxi-out Médio",
+    "airport_load": "🚦 Carga Horária na Origem",
+    "delay_percentile": "📊 Percentil de Atraso (p90)"
+}
+
+
+def dataset_version(path):
+    """Identifica a versão do arquivo de dados (mtime + tamanho) para chavear caches"""
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+def calculate_big_numbers(df):
+    total_flights = len(df)
+    avg_delay = df["DELAY_OVERALL"].mean() if "DELAY_OVERALL" in df.columns else 0
+    delay_percentage = (df["DELAY"].sum() / total_flights) * 100 if total_flights > 0 else 0
+    cancelled_percentage = (df["CANCELLED"].sum() / total_flights) * 100 if total_flights > 0 else 0
+    diverted_percentage = (df["DIVERTED"].sum() / total_flights) * 100 if total_flights > 0 else 0
+
+    return {
+        "total_flights": total_flights,
+        "avg_delay": avg_delay,
+        "delay_percentage": delay_percentage,
+        "cancelled_percentage": cancelled_percentage,
+        "diverted_percentage": diverted_percentage
+    }
+
+
+# Sufixo dos títulos dos gráficos (e rótulo do eixo de valores) por métrica
+METRIC_SUFFIXES = {
+    "avg_delay": "Atraso Médio (min)",
+    "delay_count": "Quantidade de Atrasos",
+    "cancelled_count": "Quantidade de Cancelamentos",
+    "diverted_count": "Quantidade de Desvios",
+    "avg_delay_per_distance": "Atraso Médio por Distância (min/milha)",
+    "avg_taxi_out": "Taxi-out Médio (min)",
+    "airport_load": "Carga Horária na Origem (mov./h)",
+    "delay_percentile": f"Percentil {METRIC_CONFIG['delay_percentile']['q'] * 100:.0f} de Atraso (min)",
+}
+
+
+def create_metric_data(df, group_col, metric, observed=True, cube=None):
+    if metric not in METRIC_SUFFIXES:
+        metric = "avg_delay"
+    title_suffix = METRIC_SUFFIXES[metric]
+    if metric == "delay_count":
+        data = df.groupby(group_col, observed=observed)["DELAY"].sum().sort_values(ascending=False)
+    elif metric == "cancelled_count":
+        data = df.groupby(group_col, observed=observed)["CANCELLED"].sum().sort_values(ascending=False)
+    elif metric == "diverted_count":
+        data = df.groupby(group_col, observed=observed)["DIVERTED"].sum().sort_values(ascending=False)
+    elif metric == "avg_delay_per_distance":
+        data = df.groupby(group_col, observed=observed)["DELAY_PER_DISTANCE"].mean().sort_values(ascending=False)
+    elif metric == "avg_taxi_out":
+        data = df.groupby(group_col, observed=observed)["TAXI_OUT"].mean().sort_values(ascending=False)
+    elif metric == "airport_load":
+        data = df.groupby(group_col, observed=observed)["ORIGIN_LOAD_1H"].mean().sort_values(ascending=False)
+    elif metric == "delay_percentile":
+        config = METRIC_CONFIG[metric]
+        if cube is not None and group_col in cube.dimensions and cube.dimensions[group_col].sketch is not None:
+            data = cube.metric_series(group_col, config)
+        else:
+            data = df.groupby(group_col, observed=observed)["DELAY_OVERALL"].quantile(config["q"]).sort_values(ascending=False)
+    else:
+        data = df.groupby(group_col, observed=observed)["DELAY_OVERALL"].mean().sort_values(ascending=False)
+
+    return data, title_suffix
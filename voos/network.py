@@ -0,0 +1,134 @@
+"""Rede de aeroportos em matrizes esparsas (scipy.sparse) e métricas de hubs
+
+Os códigos ORIGIN/DEST são fatorados em índices inteiros e cada medida vira uma
+matriz aeroporto x aeroporto (CSR) montada de uma vez com coo -> csr, que soma as
+entradas repetidas. As métricas de hub (grau, PageRank ponderado, intermediação,
+fluxo de atraso) são operações sobre essas matrizes, sem laços por aeroporto.
+"""
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.csgraph import shortest_path
+
+# Sem códigos IATA no arquivo, a rede usa as cidades como nós
+NODE_COLUMNS = [("ORIGIN", "DEST"), ("ORIGIN_CITY", "DEST_CITY")]
+
+
+class AirportNetwork:
+    """Matrizes esparsas origem x destino (voos, minutos de atraso, cancelamentos)"""
+
+    def __init__(self, airports, coords, flights, delay, cancelled):
+        self.airports = airports
+        self.coords = coords
+        self.flights = flights
+        self.delay = delay
+        self.cancelled = cancelled
+
+    @classmethod
+    def build(cls, df):
+        origin_col, dest_col = next(cols for cols in NODE_COLUMNS if all(c in df.columns for c in cols))
+        valid = df[origin_col].notna().to_numpy() & df[dest_col].notna().to_numpy()
+        origin = df[origin_col].to_numpy()[valid]
+        dest = df[dest_col].to_numpy()[valid]
+
+        codes, airports = pd.factorize(np.concatenate([origin, dest]).astype(str), sort=True)
+        n, m = len(airports), len(origin)
+        rows, cols = codes[:m], codes[m:]
+
+        def matrix(weights):
+            return sparse.coo_matrix((weights, (rows, cols)), shape=(n, n)).tocsr()
+
+        delay = df["DELAY_OVERALL"].to_numpy(dtype=np.float64, na_value=np.nan)[valid]
+        cancelled = df["CANCELLED"].to_numpy(dtype=np.float64)[valid]
+
+        # Coordenadas do primeiro voo de cada aeroporto (como origem ou destino)
+        lat = np.concatenate([df["ORIGIN_LAT"].to_numpy()[valid], df["DEST_LAT"].to_numpy()[valid]])
+        lon = np.concatenate([df["ORIGIN_LON"].to_numpy()[valid], df["DEST_LON"].to_numpy()[valid]])
+        _, first = np.unique(codes, return_index=True)
+        coords = np.column_stack([lat[first], lon[first]])
+
+        return cls(
+            pd.Index(airports, name="AIRPORT"), coords,
+            matrix(np.ones(m)), matrix(np.nan_to_num(delay)), matrix(cancelled),
+        )
+
+    def degree(self):
+        """Número de destinos (saída) e de origens (entrada) distintos de cada aeroporto"""
+        linked = (self.flights > 0).astype(np.int64)
+        return np.asarray(linked.sum(axis=1)).ravel(), np.asarray(linked.sum(axis=0)).ravel()
+
+    def pagerank(self, weights=None, alpha=0.85, tol=1e-10, max_iter=200):
+        """PageRank ponderado (por padrão pelos minutos de atraso: para onde o atraso flui)"""
+        weights = self.delay if weights is None else weights
+        n = weights.shape[0]
+        out_weight = np.asarray(weights.sum(axis=1)).ravel()
+        dangling = out_weight == 0
+        inv = np.divide(1.0, out_weight, out=np.zeros(n), where=~dangling)
+        transition_t = (sparse.diags(inv) @ weights).T.tocsr()
+
+        rank = np.full(n, 1.0 / n)
+        for _ in range(max_iter):
+            new = alpha * (transition_t @ rank + rank[dangling].sum() / n) + (1 - alpha) / n
+            if np.abs(new - rank).sum() < tol:
+                return new
+            rank = new
+        return rank
+
+    def betweenness(self, sample=None, seed=0):
+        """Intermediação (caminho mínimo único por par), com custo 1/voos em cada rota
+
+        Rotas frequentes são "curtas": aeroportos que aparecem no meio de muitos caminhos
+        mínimos concentram a propagação de atrasos. `sample` limita as origens (aproximação).
+        """
+        n = self.flights.shape[0]
+        cost = self.flights.copy()
+        cost.data = 1.0 / cost.data
+        sources = np.arange(n)
+        if sample is not None and sample < n:
+            sources = np.random.default_rng(seed).choice(n, size=sample, replace=False)
+
+        _, predecessors = shortest_path(cost, method="D", directed=True, indices=sources, return_predecessors=True)
+
+        # Caminha os predecessores de todos os pares ao mesmo tempo, contando os nós intermediários
+        counts = np.zeros(n)
+        src = np.repeat(np.arange(len(sources)), n)
+        current = predecessors.ravel().copy()  # o passo seguinte ainda lê a matriz original
+        active = current >= 0
+        current_src = sources[src]
+        while active.any():
+            node = current[active]
+            intermediate = node != current_src[active]
+            counts += np.bincount(node[intermediate], minlength=n)
+            idx = np.flatnonzero(active)
+            nxt = np.full(idx.size, -9999)
+            nxt[intermediate] = predecessors[src[idx[intermediate]], node[intermediate]]
+            current[idx] = nxt
+            active = current >= 0
+
+        scale = n / len(sources) if len(sources) else 0
+        norm = (n - 1) * (n - 2) if n > 2 else 1
+        return counts * scale / norm
+
+    def hub_metrics(self, betweenness_sample=None):
+        """Tabela de métricas por aeroporto para a visão de hubs do mapa"""
+        degree_out, degree_in = self.degree()
+        flights_out = np.asarray(self.flights.sum(axis=1)).ravel()
+        flights_in = np.asarray(self.flights.sum(axis=0)).ravel()
+        delay_out = np.asarray(self.delay.sum(axis=1)).ravel()
+        delay_in = np.asarray(self.delay.sum(axis=0)).ravel()
+
+        hubs = pd.DataFrame({
+            "LAT": self.coords[:, 0],
+            "LON": self.coords[:, 1],
+            "FLIGHTS_OUT": flights_out,
+            "FLIGHTS_IN": flights_in,
+            "DEGREE_OUT": degree_out,
+            "DEGREE_IN": degree_in,
+            "PAGERANK": self.pagerank(),
+            "BETWEENNESS": self.betweenness(sample=betweenness_sample),
+            "DELAY_OUTFLOW": delay_out,
+            "DELAY_INFLOW": delay_in,
+            "DELAY_NET": delay_out - delay_in,
+            "CANCELLED_OUT": np.asarray(self.cancelled.sum(axis=1)).ravel(),
+        }, index=self.airports)
+        return hubs.sort_values("PAGERANK", ascending=False)
@@ -0,0 +1,113 @@
+"""Mapa de fluxo rasterizado: todas as rotas em uma imagem de tamanho fixo
+
+Os arcos de círculo máximo de todas as rotas são amostrados a cada pixel e somados
+em uma grade 2D (projeção Web Mercator, a mesma do mapa base) com um único
+np.bincount, cada rota pesada pela métrica selecionada. A grade mais fina gera
+uma pirâmide de resoluções (somas de blocos 2x2) e cada nível vira um PNG, guardado
+em cache. O custo para o navegador é o de uma imagem, não o de um trace por rota.
+"""
+import io
+
+import numpy as np
+from PIL import Image
+
+# Extensão da imagem (lon_min, lon_max, lat_min, lat_max): EUA continental, Alasca e Havaí
+BOUNDS = (-170.0, -60.0, 15.0, 72.0)
+TILE_SIZE = 256  # as dimensões das grades são múltiplos deste bloco
+LEVELS = 3  # nível 0: 512 px de largura; cada nível dobra a resolução
+FLOW_COLORS = [(255, 237, 160), (254, 178, 76), (240, 59, 32), (128, 0, 38)]  # claro -> escuro
+
+
+def _mercator_y(lat):
+    return np.log(np.tan(np.pi / 4 + np.radians(lat) / 2))
+
+
+def grid_shape(level, bounds=BOUNDS):
+    """(altura, largura) da grade de um nível (no nível mais fino, múltiplos de TILE_SIZE)"""
+    lon_min, lon_max, lat_min, lat_max = bounds
+    width = 2 * TILE_SIZE * 2 ** level
+    aspect = (_mercator_y(lat_max) - _mercator_y(lat_min)) / np.radians(lon_max - lon_min)
+    height = int(np.ceil(width * aspect / TILE_SIZE)) * TILE_SIZE
+    return height, width
+
+
+def rasterize_arcs(arc_lat, arc_lon, weights, shape, bounds=BOUNDS):
+    """Soma na grade (altura, largura) o peso de cada rota ao longo do seu arco
+
+    arc_lat/arc_lon: (n_rotas, n_pontos). Cada segmento é amostrado com passo <= 1 px e
+    cada amostra soma peso * comprimento/amostras, ou seja, o peso por pixel percorrido.
+    """
+    height, width = shape
+    lon_min, lon_max, lat_min, lat_max = bounds
+    y_top, y_bottom = _mercator_y(lat_max), _mercator_y(lat_min)
+    x = (np.asarray(arc_lon) - lon_min) / (lon_max - lon_min) * width
+    y = (y_top - _mercator_y(np.asarray(arc_lat))) / (y_top - y_bottom) * height
+
+    n_segments = x.shape[1] - 1
+    x0, y0 = x[:, :-1].ravel(), y[:, :-1].ravel()
+    dx, dy = x[:, 1:].ravel() - x0, y[:, 1:].ravel() - y0
+    length = np.hypot(dx, dy)
+    steps = np.ceil(length).astype(np.int64) + 1
+    weight = np.repeat(np.nan_to_num(np.asarray(weights, dtype=np.float64)), n_segments) * length / steps
+
+    # Amostras de todos os segmentos de uma vez: id do segmento e posição dentro dele
+    segment = np.repeat(np.arange(len(steps)), steps)
+    offset = np.arange(steps.sum()) - np.repeat(np.cumsum(steps) - steps, steps)
+    t = offset / np.maximum(steps[segment] - 1, 1)
+    px = np.floor(x0[segment] + t * dx[segment]).astype(np.int64)
+    py = np.floor(y0[segment] + t * dy[segment]).astype(np.int64)
+
+    inside = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+    flat = py[inside] * width + px[inside]
+    return np.bincount(flat, weights=weight[segment][inside], minlength=height * width).reshape(height, width)
+
+
+def colorize(grid, vmax=None):
+    """Grade -> imagem RGBA (escala logarítmica; pixels vazios transparentes)"""
+    vmax = grid.max() if vmax is None else vmax
+    intensity = np.log1p(grid) / np.log1p(vmax) if vmax > 0 else np.zeros_like(grid)
+    stops = np.linspace(0, 1, len(FLOW_COLORS))
+    channels = [np.interp(intensity, stops, [color[i] for color in FLOW_COLORS]) for i in range(3)]
+    alpha = np.where(grid > 0, 80 + 175 * intensity, 0)
+    return np.dstack(channels + [alpha]).astype(np.uint8)
+
+
+def to_png(rgba):
+    buffer = io.BytesIO()
+    Image.fromarray(rgba, "RGBA").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class FlowRaster:
+    """Pirâmide de grades de fluxo de uma métrica, com o PNG de cada nível em cache"""
+
+    def __init__(self, levels, bounds=BOUNDS):
+        self.levels = levels
+        self.bounds = bounds
+        self._images = {}
+
+    @classmethod
+    def from_arcs(cls, arc_lat, arc_lon, weights, n_levels=LEVELS, bounds=BOUNDS):
+        finest = rasterize_arcs(arc_lat, arc_lon, np.clip(weights, 0, None), grid_shape(n_levels - 1, bounds), bounds)
+        levels = [finest]
+        for _ in range(n_levels - 1):
+            h, w = levels[0].shape
+            levels.insert(0, levels[0].reshape(h // 2, 2, w // 2, 2).sum(axis=(1, 3)))
+        return cls(levels, bounds)
+
+    @classmethod
+    def from_routes(cls, routes, config, **kwargs):
+        """Rasteriza todas as rotas de um RouteAccumulator pela métrica de METRIC_CONFIG"""
+        arc_lat, arc_lon, values = routes.network_arcs(config)
+        return cls.from_arcs(arc_lat, arc_lon, values, **kwargs)
+
+    def image(self, level):
+        """PNG do nível inteiro (para sobrepor ao mapa)"""
+        if level not in self._images:
+            self._images[level] = to_png(colorize(self.levels[level]))
+        return self._images[level]
+
+    def corners(self):
+        """Cantos da imagem (lon, lat) na ordem das camadas de imagem do mapa"""
+        lon_min, lon_max, lat_min, lat_max = self.bounds
+        return [[lon_min, lat_max], [lon_max, lat_max], [lon_max, lat_min], [lon_min, lat_min]]
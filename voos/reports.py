@@ -0,0 +1,258 @@
+"""Relatórios em PDF por companhia ou aeroporto (linha de comando)
+
+Cada relatório traz os big numbers, os oito gráficos de distribuição e o mapa das
+principais rotas. Os big numbers e a seleção dos grupos saem do cubo de agregados
+compartilhado; os voos são ordenados uma vez pelo grupo, e cada worker do pool de
+processos recebe só o intervalo de linhas do seu relatório, desenha as figuras
+estáticas (matplotlib) e grava o PDF (fpdf2).
+
+Uso: python -m voos.reports --by airline --out relatorios/ --workers 8
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from pathlib import Path
+
+import matplotlib
+import numpy as np
+import pandas as pd
+from fpdf import FPDF
+from PIL import Image
+
+matplotlib.use("Agg")  # figuras estáticas, sem janela
+import matplotlib.pyplot as plt
+from matplotlib.colors import LinearSegmentedColormap
+
+from voos.aggregates import FlightCube
+from voos.charts import DISTRIBUTION_CHARTS, heatmap_scale, palette
+from voos.dataset import DF_VIEW_PATH, read_df_view
+from voos.maps import _processar_dados_rotas
+from voos.metrics import METRIC_CONFIG, create_metric_data
+
+REPORT_DIMENSIONS = {"airline": ("AIRLINE_Description", "Companhia"), "airport": ("ORIGIN", "Aeroporto")}
+FONT_PATH = Path(__file__).resolve().parents[1] / "project_development" / "fonts" / "SourceSans3-Regular.ttf"
+
+_frame = None  # voos ordenados pelo grupo do relatório (herdado pelos workers)
+
+
+def big_numbers_by(cube, dim):
+    """Big numbers de todos os grupos de uma dimensão, lidos das somas do cubo"""
+    totals = cube.dimensions[dim].totals()
+    flights = totals["FLIGHTS"].replace(0, np.nan)
+    return pd.DataFrame({
+        "total_flights": totals["FLIGHTS"],
+        "avg_delay": totals["DELAY_OVERALL_SUM"] / totals["DELAY_OVERALL_N"].replace(0, np.nan),
+        "delay_percentage": totals["DELAY_SUM"] / flights * 100,
+        "cancelled_percentage": totals["CANCELLED_SUM"] / flights * 100,
+        "diverted_percentage": totals["DIVERTED_SUM"] / flights * 100,
+    }).sort_values("total_flights", ascending=False)
+
+
+def _slug(text):
+    return re.sub(r"[^A-Za-z0-9]+", "_", str(text)).strip("_").lower() or "grupo"
+
+
+def _plain(title):
+    """Título sem o emoji inicial (as fontes do PDF/matplotlib não têm esses glifos)"""
+    return re.sub(r"^[^\w(]+", "", title)
+
+
+def _init_worker(frame):
+    global _frame
+    _frame = frame
+
+
+# --- Figuras estáticas (executadas nos workers) ---
+def _figure_image(fig):
+    """Figura -> imagem RGB (sem canal alfa, que o fpdf2 varreria pixel a pixel)"""
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=110, bbox_inches="tight", facecolor="white")
+    plt.close(fig)
+    return Image.open(buffer).convert("RGB")
+
+
+def _distribution_image(data, spec, title_suffix):
+    fig, ax = plt.subplots(figsize=(6, 3.4))
+    title = _plain(spec["title"].format(suffix=title_suffix))
+    if spec["top"]:
+        data = data.head(spec["top"])
+    if data.empty:
+        ax.set_axis_off()
+        ax.set_title(f"{title} (Sem dados)", fontsize=10)
+    elif spec["kind"] == "line":
+        data = data.sort_index()
+        ax.plot(data.index.astype(float), data.values, color=palette[0], linewidth=2, marker="o", markersize=3)
+        ax.set_xlabel(spec["label"], fontsize=8)
+        ax.set_ylabel(title_suffix, fontsize=8)
+        ax.grid(color="lightgray", linewidth=0.5)
+    else:
+        labels = [str(x) for x in data.index][::-1]
+        ax.barh(labels, data.values[::-1], color=palette[0])
+        ax.set_xlabel(title_suffix, fontsize=8)
+        ax.grid(axis="x", color="lightgray", linewidth=0.5)
+    ax.set_title(title, fontsize=10, fontweight="bold")
+    ax.tick_params(labelsize=7)
+    for side in ["top", "right"]:
+        ax.spines[side].set_visible(False)
+    return _figure_image(fig)
+
+
+def _route_map_image(rotas, config):
+    fig, ax = plt.subplots(figsize=(11, 6))
+    cmap = LinearSegmentedColormap.from_list("voos", heatmap_scale)
+    values = rotas[config["col"]].to_numpy(dtype=float)
+    span = np.nanmax(values) - np.nanmin(values) if len(values) else 0
+    scaled = (values - np.nanmin(values)) / span if span > 0 else np.ones_like(values)
+    for arc_lon, arc_lat, level in zip(rotas["ARC_LON"], rotas["ARC_LAT"], scaled):
+        ax.plot(arc_lon, arc_lat, color=cmap(level), linewidth=1 + 3 * level, alpha=0.8)
+    ax.scatter(rotas["ORIGIN_LON"], rotas["ORIGIN_LAT"], s=14, color="#27ae60", zorder=3)
+    ax.scatter(rotas["DEST_LON"], rotas["DEST_LAT"], s=14, color="#DC1C13", zorder=3)
+    ax.set_title(f"Principais rotas - {config['title']} ({config['unit']})", fontsize=11, fontweight="bold")
+    ax.set_xlabel("Longitude", fontsize=8)
+    ax.set_ylabel("Latitude", fontsize=8)
+    ax.set_aspect(1.25)
+    ax.grid(color="lightgray", linewidth=0.5)
+    scale = plt.cm.ScalarMappable(cmap=cmap, norm=plt.Normalize(np.nanmin(values), np.nanmax(values)))
+    fig.colorbar(scale, ax=ax, shrink=0.7, label=config["unit"])
+    return _figure_image(fig)
+
+
+def _write_pdf(path, label, key, numbers, images, map_image, metric):
+    pdf = FPDF(orientation="portrait", unit="mm", format="A4")
+    pdf.set_auto_page_break(auto=True, margin=12)
+    if FONT_PATH.exists():
+        pdf.add_font("SourceSans", fname=str(FONT_PATH))
+        font = "SourceSans"
+    else:
+        font = "Helvetica"
+
+    pdf.add_page()
+    pdf.set_font(font, size=18)
+    pdf.cell(0, 10, f"Relatório de Voos - {label}: {key}", new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font(font, size=10)
+    pdf.set_text_color(100, 100, 100)
+    pdf.cell(0, 6, f"Métrica: {METRIC_CONFIG[metric]['title']} | Gerado em {date.today():%d/%m/%Y}", new_x="LMARGIN", new_y="NEXT")
+    pdf.ln(3)
+
+    # Big numbers em cartões
+    cards = [
+        ("Total de Voos", f"{numbers['total_flights']:,.0f}".replace(",", ".")),
+        ("Atraso Médio (min)", f"{numbers['avg_delay']:.2f}"),
+        ("Voos Atrasados", f"{numbers['delay_percentage']:.2f}%"),
+        ("Cancelados", f"{numbers['cancelled_percentage']:.2f}%"),
+        ("Desviados", f"{numbers['diverted_percentage']:.2f}%"),
+    ]
+    width = (pdf.w - pdf.l_margin - pdf.r_margin) / len(cards)
+    y = pdf.get_y()
+    for i, (title, value) in enumerate(cards):
+        x = pdf.l_margin + i * width
+        pdf.set_fill_color(235, 243, 250)
+        pdf.rect(x + 1, y, width - 2, 18, style="F")
+        pdf.set_xy(x + 1, y + 2)
+        pdf.set_text_color(0, 63, 114)
+        pdf.set_font(font, size=13)
+        pdf.cell(width - 2, 7, value, align="C")
+        pdf.set_xy(x + 1, y + 10)
+        pdf.set_text_color(90, 90, 90)
+        pdf.set_font(font, size=8)
+        pdf.cell(width - 2, 5, title, align="C")
+    pdf.set_y(y + 22)
+
+    # Gráficos de distribuição, dois por linha
+    column = (pdf.w - pdf.l_margin - pdf.r_margin) / 2
+    for left, right in zip(images[::2], images[1::2]):
+        if pdf.get_y() + 55 > pdf.h - pdf.b_margin:
+            pdf.add_page()
+        y = pdf.get_y()
+        pdf.image(left, x=pdf.l_margin, y=y, w=column - 2)
+        pdf.image(right, x=pdf.l_margin + column + 2, y=y, w=column - 2)
+        pdf.set_y(y + 56)
+
+    if map_image is not None:
+        pdf.add_page()
+        pdf.image(map_image, x=pdf.l_margin, w=pdf.w - pdf.l_margin - pdf.r_margin)
+    pdf.output(str(path))
+
+
+def render_report(task):
+    """Gera o PDF de um grupo (roda no worker; lê o intervalo de linhas de _frame)"""
+    key, label, start, stop, numbers, metric, out_dir = task
+    began = time.perf_counter()
+    df = _frame.iloc[start:stop]
+
+    images = []
+    for spec in DISTRIBUTION_CHARTS:
+        data, title_suffix = create_metric_data(df, spec["col"], metric, observed=True)
+        images.append(_distribution_image(data, spec, title_suffix))
+
+    rotas = _processar_dados_rotas(df, METRIC_CONFIG[metric], 30)
+    map_image = _route_map_image(rotas, METRIC_CONFIG[metric]) if not rotas.empty else None
+
+    path = Path(out_dir) / f"relatorio_{_slug(label)}_{_slug(key)}.pdf"
+    _write_pdf(path, label, key, numbers, images, map_image, metric)
+    return str(path), time.perf_counter() - began
+
+
+def generate_reports(df, by="airline", metric="avg_delay", out_dir="relatorios", keys=None, top=None,
+                     workers=None, cube=None):
+    """Gera um PDF por grupo em paralelo; devolve a lista de arquivos gravados"""
+    dim, label = REPORT_DIMENSIONS[by]
+    if dim not in df.columns:
+        raise ValueError(f"Coluna '{dim}' não encontrada no dataset")
+    cube = cube if cube is not None and dim in cube.dimensions else FlightCube.build(df, dimensions=[dim], sketch_dimensions=[])
+    numbers = big_numbers_by(cube, dim)
+    if keys:
+        numbers = numbers.loc[numbers.index.isin(keys)]
+    if top:
+        numbers = numbers.head(top)
+
+    # Uma ordenação pelo grupo: cada relatório é um intervalo contíguo de linhas
+    codes, uniques = pd.factorize(df[dim])
+    order = np.argsort(codes, kind="stable")
+    frame = df.iloc[order].reset_index(drop=True)
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    position = {key: i for i, key in enumerate(uniques)}
+
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    tasks = [
+        (key, label, bounds[position[key]], bounds[position[key] + 1], row._asdict(), metric, out_dir)
+        for key, row in zip(numbers.index, numbers.itertuples(index=False))
+        if key in position
+    ]
+
+    start_method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+    written = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(start_method),
+                             initializer=_init_worker, initargs=(frame,)) as pool:
+        futures = [pool.submit(render_report, task) for task in tasks]
+        for future in as_completed(futures):
+            path, elapsed = future.result()
+            written.append(path)
+            print(f"[{len(written)}/{len(tasks)}] {path} ({elapsed:.1f}s)")
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera relatórios em PDF por companhia ou aeroporto")
+    parser.add_argument("--by", choices=list(REPORT_DIMENSIONS), default="airline")
+    parser.add_argument("--data", default=DF_VIEW_PATH, help="caminho do df_view.csv")
+    parser.add_argument("--metric", choices=list(METRIC_CONFIG), default="avg_delay")
+    parser.add_argument("--only", nargs="*", help="gerar apenas estes grupos (nomes ou códigos)")
+    parser.add_argument("--top", type=int, help="apenas os N grupos com mais voos")
+    parser.add_argument("--cube", help="cubo gravado com FlightCube.save (evita recalcular os agregados)")
+    parser.add_argument("--out", default="relatorios")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    began = time.perf_counter()
+    df, notices = read_df_view(args.data)
+    for _, message in notices:
+        print(message)
+    cube = FlightCube.load(args.cube) if args.cube else None
+    written = generate_reports(df, args.by, args.metric, args.out, args.only, args.top, args.workers, cube)
+    print(f"{len(written)} relatórios em {time.perf_counter() - began:.1f}s")
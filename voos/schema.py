@@ -0,0 +1,203 @@
+"""Esquema declarativo do df_view e validação em blocos na ingestão
+
+Cada coluna declara tipo, faixa, categorias permitidas e se aceita nulos. O CSV é lido
+em blocos; cada bloco é validado em uma passada vetorizada (uma máscara booleana por
+regra e coluna) e já sai com os tipos finais, de modo que o restante do código não
+precisa reconverter nada. Linhas com violações vão para um arquivo de quarentena com
+o motivo, e o resumo por coluna/regra acompanha o resultado. A leitura falha cedo se
+faltar uma coluna obrigatória ou se a fração de linhas ruins passar do limite.
+"""
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 500_000
+MAX_BAD_FRACTION = 0.05
+
+WEEKDAY_ORDER = ["Segunda-feira", "Terça-feira", "Quarta-feira", "Quinta-feira", "Sexta-feira", "Sábado", "Domingo"]
+PERIOD_ORDER = ["Madrugada", "Manhã", "Tarde", "Noite"]
+
+Column = namedtuple("Column", ["name", "dtype", "min", "max", "categories", "nullable", "required"],
+                    defaults=(None, None, None, False, True))
+
+# dtype: tipo final no DataFrame ("category" usa a ordem de `categories`)
+DF_VIEW_SCHEMA = [
+    Column("FL_DATE", "datetime64[ns]"),
+    Column("FL_DAY", "float64", 1, 31),
+    Column("ORIGIN", "object", required=False),
+    Column("DEST", "object", required=False),
+    Column("ORIGIN_CITY", "object"),
+    Column("ORIGIN_STATE", "object"),
+    Column("DEST_CITY", "object"),
+    Column("CANCELLED", "bool"),
+    Column("DIVERTED", "bool"),
+    Column("DELAY", "bool"),
+    Column("DISTANCE", "int64", 1, 10_000, required=False),
+    Column("AIRLINE_Description", "object"),
+    Column("DELAY_OVERALL", "int64", 0, 10_000),
+    Column("TIME_PERIOD", "category", categories=PERIOD_ORDER, nullable=True),
+    Column("DAY_OF_WEEK", "category", categories=WEEKDAY_ORDER),
+    Column("TIME_HOUR", "float64", 0, 23, nullable=True),
+    Column("ORIGIN_LAT", "float64", -90, 90, nullable=True, required=False),
+    Column("ORIGIN_LON", "float64", -180, 180, nullable=True, required=False),
+    Column("DEST_LAT", "float64", -90, 90, nullable=True, required=False),
+    Column("DEST_LON", "float64", -180, 180, nullable=True, required=False),
+    Column("DELAY_DUE_CARRIER", "uint16", 0, 65_535, required=False),
+    Column("DELAY_DUE_WEATHER", "uint16", 0, 65_535, required=False),
+    Column("DELAY_DUE_NAS", "uint16", 0, 65_535, required=False),
+    Column("DELAY_DUE_SECURITY", "uint16", 0, 65_535, required=False),
+    Column("DELAY_DUE_LATE_AIRCRAFT", "uint16", 0, 65_535, required=False),
+    # Horários HHMM locais e taxi (min) para o congestionamento (voos.congestion)
+    Column("CRS_DEP_TIME", "float32", 0, 2359, nullable=True, required=False),
+    Column("DEP_TIME", "float32", 0, 2359, nullable=True, required=False),
+    Column("CRS_ARR_TIME", "float32", 0, 2359, nullable=True, required=False),
+    Column("ARR_TIME", "float32", 0, 2359, nullable=True, required=False),
+    Column("TAXI_OUT", "float32", 0, 1_440, nullable=True, required=False),
+    Column("TAXI_IN", "float32", 0, 1_440, nullable=True, required=False),
+]
+
+_BOOL_VALUES = {"True": True, "False": False, "true": True, "false": False, "1": True, "0": False, 1: True, 0: False}
+
+# Resultado da validação: violações = DataFrame (COLUMN, RULE, ROWS)
+ValidationReport = namedtuple("ValidationReport", ["rows", "bad_rows", "violations", "quarantine_path"])
+
+
+class SchemaError(ValueError):
+    """Dataset incompatível com o esquema (coluna obrigatória ausente ou linhas ruins demais)"""
+
+
+def _parse(series, column):
+    """Converte a coluna para o tipo do esquema; devolve (valores, máscara de tipo inválido)
+
+    Blocos limpos já chegam com o tipo certo do leitor C do pandas e não são reconvertidos;
+    só colunas que vieram como texto (valores sujos) passam pela conversão com coerção.
+    """
+    kind = column.dtype
+    if kind == "datetime64[ns]":
+        values = pd.to_datetime(series, format="ISO8601", errors="coerce")
+    elif kind == "bool":
+        if series.dtype == bool:
+            return series, np.zeros(len(series), dtype=bool)
+        values = series.map(_BOOL_VALUES)
+    elif kind in ("object", "category"):
+        return series, np.zeros(len(series), dtype=bool)
+    else:
+        values = series if series.dtype.kind in "iufb" else pd.to_numeric(series, errors="coerce")
+        if kind.startswith(("int", "uint")) and values.dtype.kind == "f":
+            # Inteiros com casas decimais também são inválidos
+            fractional = (values % 1 != 0).to_numpy()
+            values = values.where(~fractional)
+            return values, fractional & series.notna().to_numpy()
+    return values, (values.isna() & series.notna()).to_numpy()
+
+
+def validate_chunk(chunk, schema=DF_VIEW_SCHEMA):
+    """Valida um bloco em uma passada vetorizada
+
+    Devolve (bloco válido com os tipos finais, máscara das linhas ruins, motivos das linhas
+    ruins, contagem por (coluna, regra)).
+    """
+    n = len(chunk)
+    bad = np.zeros(n, dtype=bool)
+    masks, counts, parsed = [], {}, {}
+    for column in schema:
+        if column.name not in chunk.columns:
+            continue
+        values, invalid = _parse(chunk[column.name], column)
+        # Inteiros e booleanos não têm nulos: evita a varredura
+        missing = np.zeros(n, dtype=bool) if values.dtype.kind in "iub" else values.isna().to_numpy()
+        rules = {"tipo": invalid, "nulo": missing & ~invalid if not column.nullable else None}
+        if column.min is not None or column.max is not None:
+            numeric = values.to_numpy(dtype=np.float64, na_value=np.nan)
+            with np.errstate(invalid="ignore"):
+                rules["faixa"] = (numeric < column.min) | (numeric > column.max)
+        if column.categories is not None:
+            rules["categoria"] = ~missing & ~values.isin(column.categories).to_numpy()
+        for rule, mask in rules.items():
+            if mask is not None and mask.any():
+                counts[(column.name, rule)] = int(mask.sum())
+                masks.append((f"{column.name}:{rule}", mask))
+                bad |= mask
+        parsed[column.name] = values
+
+    clean = chunk.loc[~bad].copy() if bad.any() else chunk
+    for column in schema:
+        if column.name not in parsed:
+            continue
+        values = parsed[column.name][~bad] if bad.any() else parsed[column.name]
+        if column.dtype == "category":
+            clean[column.name] = pd.Categorical(values, categories=column.categories, ordered=True)
+        elif values.dtype != column.dtype:
+            clean[column.name] = values.astype(column.dtype)
+        elif values is not chunk[column.name]:
+            clean[column.name] = values
+
+    reasons = None
+    if bad.any():
+        reasons = pd.Series("", index=chunk.index[bad])
+        for label, mask in masks:
+            reasons = reasons.where(~mask[bad], reasons + label + ";")
+        reasons = reasons.str.rstrip(";")
+    return clean, bad, reasons, counts
+
+
+def _check_bad_fraction(bad_rows, rows, max_bad_fraction, path, quarantine_path, partial):
+    if bad_rows > max_bad_fraction * rows:
+        scope = f"nas primeiras {rows:,}" if partial else f"de {rows:,}"
+        raise SchemaError(f"{bad_rows:,} linhas inválidas {scope} de {path} "
+                          f"(limite {max_bad_fraction:.0%}); veja {quarantine_path}")
+
+
+def read_validated_csv(path, schema=DF_VIEW_SCHEMA, chunk_rows=CHUNK_ROWS, quarantine_path=None,
+                       max_bad_fraction=MAX_BAD_FRACTION):
+    """Lê o CSV em blocos validando cada um; devolve (df, ValidationReport)
+
+    As linhas ruins são gravadas em `quarantine_path` (padrão: <arquivo>_quarentena.csv)
+    com a coluna VIOLACOES. Um arquivo de quarentena antigo é removido quando não há
+    violações.
+    """
+    if quarantine_path is None:
+        quarantine_path = os.path.splitext(path)[0] + "_quarentena.csv"
+
+    header = pd.read_csv(path, nrows=0).columns
+    missing = [column.name for column in schema if column.required and column.name not in header]
+    if missing:
+        raise SchemaError(f"Colunas obrigatórias ausentes em {path}: {', '.join(missing)}")
+
+    # Texto fica como object; os demais tipos são inferidos pelo leitor C e checados no bloco
+    dtypes = {column.name: "object" for column in schema if column.dtype in ("object", "category") and column.name in header}
+    parts, totals = [], {}
+    rows = bad_rows = 0
+    quarantine_open = False
+    for chunk in pd.read_csv(path, chunksize=chunk_rows, dtype=dtypes):
+        clean, bad, reasons, counts = validate_chunk(chunk, schema)
+        parts.append(clean)
+        rows += len(chunk)
+        for key, value in counts.items():
+            totals[key] = totals.get(key, 0) + value
+        if reasons is not None:
+            bad_rows += int(bad.sum())
+            rejected = chunk.loc[bad].assign(VIOLACOES=reasons)
+            rejected.to_csv(quarantine_path, mode="a" if quarantine_open else "w", header=not quarantine_open, index=False)
+            quarantine_open = True
+            _check_bad_fraction(bad_rows, rows, max_bad_fraction, path, quarantine_path, partial=True)
+    # Checagem final, sobre o arquivo inteiro
+    _check_bad_fraction(bad_rows, rows, max_bad_fraction, path, quarantine_path, partial=False)
+
+    if not quarantine_open and os.path.exists(quarantine_path):
+        os.remove(quarantine_path)
+
+    df = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0].reset_index(drop=True)
+    violations = pd.DataFrame([(col, rule, n) for (col, rule), n in totals.items()], columns=["COLUMN", "RULE", "ROWS"])
+    return df, ValidationReport(rows, bad_rows, violations, quarantine_path if quarantine_open else None)
+
+
+def describe_validation(report):
+    """Mensagem para o usuário quando houve linhas rejeitadas (None se o arquivo está limpo)"""
+    if not report.bad_rows:
+        return None
+    details = ", ".join(f"{row.COLUMN} ({row.RULE}): {row.ROWS:,}" for row in report.violations.itertuples())
+    return (f"{report.bad_rows:,} de {report.rows:,} linhas rejeitadas na validação do esquema ({details}). "
+            f"Linhas em quarentena: {report.quarantine_path}")
@@ -0,0 +1,60 @@
+"""Dataset de voos somente leitura, compartilhado por todas as sessões do processo
+
+O df_view é lido e validado uma vez por versão do arquivo; cada coluna vira um array
+NumPy imutável (writeable=False) e o DataFrame exposto é montado sobre esses arrays
+sem cópia. Sessões recebem sempre o mesmo objeto (nada é desserializado por rerun) e
+expressam seus filtros como arrays de índices (FlightStore.select), copiando apenas as
+colunas de que precisam.
+"""
+import numpy as np
+import pandas as pd
+
+from voos.dataset import DF_VIEW_PATH, read_df_view
+from voos.export import filter_rows
+from voos.metrics import dataset_version
+
+
+def _readonly(series):
+    """Array imutável da coluna (categorias: os códigos) sem copiar os dados"""
+    values = series.array
+    if isinstance(values, pd.Categorical):
+        codes = values.codes
+        codes.flags.writeable = False
+        return pd.Categorical.from_codes(codes, dtype=values.dtype, validate=False)
+    array = series.to_numpy(copy=False)
+    array.flags.writeable = False
+    return array
+
+
+class FlightStore:
+    """Colunas imutáveis de uma versão do dataset + avisos da carga"""
+
+    def __init__(self, df, version=None, notices=()):
+        self.version = version
+        self.notices = list(notices)
+        columns = {col: _readonly(df[col]) for col in df.columns}
+        self.df = pd.DataFrame(columns, copy=False)
+
+    @classmethod
+    def load(cls, path=DF_VIEW_PATH, version=None):
+        df, notices = read_df_view(path)
+        return cls(df, version or dataset_version(path), notices)
+
+    def __len__(self):
+        return len(self.df)
+
+    def column(self, name):
+        """Visão somente leitura de uma coluna (sem cópia)"""
+        return self.df[name]
+
+    def filter(self, start=None, end=None, **filters):
+        """Índices das linhas selecionadas (mesmos filtros de voos.export.filter_rows)"""
+        return filter_rows(self.df, start, end, **filters)
+
+    def select(self, rows=None, columns=None):
+        """Recorte de uma sessão: sem filtro, o próprio DataFrame compartilhado (colunas
+        pedidas como visão); com índices, copia só as linhas e colunas pedidas"""
+        frame = self.df if columns is None else self.df[list(columns)]
+        if rows is None:
+            return frame
+        return frame.take(np.asarray(rows))
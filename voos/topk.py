@@ -0,0 +1,203 @@
+"""Top-K incremental de rotas para o mapa, atualizado conforme os voos chegam
+
+Cada rota tem acumuladores (contagem, somas, contagens de não nulos, sketch de
+atraso) e sua geometria (arco, ponto médio, rumo) em arrays indexados pelo id da rota. Um lote novo é somado com
+np.bincount em O(tamanho do lote). Para cada métrica mantém-se uma lista de
+candidatos ordenada e um limite superior (`floor`) para o valor de qualquer rota
+fora da lista: o top-N sai da lista em O(K) e só se refaz a seleção (argpartition
+em O(rotas), nunca groupby + sort) quando a lista deixa de garantir a resposta.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from voos.aggregates import SKETCH_COLUMN
+from voos.geometry import ARC_POINTS, route_geometry
+from voos.sketches import N_BUCKETS, build_sketches, sketch_quantiles
+
+ROUTE_KEYS = ["ORIGIN_CITY", "DEST_CITY", "ORIGIN_LAT", "ORIGIN_LON", "DEST_LAT", "DEST_LON", "DISTANCE"]
+ROUTE_MEASURES = ["DELAY_OVERALL", "DELAY", "CANCELLED", "DIVERTED", "DELAY_PER_DISTANCE", "TAXI_OUT", "ORIGIN_LOAD_1H", "TIME_HOUR"]
+
+# Agregação de cada coluna na tabela de rotas (mesmo formato de _processar_dados_rotas)
+ROUTE_AGGREGATIONS = {
+    "DELAY_OVERALL": "mean",
+    "DELAY": "sum",
+    "CANCELLED": "sum",
+    "DIVERTED": "sum",
+    "DELAY_PER_DISTANCE": "mean",
+    "TAXI_OUT": "mean",
+    "ORIGIN_LOAD_1H": "mean",
+    "TIME_HOUR": "mean",
+}
+
+CANDIDATES = 256  # > máximo do slider do mapa (100)
+
+
+class _TopCandidates:
+    """Candidatos ao top de uma métrica, em ordem decrescente, e o limite das rotas de fora"""
+
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.values = np.empty(0, dtype=np.float64)
+        self.floor = -np.inf
+
+
+class RouteAccumulator:
+    """Acumuladores por rota com top-K por métrica, alimentados em lotes de voos"""
+
+    def __init__(self, candidates=CANDIDATES):
+        self.candidates = candidates
+        self._lock = threading.Lock()
+        self._route_ids = {}
+        self._keys = []
+        self.n_routes = 0
+        self._capacity = 0
+        self.flights = np.zeros(0, dtype=np.int64)
+        self.sums = {col: np.zeros(0) for col in ROUTE_MEASURES}
+        self.counts = {col: np.zeros(0, dtype=np.int64) for col in ROUTE_MEASURES}
+        self.sketch = np.zeros((0, N_BUCKETS), dtype=np.uint32)
+        # Geometria calculada uma vez, quando a rota aparece pela primeira vez
+        self.geometry = {
+            "ARC_LAT": np.zeros((0, ARC_POINTS)), "ARC_LON": np.zeros((0, ARC_POINTS)),
+            "MID_LAT": np.zeros(0), "MID_LON": np.zeros(0), "DIRECAO": np.zeros(0),
+        }
+        self._top = {}
+
+    @classmethod
+    def from_frame(cls, df, batch_size=250_000, **kwargs):
+        """Monta o acumulador consumindo um DataFrame em lotes, como um feed contínuo"""
+        acc = cls(**kwargs)
+        for start in range(0, len(df), batch_size):
+            acc.update(df.iloc[start:start + batch_size])
+        return acc
+
+    def _grow(self, needed):
+        if needed <= self._capacity:
+            return
+        capacity = max(needed, 2 * self._capacity, 1024)
+        pad = capacity - self._capacity
+        self.flights = np.concatenate([self.flights, np.zeros(pad, dtype=np.int64)])
+        for col in ROUTE_MEASURES:
+            self.sums[col] = np.concatenate([self.sums[col], np.zeros(pad)])
+            self.counts[col] = np.concatenate([self.counts[col], np.zeros(pad, dtype=np.int64)])
+        self.sketch = np.concatenate([self.sketch, np.zeros((pad, N_BUCKETS), dtype=np.uint32)])
+        for col, values in self.geometry.items():
+            self.geometry[col] = np.concatenate([values, np.zeros((pad,) + values.shape[1:])])
+        self._capacity = capacity
+
+    def _add_geometry(self, first_id):
+        """Arcos, ponto médio e rumo das rotas novas (ids >= first_id), em lote"""
+        if first_id >= self.n_routes:
+            return
+        coords = np.array([key[2:6] for key in self._keys[first_id:]], dtype=np.float64)
+        geometry = route_geometry(coords[:, 0], coords[:, 1], coords[:, 2], coords[:, 3])
+        for col, values in geometry.items():
+            self.geometry[col][first_id:self.n_routes] = values
+
+    def _assign_route_ids(self, batch):
+        """Id de rota de cada voo do lote; o dicionário só é consultado por rota distinta"""
+        codes, uniques = pd.MultiIndex.from_frame(batch[ROUTE_KEYS]).factorize()
+        mapping = np.empty(len(uniques), dtype=np.int64)
+        for i, key in enumerate(uniques):
+            route_id = self._route_ids.get(key)
+            if route_id is None:
+                route_id = self._route_ids[key] = len(self._keys)
+                self._keys.append(key)
+            mapping[i] = route_id
+        return mapping[codes]
+
+    def update(self, batch):
+        """Soma um lote de voos aos acumuladores e ajusta os candidatos ao top de cada métrica"""
+        batch = batch.dropna(subset=ROUTE_KEYS)
+        if batch.empty:
+            return
+        with self._lock:
+            first_new = self.n_routes
+            ids = self._assign_route_ids(batch)
+            self.n_routes = len(self._keys)
+            self._grow(self.n_routes)
+            self._add_geometry(first_new)
+            n = self._capacity
+
+            self.flights += np.bincount(ids, minlength=n)
+            for col in ROUTE_MEASURES:
+                if col not in batch.columns:
+                    continue
+                values = batch[col].to_numpy(dtype=np.float64, na_value=np.nan)
+                valid = ~np.isnan(values)
+                self.sums[col] += np.bincount(ids[valid], weights=values[valid], minlength=n)
+                self.counts[col] += np.bincount(ids[valid], minlength=n)
+            self.sketch[:n] += build_sketches(ids, batch[SKETCH_COLUMN], n)
+
+            touched = np.unique(ids)
+            for config_key, top in self._top.items():
+                self._refresh_candidates(top, config_key, touched)
+
+    def _metric_values(self, config_key, ids):
+        col, agg, q = config_key
+        if agg == "quantile":
+            return sketch_quantiles(self.sketch[ids], q)[:, 0]
+        sums = self.sums[col][ids]
+        if agg == "sum":
+            return sums
+        counts = self.counts[col][ids]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+    def _refresh_candidates(self, top, config_key, touched):
+        # Rotas fora da lista e não tocadas mantêm o valor (<= floor); as tocadas são recalculadas
+        candidate_ids = np.union1d(top.ids, touched)
+        values = np.nan_to_num(self._metric_values(config_key, candidate_ids), nan=-np.inf)
+        order = np.argsort(-values, kind="stable")
+        keep, dropped = order[:self.candidates], order[self.candidates:]
+        if dropped.size:
+            top.floor = max(top.floor, values[dropped[0]])
+        top.ids, top.values = candidate_ids[keep], values[keep]
+
+    def _rebuild_candidates(self, config_key):
+        top = _TopCandidates()
+        all_ids = np.arange(self.n_routes)
+        values = np.nan_to_num(self._metric_values(config_key, all_ids), nan=-np.inf)
+        if self.n_routes > self.candidates:
+            part = np.argpartition(-values, self.candidates)
+            keep, rest = part[:self.candidates], part[self.candidates:]
+            top.floor = values[rest].max()
+        else:
+            keep, top.floor = all_ids, -np.inf
+        keep = keep[np.argsort(-values[keep], kind="stable")]
+        top.ids, top.values = keep, values[keep]
+        self._top[config_key] = top
+        return top
+
+    def top(self, config, k):
+        """Top-k rotas pela métrica de METRIC_CONFIG, no formato de _processar_dados_rotas"""
+        config_key = (config["col"], config["agg"], config.get("q"))
+        with self._lock:
+            top = self._top.get(config_key)
+            # A lista responde sozinha se o k-ésimo candidato não perde para nenhuma rota de fora
+            if top is None or (len(top.ids) < k and top.floor > -np.inf) or (
+                    len(top.ids) >= k and top.values[k - 1] < top.floor):
+                top = self._rebuild_candidates(config_key)
+            ids = top.ids[:k][top.values[:k] > -np.inf]
+            return self._route_table(ids, config, config_key)
+
+    def network_arcs(self, config):
+        """Arcos de todas as rotas e o valor da métrica de cada uma (para o mapa rasterizado)"""
+        config_key = (config["col"], config["agg"], config.get("q"))
+        with self._lock:
+            ids = np.arange(self.n_routes)
+            return self.geometry["ARC_LAT"][ids], self.geometry["ARC_LON"][ids], self._metric_values(config_key, ids)
+
+    def _route_table(self, ids, config, config_key):
+        rotas_data = pd.DataFrame([self._keys[i] for i in ids], columns=ROUTE_KEYS)
+        for col, agg in ROUTE_AGGREGATIONS.items():
+            rotas_data[col] = self._metric_values((col, agg, None), ids)
+        rotas_data["TOTAL_VOOS"] = self.flights[ids]
+        rotas_data["ARC_LAT"] = list(self.geometry["ARC_LAT"][ids])
+        rotas_data["ARC_LON"] = list(self.geometry["ARC_LON"][ids])
+        for col in ["MID_LAT", "MID_LON", "DIRECAO"]:
+            rotas_data[col] = self.geometry[col][ids]
+        if config["agg"] == "quantile":
+            rotas_data[config["col"]] = self._metric_values(config_key, ids)
+        return rotas_data
@@ -0,0 +1,290 @@
+"""Treino do classificador de atraso com busca de hiperparâmetros em paralelo
+
+A matriz de atributos é preparada uma vez e gravada em .npy (X float32, y int8) num
+diretório de cache cujo nome vem da impressão digital da fonte e da lista de
+atributos: enquanto o df_view não muda, a leitura e o preparo são pulados. Os workers
+abrem esses arquivos com mmap_mode="r" e compartilham as páginas pelo cache do
+sistema, sem receber a matriz serializada a cada tarefa. Cada tarefa (configuração,
+dobra) grava as probabilidades fora da dobra num memmap de saída comum; o melhor
+conjunto de parâmetros é reajustado e gravado com o relatório ROC/AUC.
+
+Uso: python -m voos.training --workers 8 --folds 3 --sample 500000
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import joblib
+import matplotlib
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score, roc_curve
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from voos.dataset import DF_VIEW_PATH, read_df_view
+
+matplotlib.use("Agg")  # figura estática, sem janela
+import matplotlib.pyplot as plt  # noqa: E402
+
+MODELS_DIR = os.path.join("project_development", "dataset", "created", "models")
+NUMERIC_FEATURES = ["DISTANCE", "TIME_HOUR", "FL_DAY"]
+CATEGORICAL_FEATURES = ["AIRLINE_Description", "DAY_OF_WEEK", "TIME_PERIOD", "ORIGIN", "DEST"]
+DELAY_THRESHOLD = 15  # minutos: alvo = DELAY_OVERALL > 15, como o IS_DELAYED_15MIN dos notebooks
+FEATURES_VERSION = 1  # incrementar quando o preparo mudar (invalida o cache)
+ROC_POINTS = 200
+
+PARAM_GRIDS = {
+    "random_forest": {"n_estimators": [100, 300], "max_depth": [12, 20], "min_samples_leaf": [5, 50]},
+    "logistic": {"C": [0.01, 0.1, 1.0, 10.0]},
+}
+
+
+# --- Matriz de atributos em cache ---
+
+def _source_fingerprint(path):
+    """Caminho, tamanho e mtime da fonte (arquivo ou diretório de partições Parquet)"""
+    files = sorted(Path(path).rglob("*.parquet")) if os.path.isdir(path) else [Path(path)]
+    return [(str(file.resolve()), file.stat().st_size, file.stat().st_mtime_ns) for file in files]
+
+
+def _read_source(path):
+    if os.path.isdir(path):
+        return pd.read_parquet(path)  # partições de df_view do build (voos.build)
+    df, notices = read_df_view(path)
+    for _, message in notices:
+        print(message)
+    return df
+
+
+def prepare_features(path, cache_dir, threshold=DELAY_THRESHOLD):
+    """Diretório com X.npy, y.npy e meta.json para a fonte; reaproveita o cache se nada mudou"""
+    key = hashlib.sha1(json.dumps([_source_fingerprint(path), NUMERIC_FEATURES, CATEGORICAL_FEATURES,
+                                   float(threshold), FEATURES_VERSION]).encode("utf-8")).hexdigest()[:16]
+    target = Path(cache_dir) / f"features-{key}"
+    if (target / "meta.json").exists():
+        return target
+
+    df = _read_source(path)
+    df = df.loc[df["DELAY_OVERALL"].notna()]
+    tmp = Path(cache_dir) / f"features-{key}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    # Coluna a coluna direto no arquivo: a matriz nunca existe duas vezes em memória
+    columns = NUMERIC_FEATURES + CATEGORICAL_FEATURES
+    X = np.lib.format.open_memmap(tmp / "X.npy", mode="w+", dtype=np.float32, shape=(len(df), len(columns)))
+    levels = {}
+    for i, col in enumerate(columns):
+        if col in CATEGORICAL_FEATURES:
+            codes, uniques = pd.factorize(df[col], sort=True)
+            X[:, i] = codes  # -1 = ausente
+            levels[col] = [str(value) for value in uniques]
+        else:
+            X[:, i] = df[col].to_numpy(dtype=np.float32, na_value=np.nan)
+    X.flush()
+    y = (df["DELAY_OVERALL"].to_numpy() > threshold).astype(np.int8)
+    np.save(tmp / "y.npy", y)
+
+    meta = {"source": str(path), "rows": int(len(df)), "positive_rate": float(y.mean()), "threshold": threshold,
+            "columns": columns, "categorical": CATEGORICAL_FEATURES, "levels": levels}
+    (tmp / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+    del X
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+    return target
+
+
+def load_features(feature_dir):
+    """(X, y, meta) com X e y mapeados do disco (somente leitura)"""
+    feature_dir = Path(feature_dir)
+    meta = json.loads((feature_dir / "meta.json").read_text(encoding="utf-8"))
+    return np.load(feature_dir / "X.npy", mmap_mode="r"), np.load(feature_dir / "y.npy", mmap_mode="r"), meta
+
+
+# --- Modelos ---
+
+def make_estimator(model, params, meta, n_jobs=1):
+    """Estimador do sklearn para um modelo da grade (n_jobs=1 nas tarefas do pool)"""
+    if model == "random_forest":
+        # Árvores usam os códigos das categóricas direto (splits ordinais)
+        return RandomForestClassifier(random_state=0, n_jobs=n_jobs, **params)
+    if model == "logistic":
+        categorical = [meta["columns"].index(col) for col in meta["categorical"]]
+        numeric = [i for i in range(len(meta["columns"])) if i not in categorical]
+        prep = ColumnTransformer([
+            ("cat", OneHotEncoder(handle_unknown="ignore"), categorical),  # saída esparsa
+            ("num", Pipeline([("fill", SimpleImputer(strategy="median")), ("scale", StandardScaler())]), numeric),
+        ])
+        return Pipeline([("prep", prep), ("model", LogisticRegression(max_iter=1000, **params))])
+    raise ValueError(f"Modelo desconhecido: {model}")
+
+
+def param_configs(models, grids=PARAM_GRIDS):
+    """[(modelo, parâmetros)] do produto cartesiano de cada grade"""
+    configs = []
+    for model in models:
+        grid = grids[model]
+        configs += [(model, dict(zip(grid, values))) for values in itertools.product(*grid.values())]
+    return configs
+
+
+def assign_folds(y, n_folds, sample=None, seed=0):
+    """(linhas usadas, dobra de cada uma): amostra e dobras estratificadas pelo alvo"""
+    rng = np.random.default_rng(seed)
+    rows = np.arange(len(y))
+    if sample and sample < len(y):
+        rows = np.sort(rng.choice(len(y), size=sample, replace=False))
+    folds = np.empty(len(rows), dtype=np.int8)
+    target = np.asarray(y[rows])
+    for label in (0, 1):
+        members = rng.permutation(np.flatnonzero(target == label))
+        folds[members] = np.arange(len(members)) % n_folds
+    return rows, folds
+
+
+# --- Busca em paralelo ---
+
+_worker = {}
+
+
+def _init_worker(feature_dir, run_dir):
+    X, y, meta = load_features(feature_dir)
+    _worker.update(X=X, y=y, meta=meta,
+                   rows=np.load(Path(run_dir) / "rows.npy", mmap_mode="r"),
+                   folds=np.load(Path(run_dir) / "folds.npy", mmap_mode="r"),
+                   oof=np.load(Path(run_dir) / "oof.npy", mmap_mode="r+"))
+
+
+def _evaluate(task):
+    """Ajusta uma configuração numa dobra e grava as probabilidades fora da dobra"""
+    config, model, params, fold = task
+    rows, folds = _worker["rows"], np.asarray(_worker["folds"])
+    start = time.perf_counter()
+    estimator = make_estimator(model, params, _worker["meta"])
+    estimator.fit(_worker["X"][rows[folds != fold]], _worker["y"][rows[folds != fold]])
+    validation = folds == fold
+    proba = estimator.predict_proba(_worker["X"][rows[validation]])[:, 1]
+    _worker["oof"][config, validation] = proba
+    _worker["oof"].flush()
+    return config, fold, float(roc_auc_score(_worker["y"][rows[validation]], proba)), time.perf_counter() - start
+
+
+def search(feature_dir, run_dir, configs, n_folds=3, sample=None, workers=None, seed=0, log=print):
+    """Validação cruzada de todas as configurações; devolve (resultados, rows, oof)"""
+    _, y, _ = load_features(feature_dir)
+    run_dir = Path(run_dir)
+    run_dir.mkdir(parents=True, exist_ok=True)
+    rows, folds = assign_folds(y, n_folds, sample, seed)
+    np.save(run_dir / "rows.npy", rows)
+    np.save(run_dir / "folds.npy", folds)
+    oof = np.lib.format.open_memmap(run_dir / "oof.npy", mode="w+", dtype=np.float32, shape=(len(configs), len(rows)))
+    del oof
+
+    # As florestas maiores primeiro: o fim da busca não fica esperando uma tarefa longa
+    tasks = sorted(((config, model, params, fold) for config, (model, params) in enumerate(configs) for fold in range(n_folds)),
+                   key=lambda task: -task[2].get("n_estimators", 1))
+    scores = {config: [] for config in range(len(configs))}
+    seconds = {config: 0.0 for config in range(len(configs))}
+    start_method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(start_method),
+                             initializer=_init_worker, initargs=(str(feature_dir), str(run_dir))) as pool:
+        futures = [pool.submit(_evaluate, task) for task in tasks]
+        for done, future in enumerate(as_completed(futures), 1):
+            config, fold, auc, elapsed = future.result()
+            scores[config].append(auc)
+            seconds[config] += elapsed
+            model, params = configs[config]
+            log(f"[{done}/{len(tasks)}] {model} {params} dobra {fold}: AUC={auc:.4f} ({elapsed:.1f}s)")
+
+    results = [{"model": model, "params": params, "mean_auc": float(np.mean(scores[config])),
+                "std_auc": float(np.std(scores[config])), "fold_auc": scores[config], "fit_seconds": seconds[config]}
+               for config, (model, params) in enumerate(configs)]
+    return results, rows, np.load(run_dir / "oof.npy", mmap_mode="r")
+
+
+# --- Relatório e modelo final ---
+
+def roc_report(y_true, proba, threshold=0.5):
+    """AUC, curva ROC reduzida a ROC_POINTS pontos, matriz de confusão e relatório por classe"""
+    fpr, tpr, cuts = roc_curve(y_true, proba)
+    keep = np.unique(np.linspace(0, len(fpr) - 1, min(len(fpr), ROC_POINTS)).round().astype(int))
+    predicted = (proba >= threshold).astype(int)
+    return {
+        "auc": float(roc_auc_score(y_true, proba)),
+        "roc": {"fpr": fpr[keep].tolist(), "tpr": tpr[keep].tolist(), "threshold": np.nan_to_num(cuts[keep], posinf=1.0).tolist()},
+        "confusion_matrix": confusion_matrix(y_true, predicted).tolist(),
+        "classification_report": classification_report(y_true, predicted, output_dict=True, zero_division=0),
+    }
+
+
+def _plot_roc(report, title, path):
+    fig, ax = plt.subplots(figsize=(8, 6))
+    ax.plot(report["roc"]["fpr"], report["roc"]["tpr"], color="darkorange", lw=2, label=f"Curva ROC (AUC = {report['auc']:.3f})")
+    ax.plot([0, 1], [0, 1], color="navy", lw=2, linestyle="--")
+    ax.set_xlim(0, 1)
+    ax.set_ylim(0, 1.05)
+    ax.set_xlabel("Taxa de Falsos Positivos")
+    ax.set_ylabel("Taxa de Verdadeiros Positivos")
+    ax.set_title(title)
+    ax.legend(loc="lower right")
+    ax.grid(True)
+    fig.savefig(path, dpi=110, bbox_inches="tight")
+    plt.close(fig)
+
+
+def train(path=DF_VIEW_PATH, out_dir=MODELS_DIR, models=tuple(PARAM_GRIDS), n_folds=3, sample=None, workers=None,
+          threshold=DELAY_THRESHOLD, seed=0, log=print):
+    """Busca, escolhe pela AUC média fora da dobra, reajusta e grava modelo + relatório"""
+    began = time.perf_counter()
+    out_dir = Path(out_dir)
+    feature_dir = prepare_features(path, out_dir / "cache", threshold)
+    X, y, meta = load_features(feature_dir)
+    log(f"Atributos: {meta['rows']:,} voos x {len(meta['columns'])} colunas ({feature_dir}, {time.perf_counter() - began:.1f}s)")
+
+    configs = param_configs(models)
+    results, rows, oof = search(feature_dir, out_dir / "run", configs, n_folds, sample, workers, seed, log)
+    best = max(range(len(configs)), key=lambda config: results[config]["mean_auc"])
+    model, params = configs[best]
+    log(f"Melhor: {model} {params} (AUC média {results[best]['mean_auc']:.4f})")
+
+    # Reajuste nas mesmas linhas da busca, agora com todos os núcleos na floresta
+    estimator = make_estimator(model, params, meta, n_jobs=workers or -1)
+    estimator.fit(X[rows], y[rows])
+    report = {"model": model, "params": params, "rows": int(len(rows)), "folds": n_folds, "seed": seed,
+              "features": meta, "search": results, "out_of_fold": roc_report(np.asarray(y[rows]), np.asarray(oof[best])),
+              "seconds": time.perf_counter() - began}
+
+    model_path = out_dir / "delay_model.joblib"
+    joblib.dump({"estimator": estimator, "columns": meta["columns"], "levels": meta["levels"], "threshold": threshold}, model_path)
+    (out_dir / "delay_model_report.json").write_text(json.dumps(report, ensure_ascii=False, indent=1), encoding="utf-8")
+    _plot_roc(report["out_of_fold"], f"Curva ROC fora da dobra: {model}", out_dir / "delay_model_roc.png")
+    log(f"Modelo em {model_path} ({report['seconds']:.1f}s no total)")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Treina o classificador de atraso com busca de hiperparâmetros em paralelo")
+    parser.add_argument("--data", default=DF_VIEW_PATH, help="df_view.csv ou diretório de partições Parquet do build")
+    parser.add_argument("--out", default=MODELS_DIR, help="diretório do modelo, do relatório e do cache")
+    parser.add_argument("--models", nargs="+", choices=list(PARAM_GRIDS), default=list(PARAM_GRIDS))
+    parser.add_argument("--folds", type=int, default=3)
+    parser.add_argument("--sample", type=int, help="linhas sorteadas para a busca e o reajuste (padrão: todas)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--threshold", type=float, default=DELAY_THRESHOLD, help="minutos de atraso do alvo")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    report = train(args.data, args.out, args.models, args.folds, args.sample, args.workers, args.threshold, args.seed)
+    print(f"AUC fora da dobra: {report['out_of_fold']['auc']:.4f}")